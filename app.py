@@ -3,6 +3,7 @@ from database import db_manager
 from database.models import Usuario
 from routes import register_blueprints
 from services.backup_scheduler import start_backup_scheduler
+from services.request_metrics import init_request_metrics
 
 # Crear la aplicación Flask
 app = Flask(__name__)
@@ -11,6 +12,9 @@ app = Flask(__name__)
 app.config['DEBUG'] = True
 app.config['SECRET_KEY'] = 'tu-clave-secreta-aqui'
 
+# Medir la latencia y las consultas SQL de cada petición
+init_request_metrics(app)
+
 # Registrar blueprints
 register_blueprints(app)
 
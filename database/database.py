@@ -1,24 +1,580 @@
 import sqlite3
 import os
+import threading
+import time
 from datetime import datetime
 from contextlib import contextmanager
+from functools import wraps
 
 # Configuración de la base de datos
 DATABASE_PATH = 'pacta_local.db'
 
+# Configuración por defecto del pool de conexiones
+POOL_MAX_SIZE = 10                  # Máximo de conexiones abiertas por base de datos
+POOL_TIMEOUT = 30.0                 # Segundos máximos de espera por una conexión libre
+POOL_HEALTH_CHECK_INTERVAL = 60.0   # Segundos de inactividad antes de verificar una conexión
+
+# Perfiles de PRAGMA aplicados a cada conexión nueva.
+# Todos usan WAL para que las lecturas no esperen a escritores ni a los backups.
+PRAGMA_PROFILES = {
+    # Máxima seguridad ante cortes de energía: fsync en cada commit
+    'durable': {
+        'journal_mode': 'WAL',
+        'synchronous': 'FULL',
+        'cache_size': -8000,          # ~8 MB
+        'mmap_size': 0,
+        'busy_timeout': 10000,        # ms
+        'wal_autocheckpoint': 1000    # páginas
+    },
+    # Valor por defecto: WAL + NORMAL es seguro ante caídas de la aplicación
+    'balanced': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -16000,         # ~16 MB
+        'mmap_size': 64 * 1024 * 1024,
+        'busy_timeout': 5000,
+        'wal_autocheckpoint': 1000
+    },
+    # Máximo rendimiento: más caché y mmap, checkpoints menos frecuentes
+    'throughput': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -64000,         # ~64 MB
+        'mmap_size': 256 * 1024 * 1024,
+        'busy_timeout': 5000,
+        'wal_autocheckpoint': 4000,
+        'temp_store': 'MEMORY'
+    }
+}
+DEFAULT_PRAGMA_PROFILE = 'balanced'
+CHECKPOINT_MODES = ('PASSIVE', 'FULL', 'RESTART', 'TRUNCATE')
+
+# Resumen materializado del dashboard: los triggers suman la fila nueva y restan la
+# anterior, así el dashboard no recorre la tabla de contratos en cada visita
+_SUMMARY_ADD = """
+    INSERT INTO dashboard_summary (ambito, clave, total, valor)
+    VALUES ('{ambito}', NEW.estado, 1, COALESCE(NEW.{monto}, 0))
+    ON CONFLICT(ambito, clave) DO UPDATE SET total = total + 1, valor = valor + excluded.valor;
+"""
+_SUMMARY_SUBTRACT = """
+    UPDATE dashboard_summary SET total = total - 1, valor = valor - COALESCE(OLD.{monto}, 0)
+    WHERE ambito = '{ambito}' AND clave = OLD.estado;
+    DELETE FROM dashboard_summary WHERE ambito = '{ambito}' AND clave = OLD.estado AND total <= 0;
+"""
+_EXPIRY_ADD = """
+    INSERT INTO dashboard_vencimientos (fecha_fin, activos)
+    SELECT NEW.fecha_fin, 1 WHERE NEW.estado = 'activo'
+    ON CONFLICT(fecha_fin) DO UPDATE SET activos = activos + 1;
+"""
+_EXPIRY_SUBTRACT = """
+    UPDATE dashboard_vencimientos SET activos = activos - 1
+    WHERE OLD.estado = 'activo' AND fecha_fin = OLD.fecha_fin;
+    DELETE FROM dashboard_vencimientos WHERE fecha_fin = OLD.fecha_fin AND activos <= 0;
+"""
+
+
+def _summary_triggers():
+    """Genera los triggers que mantienen el resumen del dashboard"""
+    contratos = {'ambito': 'contratos', 'monto': 'monto_actual'}
+    suplementos = {'ambito': 'suplementos', 'monto': 'monto_modificacion'}
+    
+    agregar_contrato = _SUMMARY_ADD.format(**contratos) + _EXPIRY_ADD
+    quitar_contrato = _SUMMARY_SUBTRACT.format(**contratos) + _EXPIRY_SUBTRACT
+    agregar_suplemento = _SUMMARY_ADD.format(**suplementos)
+    quitar_suplemento = _SUMMARY_SUBTRACT.format(**suplementos)
+    
+    definiciones = [
+        ('trg_summary_contratos_insert', 'AFTER INSERT ON contratos', agregar_contrato),
+        ('trg_summary_contratos_delete', 'AFTER DELETE ON contratos', quitar_contrato),
+        ('trg_summary_contratos_update', 'AFTER UPDATE OF estado, monto_actual, fecha_fin ON contratos',
+         quitar_contrato + agregar_contrato),
+        ('trg_summary_suplementos_insert', 'AFTER INSERT ON suplementos', agregar_suplemento),
+        ('trg_summary_suplementos_delete', 'AFTER DELETE ON suplementos', quitar_suplemento),
+        ('trg_summary_suplementos_update', 'AFTER UPDATE OF estado, monto_modificacion ON suplementos',
+         quitar_suplemento + agregar_suplemento),
+    ]
+    return [f"CREATE TRIGGER IF NOT EXISTS {nombre} {evento} BEGIN {cuerpo} END"
+            for nombre, evento, cuerpo in definiciones]
+
+
+# Funciones que reciben la duración de cada consulta hecha con execute_*
+# (por ejemplo, las métricas por petición)
+_query_listeners = []
+
+
+def add_query_listener(listener):
+    """Registra una función listener(segundos) que se llama tras cada execute_*"""
+    if listener not in _query_listeners:
+        _query_listeners.append(listener)
+
+
+def _timed_query(func):
+    """Mide la duración de un execute_* y la comunica a los listeners"""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if not _query_listeners:
+            return func(*args, **kwargs)
+        inicio = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            duracion = time.perf_counter() - inicio
+            for listener in _query_listeners:
+                listener(duracion)
+    return wrapper
+
+
+# Contador de notificaciones no leídas por usuario, mantenido por triggers
+_UNREAD_ADD = """
+    INSERT INTO notification_counters (usuario_id, unread)
+    SELECT NEW.usuario_id, 1 WHERE NEW.is_read = 0
+    ON CONFLICT(usuario_id) DO UPDATE SET unread = unread + 1;
+"""
+
+_UNREAD_SUBTRACT = """
+    UPDATE notification_counters SET unread = unread - 1
+    WHERE usuario_id = OLD.usuario_id AND OLD.is_read = 0;
+"""
+
+
+def _notification_counter_triggers():
+    """Genera los triggers que mantienen notification_counters"""
+    definiciones = [
+        ('trg_counters_notificaciones_insert', 'AFTER INSERT ON notificaciones', _UNREAD_ADD),
+        ('trg_counters_notificaciones_delete', 'AFTER DELETE ON notificaciones', _UNREAD_SUBTRACT),
+        ('trg_counters_notificaciones_update', 'AFTER UPDATE OF is_read, usuario_id ON notificaciones',
+         _UNREAD_SUBTRACT + _UNREAD_ADD),
+    ]
+    return [f"CREATE TRIGGER IF NOT EXISTS {nombre} {evento} BEGIN {cuerpo} END"
+            for nombre, evento, cuerpo in definiciones]
+
+
+# Captura de cambios para los backups: cada escritura en estas tablas queda registrada
+# en change_tracking por un trigger, sin depender de que el código Python la anote
+CHANGE_CAPTURE_TABLES = ['usuarios', 'clientes', 'contratos', 'suplementos',
+                         'personas_responsables', 'documentos_contratos']
+
+# Mismo formato de fecha que datetime.now() en Python, para poder comparar ambos
+_CHANGE_TIMESTAMP = "strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime')"
+
+# change_watermarks guarda por tabla y operación los cambios pendientes de backup
+_WATERMARK_UPSERT = """
+    INSERT INTO change_watermarks (table_name, operation, pending_changes, first_change, last_change, last_change_id)
+    VALUES (NEW.table_name, NEW.operation, 1, NEW.timestamp, NEW.timestamp, NEW.id)
+    ON CONFLICT(table_name, operation) DO UPDATE SET
+        pending_changes = pending_changes + 1,
+        first_change = COALESCE(first_change, excluded.first_change),
+        last_change = excluded.last_change,
+        last_change_id = excluded.last_change_id;
+"""
+
+
+def _change_capture_triggers():
+    """Genera los triggers que registran los cambios y mantienen las marcas de agua"""
+    triggers = []
+    for tabla in CHANGE_CAPTURE_TABLES:
+        for operacion, fila in (('INSERT', 'NEW'), ('UPDATE', 'NEW'), ('DELETE', 'OLD')):
+            cuerpo = (f"INSERT INTO change_tracking (table_name, operation, record_id, timestamp) "
+                      f"VALUES ('{tabla}', '{operacion}', {fila}.id, {_CHANGE_TIMESTAMP});")
+            triggers.append(f"CREATE TRIGGER IF NOT EXISTS trg_changes_{tabla}_{operacion.lower()} "
+                            f"AFTER {operacion} ON {tabla} BEGIN {cuerpo} END")
+    
+    # Cubre tanto los cambios de los triggers como los registrados desde Python
+    triggers.append(f"CREATE TRIGGER IF NOT EXISTS trg_change_watermarks "
+                    f"AFTER INSERT ON change_tracking BEGIN {_WATERMARK_UPSERT} END")
+    return triggers
+
+
+def apply_pragma_profile(conn, profile=DEFAULT_PRAGMA_PROFILE):
+    """Aplica un perfil de PRAGMA a una conexión SQLite"""
+    if profile not in PRAGMA_PROFILES:
+        raise ValueError(f"Perfil de PRAGMA desconocido: {profile}")
+    
+    for pragma, value in PRAGMA_PROFILES[profile].items():
+        conn.execute(f"PRAGMA {pragma} = {value}")
+
+
+class PoolTimeoutError(sqlite3.OperationalError):
+    """Se lanza cuando no hay conexiones libres dentro del tiempo de espera"""
+    pass
+
+
+class ConnectionPool:
+    """
+    Pool acotado de conexiones SQLite.
+
+    - Reutiliza conexiones entre llamadas en lugar de abrir una nueva cada vez.
+    - Un mismo hilo que anida bloques get_connection() recibe la misma conexión.
+    - Limita el número de conexiones abiertas y bloquea a los hilos que esperan.
+    - Verifica las conexiones que llevan tiempo inactivas antes de entregarlas.
+    """
+
+    def __init__(self, db_path, max_size=POOL_MAX_SIZE, timeout=POOL_TIMEOUT,
+                 health_check_interval=POOL_HEALTH_CHECK_INTERVAL, on_connect=None):
+        self.db_path = db_path
+        self.max_size = max(1, int(max_size))
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self.on_connect = on_connect
+
+        self._condition = threading.Condition(threading.Lock())
+        self._idle = []          # Pila LIFO de (conexión, generación, último uso)
+        self._size = 0           # Conexiones abiertas (en uso + libres)
+        self._generation = 0     # Se incrementa al reiniciar el pool
+        self._paused = False     # drain() bloquea las entregas hasta resume()
+        self._local = threading.local()
+
+        self._stats = {
+            'created': 0,
+            'checkouts': 0,
+            'thread_reuses': 0,
+            'waits': 0,
+            'wait_time_total': 0.0,
+            'wait_time_max': 0.0,
+            'timeouts': 0,
+            'health_checks': 0,
+            'discarded': 0
+        }
+
+    def _create_connection(self):
+        """Abre una nueva conexión configurada para el pool"""
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row  # Para acceder a columnas por nombre
+        if self.on_connect:
+            self.on_connect(conn)
+        return conn
+
+    def _is_healthy(self, conn):
+        """Verifica que una conexión siga siendo utilizable"""
+        try:
+            conn.execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _discard(self, conn):
+        """Cierra una conexión y libera su lugar en el pool"""
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        with self._condition:
+            self._size -= 1
+            self._stats['discarded'] += 1
+            self._notify_release()
+
+    def _acquire(self):
+        """Obtiene una conexión libre, creando una nueva o esperando si es necesario"""
+        deadline = None
+        wait_started = None
+
+        while True:
+            with self._condition:
+                while self._paused or (not self._idle and self._size >= self.max_size):
+                    now = time.monotonic()
+                    if deadline is None:
+                        deadline = now + self.timeout
+                        wait_started = now
+                        self._stats['waits'] += 1
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        self._stats['timeouts'] += 1
+                        raise PoolTimeoutError(
+                            f'No hay conexiones disponibles después de {self.timeout}s '
+                            f'(máximo {self.max_size})'
+                        )
+                    self._condition.wait(remaining)
+
+                if wait_started is not None:
+                    waited = time.monotonic() - wait_started
+                    self._stats['wait_time_total'] += waited
+                    self._stats['wait_time_max'] = max(self._stats['wait_time_max'], waited)
+                    wait_started = None
+
+                if self._idle:
+                    conn, generation, last_used = self._idle.pop()
+                    create = False
+                else:
+                    self._size += 1
+                    generation = self._generation
+                    create = True
+                self._stats['checkouts'] += 1
+
+            if create:
+                try:
+                    conn = self._create_connection()
+                except Exception:
+                    with self._condition:
+                        self._size -= 1
+                        self._condition.notify()
+                    raise
+                with self._condition:
+                    self._stats['created'] += 1
+                return conn, generation
+
+            # Verificar conexiones que llevan mucho tiempo sin usarse
+            if time.monotonic() - last_used >= self.health_check_interval:
+                with self._condition:
+                    self._stats['health_checks'] += 1
+                if not self._is_healthy(conn):
+                    self._discard(conn)
+                    continue
+
+            return conn, generation
+
+    def _release(self, conn, generation):
+        """Devuelve una conexión al pool descartando transacciones pendientes"""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            self._discard(conn)
+            return
+
+        with self._condition:
+            if generation == self._generation:
+                self._idle.append((conn, generation, time.monotonic()))
+                self._notify_release()
+                return
+
+        # La conexión pertenece a una generación anterior al reinicio del pool
+        self._discard(conn)
+
+    def _notify_release(self):
+        """Avisa que se liberó una conexión (con el lock tomado)"""
+        if self._paused:
+            # drain() espera junto con los hilos bloqueados: despertar a todos
+            self._condition.notify_all()
+        else:
+            self._condition.notify()
+    
+    @contextmanager
+    def connection(self):
+        """Context manager que entrega una conexión del pool"""
+        local = self._local
+        conn = getattr(local, 'conn', None)
+
+        # Reutilizar la conexión que el hilo ya tiene en uso
+        if conn is not None:
+            local.depth += 1
+            with self._condition:
+                self._stats['thread_reuses'] += 1
+            try:
+                yield conn
+            finally:
+                local.depth -= 1
+            return
+
+        conn, generation = self._acquire()
+        local.conn = conn
+        local.depth = 1
+        try:
+            yield conn
+        finally:
+            local.conn = None
+            local.depth = 0
+            self._release(conn, generation)
+
+    def reset(self):
+        """
+        Cierra todas las conexiones libres e invalida las que están en uso,
+        que se cerrarán al ser devueltas. Útil tras reemplazar el archivo de BD.
+        """
+        with self._condition:
+            self._generation += 1
+            idle = self._idle
+            self._idle = []
+            self._size -= len(idle)
+            self._stats['discarded'] += len(idle)
+            self._condition.notify_all()
+
+        for conn, _, _ in idle:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+
+    def drain(self, timeout=None):
+        """
+        Bloquea las nuevas entregas de conexiones, espera a que se devuelvan las
+        que están en uso y las cierra todas. Las entregas se reanudan con resume().
+        
+        Raises:
+            PoolTimeoutError: Si las conexiones en uso no se devuelven a tiempo
+                (el pool queda reanudado)
+        """
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        
+        with self._condition:
+            self._paused = True
+            while self._size > len(self._idle):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._paused = False
+                    self._condition.notify_all()
+                    raise PoolTimeoutError(
+                        f'Quedan {self._size - len(self._idle)} conexiones en uso '
+                        f'después de {timeout}s'
+                    )
+                self._condition.wait(remaining)
+            
+            self._generation += 1
+            idle = self._idle
+            self._idle = []
+            self._size -= len(idle)
+            self._stats['discarded'] += len(idle)
+        
+        for conn, _, _ in idle:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+    
+    def resume(self):
+        """Reanuda las entregas de conexiones después de drain()"""
+        with self._condition:
+            self._paused = False
+            self._condition.notify_all()
+    
+    def get_stats(self):
+        """Obtiene métricas de uso del pool"""
+        with self._condition:
+            stats = dict(self._stats)
+            idle = len(self._idle)
+            size = self._size
+
+        stats.update({
+            'db_path': self.db_path,
+            'max_size': self.max_size,
+            'size': size,
+            'idle': idle,
+            'in_use': size - idle,
+            'wait_time_total': round(stats['wait_time_total'], 4),
+            'wait_time_max': round(stats['wait_time_max'], 4),
+            'wait_time_avg': round(stats['wait_time_total'] / stats['waits'], 4) if stats['waits'] else 0.0
+        })
+        return stats
+
+
+# Registro de pools por ruta de base de datos, compartido por todas las
+# instancias de DatabaseManager que apuntan al mismo archivo
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path, **kwargs):
+    """Obtiene (o crea) el pool asociado a una ruta de base de datos"""
+    key = os.path.abspath(db_path)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = ConnectionPool(db_path, **kwargs)
+            _pools[key] = pool
+        return pool
+
+
+# Estadísticas de checkpoints WAL por ruta de base de datos
+_checkpoint_stats = {}
+
+
 class DatabaseManager:
-    def __init__(self, db_path=DATABASE_PATH):
+    def __init__(self, db_path=DATABASE_PATH, pool_size=POOL_MAX_SIZE, pool_timeout=POOL_TIMEOUT,
+                 pragma_profile=DEFAULT_PRAGMA_PROFILE):
+        if pragma_profile not in PRAGMA_PROFILES:
+            raise ValueError(f"Perfil de PRAGMA desconocido: {pragma_profile}")
+        
         self.db_path = db_path
+        # Las instancias que apuntan al mismo archivo comparten el pool
+        # (el perfil efectivo es el del primer DatabaseManager que lo crea)
+        self.pool = get_pool(
+            db_path,
+            max_size=pool_size,
+            timeout=pool_timeout,
+            on_connect=lambda conn: apply_pragma_profile(conn, pragma_profile)
+        )
+        self.pragma_profile = pragma_profile
+        self._checkpoint_stats = _checkpoint_stats.setdefault(os.path.abspath(db_path), {
+            'runs': 0,
+            'busy_runs': 0,
+            'pages_checkpointed': 0,
+            'last_mode': None,
+            'last_run': None,
+            'last_result': None,
+            'last_duration_ms': None
+        })
     
     @contextmanager
     def get_connection(self):
         """Context manager para manejar conexiones de base de datos"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row  # Para acceder a columnas por nombre
-        try:
+        with self.pool.connection() as conn:
             yield conn
-        finally:
-            conn.close()
+    
+    def get_pool_stats(self):
+        """Obtiene las métricas del pool de conexiones"""
+        return self.pool.get_stats()
+    
+    def close_connections(self):
+        """Cierra las conexiones del pool (por ejemplo, antes de reemplazar la BD)"""
+        self.pool.reset()
+    
+    def pause_connections(self, timeout=None):
+        """
+        Espera a que se devuelvan las conexiones en uso, las cierra y bloquea las
+        nuevas hasta resume_connections(). Se usa mientras se reemplaza el archivo de BD.
+        """
+        self.pool.drain(timeout)
+    
+    def resume_connections(self):
+        """Vuelve a entregar conexiones después de pause_connections()"""
+        self.pool.resume()
+    
+    def checkpoint(self, mode='PASSIVE'):
+        """
+        Ejecuta un checkpoint del WAL y registra sus estadísticas.
+        PASSIVE nunca bloquea a lectores ni escritores; TRUNCATE además reduce el archivo -wal.
+        """
+        mode = mode.upper()
+        if mode not in CHECKPOINT_MODES:
+            raise ValueError(f"Modo de checkpoint inválido: {mode}")
+        
+        started = time.monotonic()
+        with self.get_connection() as conn:
+            busy, log_frames, checkpointed = conn.execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
+        duration_ms = round((time.monotonic() - started) * 1000, 2)
+        
+        result = {
+            'busy': bool(busy),
+            'log_frames': log_frames,
+            'checkpointed_frames': checkpointed
+        }
+        
+        stats = self._checkpoint_stats
+        stats['runs'] += 1
+        stats['busy_runs'] += 1 if busy else 0
+        stats['pages_checkpointed'] += max(checkpointed, 0)
+        stats['last_mode'] = mode
+        stats['last_run'] = datetime.now().isoformat()
+        stats['last_result'] = result
+        stats['last_duration_ms'] = duration_ms
+        
+        return result
+    
+    def get_checkpoint_stats(self):
+        """Obtiene el estado del WAL y las estadísticas de checkpoints"""
+        with self.get_connection() as conn:
+            journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+            synchronous = conn.execute("PRAGMA synchronous").fetchone()[0]
+        
+        wal_path = f"{self.db_path}-wal"
+        stats = dict(self._checkpoint_stats)
+        stats.update({
+            'pragma_profile': self.pragma_profile,
+            'journal_mode': journal_mode,
+            'synchronous': synchronous,
+            'wal_size_bytes': os.path.getsize(wal_path) if os.path.exists(wal_path) else 0
+        })
+        return stats
     
     def init_database(self):
         """Inicializa la base de datos y crea las tablas si no existen"""
@@ -186,9 +742,33 @@ class DatabaseManager:
                 )
             ''')
             
+            # Recordatorios de vencimiento ya enviados, uno por contrato y tipo.
+            # fecha_fin permite volver a avisar si el contrato se renueva.
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS reminder_ledger (
+                    contract_id INTEGER NOT NULL,
+                    reminder_type VARCHAR(20) NOT NULL,
+                    fecha_fin DATE,
+                    notified_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (contract_id, reminder_type),
+                    FOREIGN KEY (contract_id) REFERENCES contratos (id) ON DELETE CASCADE
+                )
+            ''')
+            
+            # Ejecuciones del sistema de recordatorios (la última delimita la siguiente)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS reminder_runs (
+                    run_date DATE PRIMARY KEY,
+                    ran_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    notifications_created INTEGER NOT NULL DEFAULT 0
+                )
+            ''')
+            
             # Crear índices para mejorar el rendimiento
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_contratos_cliente ON contratos(cliente_id)')
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_contratos_usuario ON contratos(usuario_responsable_id)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_contratos_estado_fin ON contratos(estado, fecha_fin)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_contratos_fecha_modificacion ON contratos(fecha_modificacion)')
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_suplementos_contrato ON suplementos(contrato_id)')
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_actividad_usuario ON actividad_sistema(usuario_id)')
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_actividad_fecha ON actividad_sistema(fecha_actividad)')
@@ -200,9 +780,230 @@ class DatabaseManager:
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_documentos_contrato ON documentos_contratos(contrato_id)')
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_documentos_fecha ON documentos_contratos(fecha_subida)')
             
+            # Índices para la paginación por cursor (el id va implícito como rowid)
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_contratos_fecha_creacion ON contratos(fecha_creacion)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_clientes_nombre ON clientes(nombre)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_proveedores_nombre ON proveedores(nombre)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_personas_nombre ON personas_responsables(nombre)')
+            
+            # Crear resumen materializado del dashboard
+            resumen_existente = cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'dashboard_summary'"
+            ).fetchone()
+            
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS dashboard_summary (
+                    ambito VARCHAR(20) NOT NULL,
+                    clave VARCHAR(20) NOT NULL,
+                    total INTEGER NOT NULL DEFAULT 0,
+                    valor REAL NOT NULL DEFAULT 0,
+                    PRIMARY KEY (ambito, clave)
+                )
+            ''')
+            
+            # Contratos activos por fecha de fin, para sumar los próximos a vencer
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS dashboard_vencimientos (
+                    fecha_fin DATE PRIMARY KEY,
+                    activos INTEGER NOT NULL DEFAULT 0
+                )
+            ''')
+            
+            for trigger in _summary_triggers():
+                cursor.execute(trigger)
+            
+            # Contador de no leídas por usuario para el badge de notificaciones
+            contadores_existentes = cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'notification_counters'"
+            ).fetchone()
+            
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS notification_counters (
+                    usuario_id INTEGER PRIMARY KEY,
+                    unread INTEGER NOT NULL DEFAULT 0
+                )
+            ''')
+            
+            for trigger in _notification_counter_triggers():
+                cursor.execute(trigger)
+            
+            # Registro de cambios para los backups automáticos
+            self.init_change_capture(cursor)
+            
+            # Crear índice de texto completo de contratos (requiere SQLite con FTS5)
+            try:
+                self._init_contratos_fts(cursor)
+            except sqlite3.OperationalError as e:
+                # Sin FTS5 la búsqueda de contratos usa LIKE
+                print(f"Búsqueda de texto completo no disponible: {e}")
+            
             conn.commit()
+            
+            # Poblar el resumen la primera vez a partir de los datos existentes
+            if not resumen_existente:
+                self.rebuild_dashboard_summary()
+            if not contadores_existentes:
+                self.reconcile_notification_counters()
+            
             print("Base de datos inicializada correctamente")
     
+    def init_change_tracking_table(self, cursor=None):
+        """Crea la tabla change_tracking y sus índices si no existen"""
+        if cursor is None:
+            with self.get_connection() as conn:
+                self.init_change_tracking_table(conn.cursor())
+                conn.commit()
+            return
+        
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS change_tracking (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                table_name TEXT NOT NULL,
+                operation TEXT NOT NULL,
+                record_id INTEGER,
+                change_data TEXT,
+                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                backup_processed BOOLEAN DEFAULT FALSE
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_change_tracking_table ON change_tracking(table_name)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_change_tracking_timestamp ON change_tracking(timestamp)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_change_tracking_processed ON change_tracking(backup_processed)')
+    
+    def init_change_capture(self, cursor):
+        """
+        Crea change_tracking, las marcas de agua por tabla y los triggers de captura.
+        La primera vez calcula las marcas de agua a partir de los cambios pendientes.
+        Solo se llama desde init_database(): los triggers necesitan las tablas capturadas.
+        """
+        marcas_existentes = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'change_watermarks'"
+        ).fetchone()
+        
+        self.init_change_tracking_table(cursor)
+        
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS change_watermarks (
+                table_name TEXT NOT NULL,
+                operation TEXT NOT NULL,
+                pending_changes INTEGER NOT NULL DEFAULT 0,
+                first_change DATETIME,
+                last_change DATETIME,
+                last_change_id INTEGER,
+                PRIMARY KEY (table_name, operation)
+            )
+        ''')
+        
+        for trigger in _change_capture_triggers():
+            cursor.execute(trigger)
+        
+        if not marcas_existentes:
+            cursor.execute('''
+                INSERT INTO change_watermarks
+                (table_name, operation, pending_changes, first_change, last_change, last_change_id)
+                SELECT table_name, operation, COUNT(*), MIN(timestamp), MAX(timestamp), MAX(id)
+                FROM change_tracking
+                WHERE backup_processed = FALSE
+                GROUP BY table_name, operation
+            ''')
+    
+    def _init_contratos_fts(self, cursor):
+        """
+        Crea la tabla FTS5 que refleja número, título y descripción de los contratos.
+        Es de contenido externo: solo guarda el índice y los triggers la mantienen al día.
+        """
+        fts_existente = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'contratos_fts'"
+        ).fetchone()
+        
+        # remove_diacritics 2: "gestion" encuentra "gestión"; prefix acelera las búsquedas "term*"
+        cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS contratos_fts USING fts5(
+                numero_contrato, titulo, descripcion,
+                content='contratos', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2',
+                prefix='2 3'
+            )
+        ''')
+        
+        nuevo = '''
+            INSERT INTO contratos_fts (rowid, numero_contrato, titulo, descripcion)
+            VALUES (NEW.id, NEW.numero_contrato, NEW.titulo, NEW.descripcion);
+        '''
+        anterior = '''
+            INSERT INTO contratos_fts (contratos_fts, rowid, numero_contrato, titulo, descripcion)
+            VALUES ('delete', OLD.id, OLD.numero_contrato, OLD.titulo, OLD.descripcion);
+        '''
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS trg_contratos_fts_insert AFTER INSERT ON contratos BEGIN {nuevo} END")
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS trg_contratos_fts_delete AFTER DELETE ON contratos BEGIN {anterior} END")
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_contratos_fts_update
+            AFTER UPDATE OF numero_contrato, titulo, descripcion ON contratos
+            BEGIN {anterior} {nuevo} END
+        ''')
+        
+        # Indexar los contratos existentes la primera vez
+        if not fts_existente:
+            cursor.execute("INSERT INTO contratos_fts (contratos_fts) VALUES ('rebuild')")
+    
+    def rebuild_dashboard_summary(self):
+        """
+        Recalcula por completo el resumen del dashboard desde contratos y suplementos.
+        Sirve para repararlo si se modificó la base de datos sin los triggers.
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM dashboard_summary")
+            cursor.execute("DELETE FROM dashboard_vencimientos")
+            cursor.execute('''
+                INSERT INTO dashboard_summary (ambito, clave, total, valor)
+                SELECT 'contratos', estado, COUNT(*), COALESCE(SUM(monto_actual), 0)
+                FROM contratos GROUP BY estado
+            ''')
+            cursor.execute('''
+                INSERT INTO dashboard_summary (ambito, clave, total, valor)
+                SELECT 'suplementos', estado, COUNT(*), COALESCE(SUM(monto_modificacion), 0)
+                FROM suplementos GROUP BY estado
+            ''')
+            cursor.execute('''
+                INSERT INTO dashboard_vencimientos (fecha_fin, activos)
+                SELECT fecha_fin, COUNT(*) FROM contratos
+                WHERE estado = 'activo' GROUP BY fecha_fin
+            ''')
+            conn.commit()
+    
+    def reconcile_notification_counters(self):
+        """
+        Compara notification_counters con el conteo real de no leídas y corrige
+        las diferencias. Retorna el número de usuarios corregidos.
+        
+        El conteo y la corrección son una sola sentencia: una notificación creada o
+        leída al mismo tiempo no puede dejar escrito un conteo desactualizado.
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            # WHERE true evita que SQLite tome ON CONFLICT como parte del SELECT
+            cursor.execute('''
+                INSERT INTO notification_counters (usuario_id, unread)
+                SELECT usuario_id, unread FROM (
+                    SELECT usuario_id, SUM(unread) AS unread FROM (
+                        SELECT usuario_id, COUNT(*) AS unread FROM notificaciones
+                        WHERE is_read = 0 GROUP BY usuario_id
+                        UNION ALL
+                        SELECT usuario_id, 0 FROM notification_counters
+                    )
+                    GROUP BY usuario_id
+                    EXCEPT
+                    SELECT usuario_id, unread FROM notification_counters
+                )
+                WHERE true
+                ON CONFLICT(usuario_id) DO UPDATE SET unread = excluded.unread
+            ''')
+            corregidos = cursor.rowcount
+            conn.commit()
+            return corregidos
+    
+    @_timed_query
     def execute_query(self, query, params=None):
         """Ejecuta una consulta y retorna los resultados"""
         with self.get_connection() as conn:
@@ -213,6 +1014,7 @@ class DatabaseManager:
                 cursor.execute(query)
             return cursor.fetchall()
     
+    @_timed_query
     def execute_insert(self, query, params=None):
         """Ejecuta una inserción y retorna el ID del registro creado"""
         with self.get_connection() as conn:
@@ -224,6 +1026,7 @@ class DatabaseManager:
             conn.commit()
             return cursor.lastrowid
     
+    @_timed_query
     def execute_update(self, query, params=None):
         """Ejecuta una actualización y retorna el número de filas afectadas"""
         with self.get_connection() as conn:
@@ -234,6 +1037,15 @@ class DatabaseManager:
                 cursor.execute(query)
             conn.commit()
             return cursor.rowcount
+    
+    @_timed_query
+    def execute_many(self, query, params_list):
+        """Ejecuta la misma sentencia para cada juego de parámetros en una sola transacción"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.executemany(query, params_list)
+            conn.commit()
+            return cursor.rowcount
 
 # Instancia global del manejador de base de datos
 db_manager = DatabaseManager()
\ No newline at end of file
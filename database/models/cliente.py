@@ -8,8 +8,16 @@ if database_dir not in sys.path:
     sys.path.insert(0, database_dir)
 
 from database import db_manager
+from .identity_map import identity_mapped, evict, store_many
+from .reference_cache import cached_reference, invalidates_reference_cache
+from .pagination import build_page, keyset_filter, order_by, search_filter
 
 class Cliente:
+    # Orden estable de los listados paginados
+    PAGE_KEY = ['nombre', 'id']
+    # Columnas en las que busca el parámetro search de get_all
+    SEARCH_COLUMNS = ['nombre', 'rfc', 'email', 'telefono', 'contacto_principal']
+    
     def __init__(self, id=None, nombre=None, tipo_cliente=None, rfc=None, direccion=None, telefono=None, email=None, contacto_principal=None, fecha_creacion=None, activo=True):
         self.id = id
         self.nombre = nombre
@@ -22,8 +30,10 @@ class Cliente:
         self.fecha_creacion = fecha_creacion
         self.activo = activo
     
+    @invalidates_reference_cache
     def save(self):
         """Guarda o actualiza el cliente en la base de datos"""
+        evict(type(self).__name__, self.id)
         if self.id:
             # Actualizar cliente existente
             query = '''
@@ -44,6 +54,7 @@ class Cliente:
         return self
     
     @classmethod
+    @identity_mapped
     def get_by_id(cls, cliente_id):
         """Obtiene un cliente por su ID"""
         query = "SELECT * FROM clientes WHERE id = ?"
@@ -65,6 +76,34 @@ class Cliente:
         return None
     
     @classmethod
+    def get_by_ids(cls, ids):
+        """Obtiene clientes por lista de IDs"""
+        if not ids:
+            return []
+        
+        placeholders = ','.join(['?' for _ in ids])
+        query = f"SELECT * FROM clientes WHERE id IN ({placeholders})"
+        
+        results = db_manager.execute_query(query, list(ids))
+        clientes = []
+        for row in results:
+            clientes.append(cls(
+                id=row['id'],
+                nombre=row['nombre'],
+                tipo_cliente=row['tipo_cliente'],
+                rfc=row['rfc'],
+                direccion=row['direccion'],
+                telefono=row['telefono'],
+                email=row['email'],
+                contacto_principal=row['contacto_principal'],
+                fecha_creacion=row['fecha_creacion'],
+                activo=row['activo']
+            ))
+        store_many(cls.__name__, clientes)
+        return clientes
+    
+    @classmethod
+    @cached_reference()
     def get_by_tipo(cls, tipo_cliente, activos_solo=True):
         """Obtiene clientes por tipo (cliente o proveedor)"""
         query = "SELECT * FROM clientes WHERE tipo_cliente = ?"
@@ -93,17 +132,47 @@ class Cliente:
         return clientes
     
     @classmethod
-    def get_all(cls, activos_solo=True):
-        """Obtiene todos los clientes"""
+    @cached_reference()
+    def get_all(cls, activos_solo=True, tipo_cliente=None, cursor=None, page_size=None, search=None):
+        """
+        Obtiene todos los clientes
+        
+        Con page_size retorna una Page ordenada por nombre cuyo next_cursor
+        se pasa como cursor para obtener la página siguiente. search filtra con
+        LIKE por las columnas que se muestran en el listado.
+        """
         query = "SELECT * FROM clientes"
+        condiciones = []
         params = []
         
         if activos_solo:
-            query += " WHERE activo = 1"
+            condiciones.append("activo = 1")
         
-        query += " ORDER BY nombre"
+        if tipo_cliente:
+            condiciones.append("tipo_cliente = ?")
+            params.append(tipo_cliente)
         
-        results = db_manager.execute_query(query, params)
+        busqueda, busqueda_params = search_filter(cls.SEARCH_COLUMNS, search)
+        if busqueda:
+            condiciones.append(busqueda)
+            params.extend(busqueda_params)
+        
+        if page_size:
+            keyset, keyset_params = keyset_filter(cls.PAGE_KEY, cursor)
+            if keyset:
+                condiciones.append(keyset)
+                params.extend(keyset_params)
+        
+        if condiciones:
+            query += " WHERE " + " AND ".join(condiciones)
+        
+        query += order_by(cls.PAGE_KEY)
+        
+        if page_size:
+            query += " LIMIT ?"
+            params.append(page_size + 1)
+        
+        results = db_manager.execute_query(query, params if params else None)
         clientes = []
         for row in results:
             clientes.append(cls(
@@ -118,4 +187,6 @@ class Cliente:
                 fecha_creacion=row['fecha_creacion'],
                 activo=row['activo']
             ))
+        if page_size:
+            clientes = build_page(clientes, page_size, lambda obj: (obj.nombre, obj.id))
         return clientes
\ No newline at end of file
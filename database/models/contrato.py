@@ -1,4 +1,5 @@
 from datetime import datetime, date
+import sqlite3
 import sys
 import os
 
@@ -8,8 +9,15 @@ if database_dir not in sys.path:
     sys.path.insert(0, database_dir)
 
 from database import db_manager
+from .identity_map import identity_mapped, evict, store_many
+from .relations import load_relations
+from .pagination import build_page, keyset_filter, order_by
+from .fulltext import build_match_query, highlight_html, MARK_START, MARK_END, SNIPPET_TOKENS
 
 class Contrato:
+    # Orden estable de los listados paginados
+    PAGE_KEY = ['fecha_creacion', 'id']
+    
     def __init__(self, id=None, numero_contrato=None, cliente_id=None, usuario_responsable_id=None, persona_responsable_id=None, titulo=None, descripcion=None, monto_original=None, monto_actual=None, fecha_inicio=None, fecha_fin=None, estado='borrador', tipo_contrato=None, fecha_creacion=None, fecha_modificacion=None):
         self.id = id
         self.numero_contrato = numero_contrato
@@ -26,9 +34,11 @@ class Contrato:
         self.tipo_contrato = tipo_contrato
         self.fecha_creacion = fecha_creacion
         self.fecha_modificacion = fecha_modificacion
+        self._relations = {}  # Relaciones precargadas con include=[...]
     
     def save(self):
         """Guarda o actualiza el contrato en la base de datos"""
+        evict(type(self).__name__, self.id)
         if self.id:
             # Actualizar contrato existente
             query = '''
@@ -56,6 +66,7 @@ class Contrato:
         return self
     
     @classmethod
+    @identity_mapped
     def get_by_id(cls, contrato_id):
         """Obtiene un contrato por su ID"""
         query = "SELECT * FROM contratos WHERE id = ?"
@@ -82,16 +93,73 @@ class Contrato:
         return None
     
     @classmethod
-    def get_all(cls, estado=None):
-        """Obtiene todos los contratos, opcionalmente filtrados por estado"""
+    def get_by_ids(cls, ids):
+        """Obtiene contratos por lista de IDs"""
+        if not ids:
+            return []
+        
+        placeholders = ','.join(['?' for _ in ids])
+        query = f"SELECT * FROM contratos WHERE id IN ({placeholders})"
+        
+        results = db_manager.execute_query(query, list(ids))
+        contratos = []
+        for row in results:
+            contratos.append(cls(
+                id=row['id'],
+                numero_contrato=row['numero_contrato'],
+                cliente_id=row['cliente_id'],
+                usuario_responsable_id=row['usuario_responsable_id'],
+                persona_responsable_id=row['persona_responsable_id'] if 'persona_responsable_id' in row.keys() else None,
+                titulo=row['titulo'],
+                descripcion=row['descripcion'],
+                monto_original=row['monto_original'],
+                monto_actual=row['monto_actual'],
+                fecha_inicio=row['fecha_inicio'],
+                fecha_fin=row['fecha_fin'],
+                estado=row['estado'],
+                tipo_contrato=row['tipo_contrato'],
+                fecha_creacion=row['fecha_creacion'],
+                fecha_modificacion=row['fecha_modificacion']
+            ))
+        store_many(cls.__name__, contratos)
+        return contratos
+    
+    @classmethod
+    def get_all(cls, estado=None, include=None, limit=None, cursor=None, page_size=None, cliente_id=None):
+        """
+        Obtiene todos los contratos, opcionalmente filtrados por estado y cliente.
+        include: relaciones a precargar en lote ('cliente', 'persona_responsable', 'usuario_responsable')
+        
+        Con page_size retorna una Page (los más recientes primero) cuyo next_cursor
+        se pasa como cursor para obtener la página siguiente.
+        """
         query = "SELECT * FROM contratos"
+        condiciones = []
         params = []
         
         if estado:
-            query += " WHERE estado = ?"
+            condiciones.append("estado = ?")
             params.append(estado)
         
-        query += " ORDER BY fecha_creacion DESC"
+        if cliente_id:
+            condiciones.append("cliente_id = ?")
+            params.append(cliente_id)
+        
+        if page_size:
+            keyset, keyset_params = keyset_filter(cls.PAGE_KEY, cursor, descending=True)
+            if keyset:
+                condiciones.append(keyset)
+                params.extend(keyset_params)
+            limit = page_size + 1
+        
+        if condiciones:
+            query += " WHERE " + " AND ".join(condiciones)
+        
+        query += order_by(cls.PAGE_KEY, descending=True)
+        
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
         
         results = db_manager.execute_query(query, params if params else None)
         contratos = []
@@ -113,10 +181,12 @@ class Contrato:
                 fecha_creacion=row['fecha_creacion'],
                 fecha_modificacion=row['fecha_modificacion']
             ))
-        return contratos
+        if page_size:
+            contratos = build_page(contratos, page_size, lambda c: (c.fecha_creacion, c.id))
+        return cls.load_relations(contratos, include)
     
     @classmethod
-    def get_by_cliente(cls, cliente_id, estado=None):
+    def get_by_cliente(cls, cliente_id, estado=None, include=None):
         """Obtiene todos los contratos de un cliente específico"""
         query = "SELECT * FROM contratos WHERE cliente_id = ?"
         params = [cliente_id]
@@ -147,11 +217,77 @@ class Contrato:
                 fecha_creacion=row['fecha_creacion'],
                 fecha_modificacion=row['fecha_modificacion']
             ))
-        return contratos
+        return cls.load_relations(contratos, include)
     
     @classmethod
-    def search(cls, search_term, cliente_id=None, estado=None):
-        """Busca contratos por número, título o descripción"""
+    def search(cls, search_term, cliente_id=None, estado=None, include=None, limit=None):
+        """
+        Busca contratos por número, título o descripción.
+        
+        Usa el índice FTS5 (prefijos, sin distinguir acentos, ordenado por relevancia BM25)
+        y deja en cada contrato titulo_resaltado y fragmento con las coincidencias en <mark>.
+        Si la base de datos no tiene FTS5 se recurre a LIKE.
+        """
+        match = build_match_query(search_term)
+        if not match:
+            return []
+        
+        filtros = ""
+        params = []
+        if cliente_id:
+            filtros += " AND c.cliente_id = ?"
+            params.append(cliente_id)
+        
+        if estado:
+            filtros += " AND c.estado = ?"
+            params.append(estado)
+        
+        limite = " LIMIT ?" if limit else ""
+        if limit:
+            params.append(limit)
+        
+        # Pesos BM25 por columna: número, título, descripción
+        query = f"""SELECT c.*,
+                          highlight(contratos_fts, 1, ?, ?) AS titulo_resaltado,
+                          snippet(contratos_fts, 2, ?, ?, '…', ?) AS fragmento
+                   FROM contratos_fts
+                   JOIN contratos c ON c.id = contratos_fts.rowid
+                   WHERE contratos_fts MATCH ?{filtros}
+                   ORDER BY bm25(contratos_fts, 10.0, 5.0, 1.0), c.fecha_creacion DESC{limite}"""
+        marcas = [MARK_START, MARK_END, MARK_START, MARK_END, SNIPPET_TOKENS, match]
+        
+        try:
+            results = db_manager.execute_query(query, marcas + params)
+        except sqlite3.OperationalError:
+            return cls._search_like(search_term, cliente_id, estado, include, limit)
+        
+        contratos = []
+        for row in results:
+            contrato = cls(
+                id=row['id'],
+                numero_contrato=row['numero_contrato'],
+                cliente_id=row['cliente_id'],
+                usuario_responsable_id=row['usuario_responsable_id'],
+                persona_responsable_id=row['persona_responsable_id'] if 'persona_responsable_id' in row.keys() else None,
+                titulo=row['titulo'],
+                descripcion=row['descripcion'],
+                monto_original=row['monto_original'],
+                monto_actual=row['monto_actual'],
+                fecha_inicio=row['fecha_inicio'],
+                fecha_fin=row['fecha_fin'],
+                estado=row['estado'],
+                tipo_contrato=row['tipo_contrato'],
+                fecha_creacion=row['fecha_creacion'],
+                fecha_modificacion=row['fecha_modificacion']
+            )
+            contrato.titulo_resaltado = highlight_html(row['titulo_resaltado'])
+            contrato.fragmento = highlight_html(row['fragmento'])
+            contratos.append(contrato)
+        return cls.load_relations(contratos, include)
+    
+    @classmethod
+    def _search_like(cls, search_term, cliente_id=None, estado=None, include=None, limit=None):
+        """Búsqueda con LIKE para bases de datos sin el índice FTS5"""
         query = """SELECT * FROM contratos 
                    WHERE (numero_contrato LIKE ? OR titulo LIKE ? OR descripcion LIKE ?)"""
         params = [f'%{search_term}%', f'%{search_term}%', f'%{search_term}%']
@@ -166,15 +302,19 @@ class Contrato:
         
         query += " ORDER BY fecha_creacion DESC"
         
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+        
         results = db_manager.execute_query(query, params)
         contratos = []
         for row in results:
-            contratos.append(cls(
+            contrato = cls(
                 id=row['id'],
                 numero_contrato=row['numero_contrato'],
                 cliente_id=row['cliente_id'],
                 usuario_responsable_id=row['usuario_responsable_id'],
-                persona_responsable_id=row.get('persona_responsable_id'),
+                persona_responsable_id=row['persona_responsable_id'] if 'persona_responsable_id' in row.keys() else None,
                 titulo=row['titulo'],
                 descripcion=row['descripcion'],
                 monto_original=row['monto_original'],
@@ -185,19 +325,43 @@ class Contrato:
                 tipo_contrato=row['tipo_contrato'],
                 fecha_creacion=row['fecha_creacion'],
                 fecha_modificacion=row['fecha_modificacion']
-            ))
-        return contratos
+            )
+            contrato.titulo_resaltado = None
+            contrato.fragmento = None
+            contratos.append(contrato)
+        return cls.load_relations(contratos, include)
     
     def delete(self):
         """Elimina el contrato de la base de datos"""
+        evict(type(self).__name__, self.id)
         if self.id:
             query = "DELETE FROM contratos WHERE id = ?"
             db_manager.execute_update(query, (self.id,))
             return True
         return False
     
+    @classmethod
+    def _relation_loaders(cls):
+        """Relaciones que se pueden precargar con include=[...]"""
+        from .cliente import Cliente
+        from .persona_responsable import PersonaResponsable
+        from .usuario import Usuario
+        return {
+            'cliente': ('cliente_id', Cliente.get_by_ids),
+            'persona_responsable': ('persona_responsable_id',
+                                    lambda ids: PersonaResponsable.get_by_ids(ids, activos_solo=False)),
+            'usuario_responsable': ('usuario_responsable_id', Usuario.get_by_ids)
+        }
+    
+    @classmethod
+    def load_relations(cls, contratos, include):
+        """Precarga relaciones de una lista de contratos con una consulta por relación"""
+        return load_relations(contratos, include, cls._relation_loaders())
+    
     def get_cliente(self):
         """Obtiene el cliente asociado al contrato"""
+        if 'cliente' in self._relations:
+            return self._relations['cliente']
         if self.cliente_id:
             from .cliente import Cliente
             return Cliente.get_by_id(self.cliente_id)
@@ -205,11 +369,22 @@ class Contrato:
     
     def get_persona_responsable(self):
         """Obtiene la persona responsable asociada al contrato"""
+        if 'persona_responsable' in self._relations:
+            return self._relations['persona_responsable']
         if self.persona_responsable_id:
             from .persona_responsable import PersonaResponsable
             return PersonaResponsable.get_by_id(self.persona_responsable_id)
         return None
     
+    def get_usuario_responsable(self):
+        """Obtiene el usuario responsable del contrato"""
+        if 'usuario_responsable' in self._relations:
+            return self._relations['usuario_responsable']
+        if self.usuario_responsable_id:
+            from .usuario import Usuario
+            return Usuario.get_by_id(self.usuario_responsable_id)
+        return None
+    
     def get_documentos(self):
         """Obtiene todos los documentos asociados al contrato"""
         from .documento_contrato import DocumentoContrato
@@ -8,6 +8,7 @@ if database_dir not in sys.path:
     sys.path.insert(0, database_dir)
 
 from database import db_manager
+from .identity_map import identity_mapped, evict
 
 class DocumentoContrato:
     def __init__(self, id=None, contrato_id=None, nombre_archivo=None, ruta_archivo=None, tipo_documento=None, tamaño_archivo=None, fecha_subida=None, usuario_subida_id=None):
@@ -22,6 +23,7 @@ class DocumentoContrato:
     
     def save(self):
         """Guarda el documento en la base de datos"""
+        evict(type(self).__name__, self.id)
         if self.id:
             # Actualizar documento existente
             query = '''
@@ -61,6 +63,7 @@ class DocumentoContrato:
         return documentos
     
     @classmethod
+    @identity_mapped
     def get_by_id(cls, documento_id):
         """Obtiene un documento por su ID"""
         query = "SELECT * FROM documentos_contratos WHERE id = ?"
@@ -81,6 +84,7 @@ class DocumentoContrato:
     
     def delete(self):
         """Elimina el documento de la base de datos"""
+        evict(type(self).__name__, self.id)
         if self.id:
             query = "DELETE FROM documentos_contratos WHERE id = ?"
             db_manager.execute_update(query, (self.id,))
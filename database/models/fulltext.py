@@ -0,0 +1,34 @@
+# Utilidades para las búsquedas de texto completo con SQLite FTS5
+import re
+from html import escape
+
+# Marcadores que FTS5 inserta alrededor de cada coincidencia. Son caracteres de control
+# para poder escapar el texto como HTML antes de convertirlos en <mark>.
+MARK_START = '\x02'
+MARK_END = '\x03'
+
+# Longitud en tokens de los fragmentos generados con snippet()
+SNIPPET_TOKENS = 16
+
+
+def build_match_query(search_term):
+    """
+    Convierte el texto del usuario en una expresión MATCH de FTS5.
+    
+    Cada palabra se entrecomilla (así la sintaxis de FTS5 del usuario no provoca errores)
+    y se busca como prefijo; todas las palabras deben aparecer.
+    
+    Returns:
+        str: Expresión MATCH, o None si el texto no contiene palabras
+    """
+    tokens = re.findall(r'\w+', search_term or '')
+    if not tokens:
+        return None
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def highlight_html(texto):
+    """Escapa el texto de FTS5 como HTML y convierte los marcadores en <mark>"""
+    if texto is None:
+        return None
+    return escape(texto).replace(MARK_START, '<mark>').replace(MARK_END, '</mark>')
@@ -0,0 +1,92 @@
+# Mapa de identidad por petición: cada registro se consulta una sola vez por request
+import threading
+from functools import wraps
+from flask import g, has_request_context
+
+# Contadores acumulados por modelo desde que arrancó el proceso
+_stats = {}
+_stats_lock = threading.Lock()
+
+_MISSING = object()
+
+
+def _current_map():
+    """Retorna el mapa de la petición actual, o None fuera de una petición"""
+    if not has_request_context():
+        return None
+    mapa = getattr(g, '_identity_map', None)
+    if mapa is None:
+        mapa = g._identity_map = {}
+    return mapa
+
+
+def _key(obj_id):
+    """Normaliza el ID para que '5' y 5 compartan la misma entrada"""
+    try:
+        return int(obj_id)
+    except (TypeError, ValueError):
+        return obj_id
+
+
+def _count(model, resultado):
+    with _stats_lock:
+        contadores = _stats.setdefault(model, {'hits': 0, 'misses': 0})
+        contadores[resultado] += 1
+
+
+def store_many(model, objetos):
+    """Guarda en el mapa los objetos obtenidos por una consulta en lote"""
+    mapa = _current_map()
+    if mapa is not None:
+        for obj in objetos:
+            mapa[(model, _key(obj.id))] = obj
+
+
+def evict(model, obj_id):
+    """Elimina un objeto del mapa, por ejemplo al guardarlo o eliminarlo"""
+    mapa = _current_map()
+    if mapa and obj_id is not None:
+        mapa.pop((model, _key(obj_id)), None)
+
+
+def evict_all(model):
+    """Elimina todos los objetos de un modelo, tras un UPDATE que afecta a varias filas"""
+    mapa = _current_map()
+    if mapa:
+        for clave in [clave for clave in mapa if clave[0] == model]:
+            del mapa[clave]
+
+
+def identity_mapped(get_by_id):
+    """
+    Decorador para los get_by_id de los modelos: consulta primero el mapa de la
+    petición y solo va a la base de datos si el registro no se ha cargado todavía.
+    Fuera de una petición (scripts, tareas programadas) no cachea nada.
+    """
+    @wraps(get_by_id)
+    def wrapper(cls, obj_id):
+        mapa = _current_map()
+        if mapa is None:
+            return get_by_id(cls, obj_id)
+        
+        model = cls.__name__
+        obj = mapa.get((model, _key(obj_id)), _MISSING)
+        if obj is not _MISSING:
+            _count(model, 'hits')
+            return obj
+        
+        _count(model, 'misses')
+        obj = get_by_id(cls, obj_id)
+        mapa[(model, _key(obj_id))] = obj
+        return obj
+    return wrapper
+
+
+def get_stats():
+    """Aciertos y fallos acumulados por modelo"""
+    with _stats_lock:
+        stats = {}
+        for model, contadores in _stats.items():
+            total = contadores['hits'] + contadores['misses']
+            stats[model] = dict(contadores, hit_rate=round(contadores['hits'] / total, 3) if total else 0.0)
+        return stats
@@ -7,9 +7,14 @@ database_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 if database_dir not in sys.path:
     sys.path.insert(0, database_dir)
 
+from collections import Counter
 from database import db_manager
+from .notification_bus import notification_bus
 
 class Notificacion:
+    # Tipos permitidos por la tabla notificaciones
+    TYPES = ('system', 'contract_expiring', 'contract_expired', 'user', 'report')
+    
     def __init__(self, id=None, usuario_id=None, title=None, message=None, type='system', is_read=False, created_at=None, contract_id=None):
         self.id = id
         self.usuario_id = usuario_id
@@ -31,6 +36,7 @@ class Notificacion:
             '''
             params = (self.usuario_id, self.title, self.message, self.type, self.is_read, self.contract_id, self.id)
             db_manager.execute_update(query, params)
+            notification_bus.invalidate(self.usuario_id)
         else:
             # Crear nueva notificación
             query = '''
@@ -39,8 +45,50 @@ class Notificacion:
             '''
             params = (self.usuario_id, self.title, self.message, self.type, self.is_read, self.contract_id)
             self.id = db_manager.execute_insert(query, params)
+            if not self.is_read:
+                notification_bus.publish(self.usuario_id, 1)
         return self
     
+    @classmethod
+    def create_many(cls, notificaciones, cursor=None):
+        """
+        Inserta varias notificaciones nuevas en una sola transacción.
+        Retorna el número de notificaciones creadas (no asigna los id).
+        
+        Con cursor, las inserciones forman parte de la transacción del llamador:
+        no se confirman ni se publican; el llamador hace commit y después
+        llama a publish_created().
+        """
+        if not notificaciones:
+            return 0
+        
+        query = '''
+            INSERT INTO notificaciones (usuario_id, title, message, type, is_read, contract_id)
+            VALUES (?, ?, ?, ?, ?, ?)
+        '''
+        params = [(n.usuario_id, n.title, n.message, n.type, n.is_read, n.contract_id) for n in notificaciones]
+        if cursor is not None:
+            cursor.executemany(query, params)
+            return len(params)
+        
+        created = db_manager.execute_many(query, params)
+        cls.publish_created(notificaciones)
+        return created
+    
+    @classmethod
+    def publish_created(cls, notificaciones):
+        """Avisa al bus de las notificaciones no leídas ya confirmadas en la BD"""
+        for usuario_id, nuevas in Counter(n.usuario_id for n in notificaciones if not n.is_read).items():
+            notification_bus.publish(usuario_id, nuevas)
+    
+    @classmethod
+    def create_for_users(cls, usuario_ids, title, message, type='system', contract_id=None):
+        """Envía la misma notificación a varios usuarios en una sola transacción"""
+        return cls.create_many([
+            cls(usuario_id=usuario_id, title=title, message=message, type=type, contract_id=contract_id)
+            for usuario_id in usuario_ids
+        ])
+    
     @classmethod
     def get_by_user(cls, usuario_id, limit=50, unread_only=False):
         """Obtiene notificaciones de un usuario específico"""
@@ -70,22 +118,37 @@ class Notificacion:
     
     @classmethod
     def get_unread_count(cls, usuario_id):
-        """Obtiene el número de notificaciones no leídas de un usuario"""
-        query = "SELECT COUNT(*) as count FROM notificaciones WHERE usuario_id = ? AND is_read = 0"
+        """Obtiene el número de notificaciones no leídas de un usuario (mantenido por triggers)"""
+        query = "SELECT unread FROM notification_counters WHERE usuario_id = ?"
         result = db_manager.execute_query(query, (usuario_id,))
-        return result[0]['count'] if result else 0
+        return result[0]['unread'] if result else 0
+    
+    @classmethod
+    def reconcile_unread_counts(cls):
+        """Corrige los contadores de no leídas que no coincidan con las notificaciones"""
+        repaired = db_manager.reconcile_notification_counters()
+        if repaired:
+            notification_bus.invalidate()
+        return repaired
+    
+    @classmethod
+    def get_cached_unread_count(cls, usuario_id):
+        """Contador de no leídas desde el bus de notificaciones (se consulta solo la primera vez)"""
+        return notification_bus.get_count(usuario_id, cls.get_unread_count)
     
     @classmethod
     def mark_as_read(cls, notification_id):
         """Marca una notificación como leída"""
-        query = "UPDATE notificaciones SET is_read = 1 WHERE id = ?"
-        db_manager.execute_update(query, (notification_id,))
+        result = db_manager.execute_query("SELECT usuario_id FROM notificaciones WHERE id = ?", (notification_id,))
+        query = "UPDATE notificaciones SET is_read = 1 WHERE id = ? AND is_read = 0"
+        if db_manager.execute_update(query, (notification_id,)) and result:
+            notification_bus.publish(result[0]['usuario_id'], -1)
     
     @classmethod
     def mark_all_as_read(cls, usuario_id):
         """Marca todas las notificaciones de un usuario como leídas"""
-        query = "UPDATE notificaciones SET is_read = 1 WHERE usuario_id = ?"
-        db_manager.execute_update(query, (usuario_id,))
+        query = "UPDATE notificaciones SET is_read = 1 WHERE usuario_id = ? AND is_read = 0"
+        notification_bus.publish(usuario_id, -db_manager.execute_update(query, (usuario_id,)))
     
     @classmethod
     def create_system_notification(cls, usuario_id, title, message):
@@ -132,7 +195,8 @@ class Notificacion:
     def delete_old_notifications(cls, days=30):
         """Elimina notificaciones antiguas (por defecto más de 30 días)"""
         query = "DELETE FROM notificaciones WHERE created_at < datetime('now', '-{} days')".format(days)
-        db_manager.execute_update(query)
+        if db_manager.execute_update(query):
+            notification_bus.invalidate()
     
     def to_dict(self):
         """Convierte la notificación a diccionario para JSON"""
@@ -0,0 +1,112 @@
+# Bus de eventos en proceso para los contadores de notificaciones no leídas
+import queue
+import threading
+
+# Configuración por defecto
+NOTIFICATION_SUBSCRIBER_QUEUE = 100   # Eventos pendientes como máximo por conexión
+
+
+class NotificationBus:
+    """
+    Publica los cambios del contador de no leídas de cada usuario.
+    
+    Los métodos de escritura de Notificacion publican deltas (+n al crear, -n al
+    marcar como leídas) o invalidan el contador cuando no conocen el cambio
+    exacto. Cada conexión SSE se suscribe con una cola propia.
+    
+    El contador se guarda en memoria y se carga con la consulta de la base de
+    datos la primera vez que se pide. Cada usuario tiene una generación, igual que
+    en ReferenceCache: un conteo leído antes de un cambio no se guarda.
+    
+    El bus vive en el proceso: con varios procesos cada uno ve solo sus escrituras.
+    """
+    
+    def __init__(self, max_queue=NOTIFICATION_SUBSCRIBER_QUEUE):
+        self.max_queue = max_queue
+        
+        self._lock = threading.Lock()
+        self._counts = {}        # usuario_id -> no leídas
+        self._generations = {}   # usuario_id -> generación
+        self._subscribers = {}   # usuario_id -> colas de las conexiones abiertas
+        self._stats = {'hits': 0, 'misses': 0, 'published': 0, 'dropped': 0}
+    
+    def get_count(self, usuario_id, loader):
+        """
+        Retorna el contador de no leídas del usuario. Si no está en memoria lo
+        obtiene con loader(usuario_id).
+        """
+        with self._lock:
+            if usuario_id in self._counts:
+                self._stats['hits'] += 1
+                return self._counts[usuario_id]
+            self._stats['misses'] += 1
+            generacion = self._generations.get(usuario_id, 0)
+        
+        count = loader(usuario_id)
+        
+        with self._lock:
+            if self._generations.get(usuario_id, 0) == generacion:
+                self._counts[usuario_id] = count
+        return count
+    
+    def publish(self, usuario_id, delta):
+        """Aplica un delta al contador del usuario y avisa a sus conexiones"""
+        if not delta:
+            return
+        
+        with self._lock:
+            if usuario_id in self._counts:
+                self._counts[usuario_id] = max(0, self._counts[usuario_id] + delta)
+            else:
+                self._generations[usuario_id] = self._generations.get(usuario_id, 0) + 1
+            self._notify(usuario_id, delta)
+    
+    def invalidate(self, usuario_id=None):
+        """
+        Descarta el contador de un usuario (o de todos) para que se vuelva a
+        consultar. Se usa cuando la escritura no permite conocer el delta exacto.
+        """
+        with self._lock:
+            usuarios = [usuario_id] if usuario_id is not None else list(
+                set(self._counts) | set(self._subscribers)
+            )
+            for usuario in usuarios:
+                self._counts.pop(usuario, None)
+                self._generations[usuario] = self._generations.get(usuario, 0) + 1
+                self._notify(usuario, None)
+    
+    def _notify(self, usuario_id, delta):
+        """Encola el evento en cada conexión del usuario (con el lock tomado)"""
+        for cola in self._subscribers.get(usuario_id, ()):
+            try:
+                cola.put_nowait(delta)
+                self._stats['published'] += 1
+            except queue.Full:
+                # Un cliente que no lee no debe bloquear las escrituras
+                self._stats['dropped'] += 1
+    
+    def subscribe(self, usuario_id):
+        """Registra una conexión y retorna la cola donde recibirá los deltas"""
+        cola = queue.Queue(maxsize=self.max_queue)
+        with self._lock:
+            self._subscribers.setdefault(usuario_id, set()).add(cola)
+        return cola
+    
+    def unsubscribe(self, usuario_id, cola):
+        with self._lock:
+            colas = self._subscribers.get(usuario_id)
+            if colas is not None:
+                colas.discard(cola)
+                if not colas:
+                    del self._subscribers[usuario_id]
+    
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['cached_users'] = len(self._counts)
+            stats['subscribers'] = sum(len(colas) for colas in self._subscribers.values())
+        return stats
+
+
+# Instancia compartida por el modelo Notificacion y la ruta de eventos
+notification_bus = NotificationBus()
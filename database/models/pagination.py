@@ -0,0 +1,111 @@
+# Paginación por cursor (keyset) para los listados de los modelos
+import base64
+import json
+
+# Tamaño de página por defecto y máximo permitido desde las rutas
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class Page(list):
+    """
+    Lista de resultados de una página. Se comporta como una lista normal
+    y además expone next_cursor (None si no hay más resultados).
+    """
+    
+    def __init__(self, items=(), next_cursor=None):
+        super().__init__(items)
+        self.next_cursor = next_cursor
+    
+    @property
+    def has_more(self):
+        return self.next_cursor is not None
+
+
+def clamp_page_size(limit, default=DEFAULT_PAGE_SIZE):
+    """Normaliza el tamaño de página solicitado al rango permitido"""
+    try:
+        limit = int(limit) if limit is not None else default
+    except (TypeError, ValueError):
+        limit = default
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def encode_cursor(values):
+    """Codifica los valores de la última fila de una página como token opaco"""
+    data = json.dumps(list(values), separators=(',', ':'), default=str)
+    return base64.urlsafe_b64encode(data.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token, size):
+    """
+    Decodifica un token generado por encode_cursor.
+    
+    Raises:
+        ValueError: Si el token no es válido
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Cursor inválido: {token}") from e
+    
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError(f"Cursor inválido: {token}")
+    return values
+
+
+def keyset_filter(columns, cursor, descending=False):
+    """
+    Construye la condición que continúa después del cursor.
+    
+    Args:
+        columns (list): Columnas del ORDER BY; la última debe ser única (normalmente id)
+        cursor (str): Token recibido del cliente, o None para la primera página
+        descending (bool): True si el orden es descendente
+    
+    Returns:
+        tuple: (condición SQL o None, parámetros)
+    """
+    if not cursor:
+        return None, []
+    
+    values = decode_cursor(cursor, len(columns))
+    operator = '<' if descending else '>'
+    return f"({', '.join(columns)}) {operator} ({', '.join('?' for _ in columns)})", values
+
+
+def search_filter(columns, term):
+    """
+    Condición LIKE sobre varias columnas para el parámetro de búsqueda de los listados.
+    
+    Returns:
+        tuple: (condición SQL o None si no hay término, parámetros)
+    """
+    term = (term or '').strip()
+    if not term:
+        return None, []
+    
+    patron = f"%{term}%"
+    return '(' + ' OR '.join(f"{column} LIKE ?" for column in columns) + ')', [patron] * len(columns)
+
+
+def order_by(columns, descending=False):
+    """Cláusula ORDER BY estable para las columnas del cursor"""
+    direction = ' DESC' if descending else ''
+    return ' ORDER BY ' + ', '.join(f"{column}{direction}" for column in columns)
+
+
+def build_page(items, limit, key):
+    """
+    Arma la página a partir de limit + 1 resultados.
+    
+    Args:
+        items (list): Resultados consultados con LIMIT limit + 1
+        limit (int): Tamaño de página
+        key (callable): Devuelve los valores del cursor de un elemento
+    """
+    if len(items) > limit:
+        items = items[:limit]
+        return Page(items, encode_cursor(key(items[-1])))
+    return Page(items)
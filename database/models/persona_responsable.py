@@ -8,8 +8,17 @@ if database_dir not in sys.path:
     sys.path.insert(0, database_dir)
 
 from database import db_manager
+from .identity_map import identity_mapped, evict, store_many
+from .reference_cache import cached_reference, invalidates_reference_cache
+from .pagination import build_page, keyset_filter, order_by, search_filter
 
 class PersonaResponsable:
+    # Orden estable de los listados paginados
+    PAGE_KEY = ['nombre', 'id']
+    # Columnas en las que busca el parámetro search de get_all
+    SEARCH_COLUMNS = ['nombre', 'cargo', 'email', 'telefono',
+                      '(SELECT nombre FROM clientes WHERE clientes.id = personas_responsables.cliente_id)']
+    
     def __init__(self, id=None, cliente_id=None, nombre=None, cargo=None, telefono=None, email=None, es_principal=False, fecha_creacion=None, activo=True, documento_path=None, observaciones=None):
         self.id = id
         self.cliente_id = cliente_id
@@ -23,8 +32,10 @@ class PersonaResponsable:
         self.documento_path = documento_path
         self.observaciones = observaciones
     
+    @invalidates_reference_cache
     def save(self):
         """Guarda o actualiza la persona responsable en la base de datos"""
+        evict(type(self).__name__, self.id)
         if self.id:
             # Actualizar persona existente
             query = '''
@@ -46,6 +57,7 @@ class PersonaResponsable:
             return self.id
     
     @classmethod
+    @identity_mapped
     def get_by_id(cls, persona_id):
         """Obtiene una persona responsable por su ID"""
         query = "SELECT * FROM personas_responsables WHERE id = ?"
@@ -96,8 +108,10 @@ class PersonaResponsable:
             ))
         return personas
     
+    @invalidates_reference_cache
     def delete(self):
         """Elimina la persona responsable de la base de datos (eliminación física)"""
+        evict(type(self).__name__, self.id)
         if not self.id:
             raise ValueError("No se puede eliminar una persona sin ID")
         
@@ -123,16 +137,21 @@ class PersonaResponsable:
         return False
 
     @classmethod
-    def get_by_ids(cls, ids):
+    def get_by_ids(cls, ids, activos_solo=True):
         """Obtiene personas responsables por lista de IDs"""
         if not ids:
             return []
         
         # Crear placeholders para la consulta IN
         placeholders = ','.join(['?' for _ in ids])
-        query = f"SELECT * FROM personas_responsables WHERE id IN ({placeholders}) AND activo = 1 ORDER BY nombre"
+        query = f"SELECT * FROM personas_responsables WHERE id IN ({placeholders})"
+        
+        if activos_solo:
+            query += " AND activo = 1"
         
-        results = db_manager.execute_query(query, ids)
+        query += " ORDER BY nombre"
+        
+        results = db_manager.execute_query(query, list(ids))
         personas = []
         for row in results:
             personas.append(cls(
@@ -148,6 +167,7 @@ class PersonaResponsable:
                 documento_path=row['documento_path'] if 'documento_path' in row.keys() else None,
                 observaciones=row['observaciones'] if 'observaciones' in row.keys() else None
             ))
+        store_many(cls.__name__, personas)
         return personas
     
     @classmethod
@@ -187,15 +207,41 @@ class PersonaResponsable:
         return personas
     
     @classmethod
-    def get_all(cls, activos_solo=True):
-        """Obtiene todas las personas responsables"""
+    @cached_reference()
+    def get_all(cls, activos_solo=True, cursor=None, page_size=None, search=None):
+        """
+        Obtiene todas las personas responsables
+        
+        Con page_size retorna una Page ordenada por nombre cuyo next_cursor
+        se pasa como cursor para obtener la página siguiente. search filtra con
+        LIKE por las columnas que se muestran en el listado.
+        """
         query = "SELECT * FROM personas_responsables"
+        condiciones = []
         params = []
         
         if activos_solo:
-            query += " WHERE activo = 1"
+            condiciones.append("activo = 1")
         
-        query += " ORDER BY nombre"
+        busqueda, busqueda_params = search_filter(cls.SEARCH_COLUMNS, search)
+        if busqueda:
+            condiciones.append(busqueda)
+            params.extend(busqueda_params)
+        
+        if page_size:
+            keyset, keyset_params = keyset_filter(cls.PAGE_KEY, cursor)
+            if keyset:
+                condiciones.append(keyset)
+                params.extend(keyset_params)
+        
+        if condiciones:
+            query += " WHERE " + " AND ".join(condiciones)
+        
+        query += order_by(cls.PAGE_KEY)
+        
+        if page_size:
+            query += " LIMIT ?"
+            params.append(page_size + 1)
         
         results = db_manager.execute_query(query, params if params else None)
         personas = []
@@ -213,4 +259,6 @@ class PersonaResponsable:
                 documento_path=row['documento_path'] if 'documento_path' in row.keys() else None,
                 observaciones=row['observaciones'] if 'observaciones' in row.keys() else None
             ))
+        if page_size:
+            personas = build_page(personas, page_size, lambda obj: (obj.nombre, obj.id))
         return personas
\ No newline at end of file
@@ -8,8 +8,16 @@ if database_dir not in sys.path:
     sys.path.insert(0, database_dir)
 
 from database import db_manager
+from .identity_map import identity_mapped, evict
+from .reference_cache import cached_reference, invalidates_reference_cache
+from .pagination import build_page, keyset_filter, order_by, search_filter
 
 class Proveedor:
+    # Orden estable de los listados paginados
+    PAGE_KEY = ['nombre', 'id']
+    # Columnas en las que busca el parámetro search de get_all
+    SEARCH_COLUMNS = ['nombre', 'rfc', 'email', 'telefono', 'contacto_principal']
+    
     def __init__(self, id=None, nombre=None, tipo_proveedor=None, rfc=None, direccion=None, telefono=None, email=None, contacto_principal=None, fecha_creacion=None, activo=True):
         self.id = id
         self.nombre = nombre
@@ -22,8 +30,10 @@ class Proveedor:
         self.fecha_creacion = fecha_creacion
         self.activo = activo
     
+    @invalidates_reference_cache
     def save(self):
         """Guarda o actualiza el proveedor en la base de datos"""
+        evict(type(self).__name__, self.id)
         if self.id:
             # Actualizar proveedor existente
             query = '''
@@ -44,6 +54,7 @@ class Proveedor:
         return self
     
     @classmethod
+    @identity_mapped
     def get_by_id(cls, proveedor_id):
         """Obtiene un proveedor por su ID"""
         query = "SELECT * FROM proveedores WHERE id = ?"
@@ -92,8 +103,10 @@ class Proveedor:
             ))
         return proveedores
     
+    @invalidates_reference_cache
     def delete(self):
         """Elimina físicamente el proveedor de la base de datos"""
+        evict(type(self).__name__, self.id)
         if self.id:
             query = "DELETE FROM proveedores WHERE id = ?"
             db_manager.execute_update(query, (self.id,))
@@ -101,17 +114,43 @@ class Proveedor:
         return False
     
     @classmethod
-    def get_all(cls, activos_solo=True):
-        """Obtiene todos los proveedores"""
+    @cached_reference()
+    def get_all(cls, activos_solo=True, cursor=None, page_size=None, search=None):
+        """
+        Obtiene todos los proveedores
+        
+        Con page_size retorna una Page ordenada por nombre cuyo next_cursor
+        se pasa como cursor para obtener la página siguiente. search filtra con
+        LIKE por las columnas que se muestran en el listado.
+        """
         query = "SELECT * FROM proveedores"
+        condiciones = []
         params = []
         
         if activos_solo:
-            query += " WHERE activo = 1"
+            condiciones.append("activo = 1")
         
-        query += " ORDER BY nombre"
+        busqueda, busqueda_params = search_filter(cls.SEARCH_COLUMNS, search)
+        if busqueda:
+            condiciones.append(busqueda)
+            params.extend(busqueda_params)
         
-        results = db_manager.execute_query(query, params)
+        if page_size:
+            keyset, keyset_params = keyset_filter(cls.PAGE_KEY, cursor)
+            if keyset:
+                condiciones.append(keyset)
+                params.extend(keyset_params)
+        
+        if condiciones:
+            query += " WHERE " + " AND ".join(condiciones)
+        
+        query += order_by(cls.PAGE_KEY)
+        
+        if page_size:
+            query += " LIMIT ?"
+            params.append(page_size + 1)
+        
+        results = db_manager.execute_query(query, params if params else None)
         proveedores = []
         for row in results:
             proveedores.append(cls(
@@ -126,4 +165,6 @@ class Proveedor:
                 fecha_creacion=row['fecha_creacion'],
                 activo=row['activo']
             ))
+        if page_size:
+            proveedores = build_page(proveedores, page_size, lambda obj: (obj.nombre, obj.id))
         return proveedores
\ No newline at end of file
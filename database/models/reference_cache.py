@@ -0,0 +1,201 @@
+# Caché de datos de referencia compartida entre peticiones (listas de clientes, usuarios...)
+import copy
+import sys
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from .pagination import Page
+
+# Configuración por defecto
+REFERENCE_CACHE_TTL = 300                      # Segundos que una lista se considera vigente
+REFERENCE_CACHE_MAX_ENTRIES = 256              # Máximo de listas en caché
+REFERENCE_CACHE_MAX_BYTES = 16 * 1024 * 1024   # Tamaño estimado máximo (~16 MB)
+
+
+def _estimate_size(valor):
+    """Estimación aproximada de la memoria ocupada por un resultado de consulta"""
+    objetos = valor if isinstance(valor, list) else [valor]
+    total = sys.getsizeof(valor)
+    for obj in objetos:
+        if obj is None:
+            continue
+        total += sys.getsizeof(obj)
+        for atributo in getattr(obj, '__dict__', {}).values():
+            total += sys.getsizeof(atributo)
+    return total
+
+
+def _copy_result(valor):
+    """
+    Copia superficial de cada objeto: los llamadores pueden modificar los objetos
+    recibidos (por ejemplo, agregar atributos para la plantilla) sin alterar la caché.
+    """
+    if isinstance(valor, Page):
+        return Page([copy.copy(obj) for obj in valor], valor.next_cursor)
+    if isinstance(valor, list):
+        return [copy.copy(obj) for obj in valor]
+    return copy.copy(valor)
+
+
+class ReferenceCache:
+    """
+    Caché LRU con expiración por tiempo y límite de memoria estimada.
+    
+    Las entradas se agrupan por modelo para invalidarlas juntas cuando el modelo
+    se modifica. Cada modelo tiene una generación: un resultado consultado antes de
+    una invalidación no se guarda, aunque termine de cargarse después.
+    """
+    
+    def __init__(self, ttl=REFERENCE_CACHE_TTL, max_entries=REFERENCE_CACHE_MAX_ENTRIES,
+                 max_bytes=REFERENCE_CACHE_MAX_BYTES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # clave -> (valor, tamaño, expira)
+        self._bytes = 0
+        self._generations = {}          # modelo -> generación
+        self._stats = {}                # modelo -> contadores
+    
+    def _model_stats(self, model):
+        return self._stats.setdefault(model, {
+            'hits': 0, 'misses': 0, 'expirations': 0, 'evictions': 0, 'invalidations': 0
+        })
+    
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+    
+    def generation(self, model):
+        with self._lock:
+            return self._generations.get(model, 0)
+    
+    def get(self, key):
+        """
+        Busca una entrada vigente.
+        
+        Returns:
+            tuple: (encontrado, valor)
+        """
+        model = key[0]
+        with self._lock:
+            stats = self._model_stats(model)
+            entry = self._entries.get(key)
+            if entry is None:
+                stats['misses'] += 1
+                return False, None
+            
+            valor, _, expira = entry
+            if expira <= time.monotonic():
+                self._remove(key)
+                stats['expirations'] += 1
+                stats['misses'] += 1
+                return False, None
+            
+            self._entries.move_to_end(key)
+            stats['hits'] += 1
+            return True, valor
+    
+    def put(self, key, valor, generation, ttl=None):
+        """Guarda una entrada si el modelo no se invalidó mientras se consultaba"""
+        model = key[0]
+        size = _estimate_size(valor)
+        if size > self.max_bytes:
+            return
+        
+        with self._lock:
+            if self._generations.get(model, 0) != generation:
+                return
+            
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (valor, size, time.monotonic() + (ttl or self.ttl))
+            self._bytes += size
+            
+            # Desalojar las entradas menos usadas hasta respetar los límites
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                old_key = next(iter(self._entries))
+                self._remove(old_key)
+                self._model_stats(old_key[0])['evictions'] += 1
+    
+    def invalidate(self, model):
+        """Elimina todas las entradas de un modelo"""
+        with self._lock:
+            self._generations[model] = self._generations.get(model, 0) + 1
+            for key in [key for key in self._entries if key[0] == model]:
+                self._remove(key)
+            self._model_stats(model)['invalidations'] += 1
+    
+    def clear(self):
+        """Vacía la caché completa (por ejemplo, tras restaurar la base de datos)"""
+        with self._lock:
+            for model in set(self._generations) | {key[0] for key in self._entries}:
+                self._generations[model] = self._generations.get(model, 0) + 1
+            self._entries.clear()
+            self._bytes = 0
+    
+    def get_stats(self):
+        """Estadísticas globales y por modelo"""
+        with self._lock:
+            modelos = {}
+            for model, contadores in self._stats.items():
+                total = contadores['hits'] + contadores['misses']
+                modelos[model] = dict(contadores, hit_rate=round(contadores['hits'] / total, 3) if total else 0.0)
+            
+            hits = sum(c['hits'] for c in self._stats.values())
+            misses = sum(c['misses'] for c in self._stats.values())
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'estimated_bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'ttl_seconds': self.ttl,
+                'hits': hits,
+                'misses': misses,
+                'hit_rate': round(hits / (hits + misses), 3) if hits + misses else 0.0,
+                'models': modelos
+            }
+
+
+# Instancia global compartida por todos los modelos
+reference_cache = ReferenceCache()
+
+
+def cached_reference(ttl=None):
+    """
+    Decorador para métodos de clase que retornan datos de referencia.
+    La clave incluye el modelo, el método y los argumentos.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(cls, *args, **kwargs):
+            key = (cls.__name__, func.__name__, args, tuple(sorted(kwargs.items())))
+            try:
+                hash(key)
+            except TypeError:
+                # Argumentos no cacheables: consultar directamente
+                return func(cls, *args, **kwargs)
+            
+            found, valor = reference_cache.get(key)
+            if not found:
+                generation = reference_cache.generation(cls.__name__)
+                valor = func(cls, *args, **kwargs)
+                reference_cache.put(key, valor, generation, ttl)
+            return _copy_result(valor)
+        return wrapper
+    return decorator
+
+
+def invalidates_reference_cache(func):
+    """Decorador para save()/delete(): invalida la caché del modelo después de escribir"""
+    @wraps(func)
+    def wrapper(self_or_cls, *args, **kwargs):
+        try:
+            return func(self_or_cls, *args, **kwargs)
+        finally:
+            model = self_or_cls if isinstance(self_or_cls, type) else type(self_or_cls)
+            reference_cache.invalidate(model.__name__)
+    return wrapper
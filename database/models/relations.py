@@ -0,0 +1,38 @@
+# Carga de relaciones en lote para evitar consultas N+1 en los modelos
+
+# Máximo de IDs por consulta IN (...), por debajo del límite de variables de SQLite
+BATCH_SIZE = 500
+
+
+def load_relations(objetos, include, relaciones):
+    """
+    Resuelve relaciones de una lista de objetos con una consulta IN (...) por relación.
+
+    Args:
+        objetos (list): Instancias del modelo (deben tener el atributo _relations)
+        include (list): Nombres de las relaciones a cargar
+        relaciones (dict): nombre -> (atributo de clave foránea, función que recibe
+                           una lista de IDs y retorna los objetos relacionados)
+
+    Returns:
+        list: Los mismos objetos, con las relaciones cacheadas en _relations
+    """
+    if not objetos or not include:
+        return objetos
+
+    for nombre in include:
+        if nombre not in relaciones:
+            raise ValueError(f"Relación desconocida: {nombre}")
+
+        atributo, cargar = relaciones[nombre]
+        ids = sorted({getattr(obj, atributo) for obj in objetos if getattr(obj, atributo)})
+
+        encontrados = {}
+        for i in range(0, len(ids), BATCH_SIZE):
+            for relacionado in cargar(ids[i:i + BATCH_SIZE]):
+                encontrados[relacionado.id] = relacionado
+
+        for obj in objetos:
+            obj._relations[nombre] = encontrados.get(getattr(obj, atributo))
+
+    return objetos
@@ -8,6 +8,7 @@ if database_dir not in sys.path:
     sys.path.insert(0, database_dir)
 
 from database import db_manager
+from .relations import load_relations
 
 class Suplemento:
     def __init__(self, id=None, contrato_id=None, numero_suplemento=None, tipo_modificacion=None, descripcion=None, monto_modificacion=0, fecha_modificacion=None, usuario_autoriza_id=None, estado='pendiente', fecha_creacion=None):
@@ -21,6 +22,7 @@ class Suplemento:
         self.usuario_autoriza_id = usuario_autoriza_id
         self.estado = estado
         self.fecha_creacion = fecha_creacion
+        self._relations = {}  # Relaciones precargadas con include=[...]
     
     def save(self):
         """Guarda o actualiza el suplemento en la base de datos"""
@@ -69,8 +71,11 @@ class Suplemento:
         return suplementos
     
     @classmethod
-    def get_all(cls):
-        """Obtiene todos los suplementos"""
+    def get_all(cls, include=None):
+        """
+        Obtiene todos los suplementos.
+        include: relaciones a precargar en lote ('contrato', 'usuario_autoriza')
+        """
         query = "SELECT * FROM suplementos ORDER BY fecha_creacion DESC"
         results = db_manager.execute_query(query)
         suplementos = []
@@ -87,4 +92,37 @@ class Suplemento:
                 estado=row['estado'],
                 fecha_creacion=row['fecha_creacion']
             ))
-        return suplementos
\ No newline at end of file
+        return cls.load_relations(suplementos, include)
+    
+    @classmethod
+    def _relation_loaders(cls):
+        """Relaciones que se pueden precargar con include=[...]"""
+        from .contrato import Contrato
+        from .usuario import Usuario
+        return {
+            'contrato': ('contrato_id', Contrato.get_by_ids),
+            'usuario_autoriza': ('usuario_autoriza_id', Usuario.get_by_ids)
+        }
+    
+    @classmethod
+    def load_relations(cls, suplementos, include):
+        """Precarga relaciones de una lista de suplementos con una consulta por relación"""
+        return load_relations(suplementos, include, cls._relation_loaders())
+    
+    def get_contrato(self):
+        """Obtiene el contrato al que pertenece el suplemento"""
+        if 'contrato' in self._relations:
+            return self._relations['contrato']
+        if self.contrato_id:
+            from .contrato import Contrato
+            return Contrato.get_by_id(self.contrato_id)
+        return None
+    
+    def get_usuario_autoriza(self):
+        """Obtiene el usuario que autoriza el suplemento"""
+        if 'usuario_autoriza' in self._relations:
+            return self._relations['usuario_autoriza']
+        if self.usuario_autoriza_id:
+            from .usuario import Usuario
+            return Usuario.get_by_id(self.usuario_autoriza_id)
+        return None
\ No newline at end of file
@@ -8,6 +8,8 @@ if database_dir not in sys.path:
     sys.path.insert(0, database_dir)
 
 from database import db_manager
+from .identity_map import identity_mapped, evict, store_many
+from .reference_cache import cached_reference, invalidates_reference_cache
 
 class Usuario:
     def __init__(self, id=None, nombre=None, email=None, username=None, password=None, telefono=None, cargo=None, departamento=None, es_admin=False, fecha_creacion=None, activo=True, rol='user'):
@@ -24,8 +26,10 @@ class Usuario:
         self.activo = activo
         self.rol = rol  # 'admin', 'user', 'guest', 'viewer'
     
+    @invalidates_reference_cache
     def save(self):
         """Guarda o actualiza el usuario en la base de datos"""
+        evict(type(self).__name__, self.id)
         if self.id:
             # Actualizar usuario existente
             query = '''
@@ -46,6 +50,7 @@ class Usuario:
         return self
     
     @classmethod
+    @identity_mapped
     def get_by_id(cls, user_id):
         """Obtiene un usuario por su ID"""
         query = "SELECT * FROM usuarios WHERE id = ?"
@@ -68,6 +73,35 @@ class Usuario:
             )
         return None
     
+    @classmethod
+    def get_by_ids(cls, ids):
+        """Obtiene usuarios por lista de IDs"""
+        if not ids:
+            return []
+        
+        placeholders = ','.join(['?' for _ in ids])
+        query = f"SELECT * FROM usuarios WHERE id IN ({placeholders})"
+        
+        results = db_manager.execute_query(query, list(ids))
+        usuarios = []
+        for row in results:
+            usuarios.append(cls(
+                id=row['id'],
+                nombre=row['nombre'],
+                email=row['email'],
+                username=row['username'] if 'username' in row.keys() else None,
+                password=row['password'] if 'password' in row.keys() else None,
+                telefono=row['telefono'],
+                cargo=row['cargo'],
+                departamento=row['departamento'],
+                es_admin=row['es_admin'] if 'es_admin' in row.keys() else False,
+                fecha_creacion=row['fecha_creacion'],
+                activo=row['activo'],
+                rol=row['rol'] if 'rol' in row.keys() else 'user'
+            ))
+        store_many(cls.__name__, usuarios)
+        return usuarios
+    
     @classmethod
     def get_by_username(cls, username):
         """Obtiene un usuario por su username"""
@@ -104,6 +138,7 @@ class Usuario:
         return password
     
     @classmethod
+    @cached_reference()
     def get_all(cls, activos_solo=True):
         """Obtiene todos los usuarios"""
         query = "SELECT * FROM usuarios"
@@ -157,8 +192,10 @@ class Usuario:
             ))
         return usuarios
     
+    @invalidates_reference_cache
     def delete(self):
         """Elimina el usuario de la base de datos (eliminación física)"""
+        evict(type(self).__name__, self.id)
         if not self.id:
             raise ValueError("No se puede eliminar un usuario sin ID")
         
@@ -168,8 +205,10 @@ class Usuario:
         return True
     
     @classmethod
+    @invalidates_reference_cache
     def delete_by_id(cls, user_id):
         """Elimina un usuario por su ID (eliminación física)"""
+        evict(cls.__name__, user_id)
         query = "DELETE FROM usuarios WHERE id = ?"
         db_manager.execute_update(query, (user_id,))
         return True
\ No newline at end of file
@@ -2,10 +2,12 @@ from flask import Blueprint, request, jsonify, send_file, session, url_for
 from functools import wraps
 from datetime import datetime
 from pathlib import Path
-from services.backup_service import BackupService
-from services.restore_service import RestoreService
+from services.backup_service import BackupService, get_snapshot_progress
+from services.restore_service import RestoreService, get_validation_progress
 from services.change_detection_service import ChangeDetectionService
 from services.backup_scheduler import get_backup_scheduler
+from services.archive_service import ArchiveService
+from .decorators import api_admin_required
 import os
 import zipfile
 
@@ -29,6 +31,7 @@ backup_bp = Blueprint('backup', __name__, url_prefix='/api/backup')
 backup_service = BackupService()
 restore_service = RestoreService()
 change_detection_service = ChangeDetectionService()
+archive_service = ArchiveService()
 
 @backup_bp.route('/create', methods=['POST'])
 @api_login_required
@@ -50,7 +53,8 @@ def create_backup():
         result = backup_service.create_backup(
             backup_type='manual',
             reason=reason,
-            custom_name=backup_name
+            custom_name=backup_name,
+            verify_integrity=bool(data.get('verify_integrity', False))
         )
         
         if result.get('success', False):
@@ -449,6 +453,9 @@ def upload_backup():
                 'error': 'El archivo está corrupto o no es un archivo ZIP válido'
             }), 400
         
+        # Registrar el backup importado en el catálogo
+        backup_service.catalog.record(backup_path, 'imported')
+        
         # Obtener tamaño del archivo
         file_size_mb = round(backup_path.stat().st_size / (1024 * 1024), 2)
         
@@ -596,8 +603,9 @@ def validate_backup():
             }), 400
         
         backup_path = data['backup_path']
+        mode = data.get('mode', 'fast')
         
-        result = restore_service.validate_backup(backup_path)
+        result = restore_service.validate_backup(backup_path, mode)
         
         return jsonify(result), 200 if result.get('valid', False) else 400
         
@@ -642,12 +650,19 @@ def backup_status():
                 for backup in backups.get(backup_type, []):
                     backup_stats['total_size_mb'] += backup.get('size_mb', 0)
         
+        # Estado del WAL, checkpoints y pool de conexiones
+        database_status = backup_service.db_manager.get_checkpoint_stats()
+        database_status['pool'] = backup_service.db_manager.get_pool_stats()
+        
         return jsonify({
             'success': True,
             'scheduler_status': scheduler_status,
             'pending_changes': changes_info,
             'last_backup': last_backup_info,
-            'backup_stats': backup_stats
+            'backup_stats': backup_stats,
+            'database': database_status,
+            'snapshot_progress': get_snapshot_progress(),
+            'validation_progress': get_validation_progress()
         }), 200
         
     except Exception as e:
@@ -811,4 +826,49 @@ def get_restore_history():
         return jsonify({
             'success': False,
             'error': str(e)
-        }), 500
\ No newline at end of file
+        }), 500
+
+@backup_bp.route('/archives', methods=['GET'])
+@api_admin_required
+def list_archives():
+    """
+    Lista los archivos mensuales de actividad y notificaciones
+    """
+    try:
+        return jsonify({
+            'success': True,
+            'archives': archive_service.list_archives(request.args.get('table'))
+        }), 200
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@backup_bp.route('/archives/<table>', methods=['GET'])
+@api_admin_required
+def query_archive(table):
+    """
+    Consulta las filas archivadas de una tabla (parámetros: from, to, usuario_id, limit)
+    """
+    try:
+        filtros = {}
+        if request.args.get('usuario_id'):
+            filtros['usuario_id'] = request.args.get('usuario_id', type=int)
+        
+        result = archive_service.query_archive(
+            table,
+            desde=request.args.get('from'),
+            hasta=request.args.get('to'),
+            filtros=filtros,
+            limit=request.args.get('limit', 100, type=int)
+        )
+        
+        return jsonify(result), 200 if result.get('success', False) else 400
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
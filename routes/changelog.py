@@ -2,17 +2,11 @@ from flask import Blueprint, render_template, redirect, url_for, session
 from functools import wraps
 from datetime import datetime
 import requests
-from database.models import Usuario, Notificacion
+from database.models import Usuario
+from .utils import get_notificaciones_count
 
 changelog_bp = Blueprint('changelog', __name__)
 
-# Función helper para obtener contador de notificaciones
-def get_notificaciones_count():
-    """Obtiene el número de notificaciones no leídas del usuario actual"""
-    if 'user_id' in session:
-        return Notificacion.get_unread_count(session['user_id'])
-    return 0
-
 # Decorador para requerir login
 def login_required(f):
     @wraps(f)
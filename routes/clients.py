@@ -1,11 +1,24 @@
 from flask import Blueprint, render_template, redirect, url_for, session, flash, jsonify, request
 from datetime import datetime, timedelta
 from database.models import Usuario, Cliente, Contrato, Notificacion
+from services.contract_stats import ContractStatsService
 from .decorators import login_required, admin_required, api_login_required
-from .utils import get_notificaciones_count, get_current_user_id, create_success_response, create_error_response
+from .utils import get_notificaciones_count, get_current_user_id, create_success_response, create_error_response, get_pagination_args, pagination_info
 
 clients_bp = Blueprint('clients', __name__)
 
+def obtener_estadisticas_contratos_clientes(clientes):
+    """
+    Obtiene el total de contratos y el valor de los contratos activos de una lista
+    de clientes a partir de una única consulta agrupada por cliente
+    """
+    stats_por_cliente = ContractStatsService().get_stats_by_cliente()
+    stats_clientes = [stats_por_cliente[c.id] for c in clientes if c.id in stats_por_cliente]
+    
+    contratos_totales = sum(stats['total_contratos'] for stats in stats_clientes)
+    valor_total = sum(stats['valor_total'] for stats in stats_clientes)
+    return contratos_totales, valor_total
+
 # ===== RUTAS DE CLIENTES =====
 
 @clients_bp.route('/api/clientes/personas-recientes', methods=['GET'])
@@ -102,18 +115,16 @@ def api_get_estadisticas_clientes():
         clientes_db = Cliente.get_all()
         clientes = [c for c in clientes_db if c.tipo_cliente == 'cliente']
         
-        # Obtener contratos para estadísticas
-        contratos = Contrato.get_all()
+        # Obtener estadísticas de contratos agregadas por cliente
+        contratos_totales, valor_total_clientes = obtener_estadisticas_contratos_clientes(clientes)
         
         # Calcular estadísticas básicas
         total_clientes = len(clientes)
         clientes_activos = len([c for c in clientes if c.activo])
-        contratos_clientes = [c for c in contratos if any(cl.id == c.cliente_id for cl in clientes)]
-        valor_total_clientes = sum([c.monto_actual for c in contratos_clientes if c.estado == 'activo'])
         
         # Calcular estadísticas adicionales
         porcentaje_activos = round((clientes_activos / total_clientes * 100) if total_clientes > 0 else 0, 1)
-        valor_promedio = int(valor_total_clientes / len(contratos_clientes)) if contratos_clientes else 0
+        valor_promedio = int(valor_total_clientes / contratos_totales) if contratos_totales else 0
         
         # Estadísticas por mes (simuladas para el ejemplo)
         fecha_actual = datetime.now()
@@ -121,12 +132,12 @@ def api_get_estadisticas_clientes():
         
         # Simular cambios mensuales
         cambio_clientes = max(0, int(total_clientes * 0.1))  # 10% de crecimiento simulado
-        cambio_contratos = max(0, int(len(contratos_clientes) * 0.05))  # 5% de crecimiento simulado
+        cambio_contratos = max(0, int(contratos_totales * 0.05))  # 5% de crecimiento simulado
         
         estadisticas = {
             'total_clientes': total_clientes,
             'clientes_activos': clientes_activos,
-            'contratos_totales': len(contratos_clientes),
+            'contratos_totales': contratos_totales,
             'valor_promedio': valor_promedio,
             'porcentaje_activos': porcentaje_activos,
             'cambio_clientes': cambio_clientes,
@@ -156,20 +167,18 @@ def clientes():
         clientes_db = Cliente.get_all()
         clientes = [c for c in clientes_db if c.tipo_cliente == 'cliente']
         
-        # Obtener contratos para estadísticas
-        contratos = Contrato.get_all()
+        # Obtener estadísticas de contratos agregadas por cliente
+        contratos_totales, valor_total_clientes = obtener_estadisticas_contratos_clientes(clientes)
         
         # Calcular estadísticas de clientes
         total_clientes = len(clientes)
         clientes_activos = len([c for c in clientes if c.activo])
-        contratos_clientes = [c for c in contratos if any(cl.id == c.cliente_id for cl in clientes)]
-        valor_total_clientes = sum([c.monto_actual for c in contratos_clientes if c.estado == 'activo'])
         
         estadisticas = {
             'total_clientes': total_clientes,
             'clientes_activos': clientes_activos,
-            'contratos_totales': len(contratos_clientes),
-            'valor_promedio': int(valor_total_clientes / len(contratos_clientes)) if contratos_clientes else 0
+            'contratos_totales': contratos_totales,
+            'valor_promedio': int(valor_total_clientes / contratos_totales) if contratos_totales else 0
         }
         
         # Obtener contador de notificaciones
@@ -189,10 +198,11 @@ def clientes():
 @clients_bp.route('/api/clientes', methods=['GET'])
 @api_login_required
 def api_get_clientes():
-    """API para obtener lista de clientes"""
+    """API para obtener lista de clientes, paginada con ?cursor=&limit= y filtrada con ?q="""
     try:
-        clientes_db = Cliente.get_all()
-        clientes = [c for c in clientes_db if c.tipo_cliente == 'cliente']
+        cursor, page_size = get_pagination_args()
+        clientes = Cliente.get_all(tipo_cliente='cliente', cursor=cursor, page_size=page_size,
+                                   search=request.args.get('q'))
         
         clientes_data = []
         for cliente in clientes:
@@ -223,8 +233,14 @@ def api_get_clientes():
         
         return jsonify({
             'success': True,
-            'clientes': clientes_data
+            'clientes': clientes_data,
+            'pagination': pagination_info(clientes, page_size)
         })
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -326,8 +342,7 @@ def api_delete_cliente(cliente_id):
             }), 404
         
         # Verificar si el cliente tiene contratos activos
-        contratos = Contrato.get_all()
-        contratos_activos = [c for c in contratos if c.cliente_id == cliente_id and c.estado == 'activo']
+        contratos_activos = ContractStatsService().get_stats(cliente_id=cliente_id)['contratos_activos']
         
         if contratos_activos:
             return jsonify({
@@ -360,30 +375,24 @@ def api_get_clients_summary():
         clientes_db = Cliente.get_all()
         clientes = [c for c in clientes_db if c.tipo_cliente == 'cliente']
         
-        # Obtener contratos para estadísticas
-        contratos = Contrato.get_all()
+        # Obtener estadísticas de contratos agrupadas por cliente
+        stats_por_cliente = ContractStatsService().get_stats_by_cliente()
+        total_contratos = sum(stats['total_contratos'] for stats in stats_por_cliente.values())
         
         # Preparar datos de clientes con estadísticas
         clients_data = []
         for cliente in clientes:  # No limitamos aquí para permitir ordenamiento completo
-            # Contar contratos activos del cliente
-            contratos_activos = [
-                c for c in contratos 
-                if c.cliente_id == cliente.id and c.estado == 'activo'
-            ]
+            stats = stats_por_cliente.get(cliente.id)
             
-            # Calcular valor total de contratos activos
-            total_value = sum([
-                c.monto_actual 
-                for c in contratos_activos 
-                if hasattr(c, 'monto_actual') and c.monto_actual is not None
-            ])
+            # Contratos activos del cliente y su valor total
+            contratos_activos = stats['contratos_activos'] if stats else 0
+            total_value = stats['valor_total'] if stats else 0
             
             client_data = {
                 'id': cliente.id,
                 'nombre': cliente.nombre,
-                'contracts_count': len(contratos_activos),
-                'total_contracts': len(contratos_activos),  # Para compatibilidad
+                'contracts_count': contratos_activos,
+                'total_contracts': contratos_activos,  # Para compatibilidad
                 'valor_total': total_value,
                 'activo': getattr(cliente, 'activo', True)
             }
@@ -431,7 +440,7 @@ def api_get_clients_summary():
                 'estadisticas': {
                     'total_clientes': len(clientes),
                     'clientes_activos': len([c for c in clientes if getattr(c, 'activo', True)]),
-                    'total_contratos': len(contratos),
+                    'total_contratos': total_contratos,
                     'valor_total': sum(c['valor_total'] for c in clients_data)
                 },
                 'metadata': {
@@ -1,6 +1,7 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, send_file, current_app, session
 from werkzeug.utils import secure_filename
 from database.models import Contrato, Cliente, PersonaResponsable, DocumentoContrato, Suplemento, Usuario, Proveedor, Notificacion
+from services.contract_stats import ContractStatsService
 from .decorators import login_required
 from .utils import get_notificaciones_count, allowed_file, get_current_user_id, create_success_response, create_error_response
 from datetime import datetime
@@ -21,13 +22,13 @@ def listar():
     estado = request.args.get('estado')
     search = request.args.get('search', '').strip()
     
-    # Aplicar filtros
+    # Aplicar filtros (cliente y persona responsable se cargan en lote)
+    # La plantilla todavía no tiene controles de paginación: se listan todos
+    relaciones = ['cliente', 'persona_responsable']
     if search:
-        contratos = Contrato.search(search, cliente_id=cliente_id, estado=estado)
-    elif cliente_id:
-        contratos = Contrato.get_by_cliente(cliente_id, estado=estado)
+        contratos = Contrato.search(search, cliente_id=cliente_id, estado=estado, include=relaciones)
     else:
-        contratos = Contrato.get_all(estado=estado)
+        contratos = Contrato.get_all(estado=estado, cliente_id=cliente_id, include=relaciones)
     
     # Obtener datos adicionales para cada contrato
     contratos_data = []
@@ -54,54 +55,22 @@ def listar():
     # Obtener usuario actual de la sesión
     usuario_actual = Usuario.get_by_id(session['user_id'])
     
-    # Calcular estadísticas para el template
-    total_contratos = len(contratos_data)
-    contratos_activos = len([c for c in contratos_data if c['contrato'].estado == 'activo'])
+    # Calcular estadísticas para el template con una consulta agregada
+    stats_service = ContractStatsService()
+    if search:
+        stats = stats_service.get_stats(contrato_ids=[c.id for c in contratos])
+    else:
+        stats = stats_service.get_stats(cliente_id=cliente_id, estado=estado)
     
-    # Calcular valor total de contratos activos
-    valor_total = sum([c['contrato'].monto_actual for c in contratos_data if c['contrato'].estado == 'activo'])
-    valor_total_formatted = f"{valor_total/1000000:.1f}M" if valor_total > 1000000 else f"{valor_total:,.0f}"
+    total_contratos = stats['total_contratos']
+    contratos_activos = stats['contratos_activos']
+    proximos_vencer = stats['proximos_vencer']
+    contratos_pendientes = stats['contratos_pendientes']
+    contratos_vencidos = stats['contratos_vencidos']
     
-    # Contratos próximos a vencer (30 días)
-    from datetime import datetime, timedelta
-    fecha_limite = datetime.now().date() + timedelta(days=30)
-    proximos_vencer = 0
-    
-    for contrato_data in contratos_data:
-        contrato = contrato_data['contrato']
-        if contrato.estado == 'activo' and contrato.fecha_fin:
-            try:
-                if isinstance(contrato.fecha_fin, str):
-                    fecha_fin = datetime.strptime(contrato.fecha_fin, '%Y-%m-%d').date()
-                else:
-                    fecha_fin = contrato.fecha_fin
-                
-                if fecha_fin <= fecha_limite:
-                    proximos_vencer += 1
-            except (ValueError, TypeError):
-                continue
-    
-    # Calcular contratos pendientes y vencidos
-    contratos_pendientes = len([c for c in contratos_data if c['contrato'].estado == 'borrador'])
-    contratos_vencidos = 0
-    
-    # Calcular contratos vencidos (fecha_fin pasada)
-    from datetime import datetime
-    fecha_actual = datetime.now().date()
-    
-    for contrato_data in contratos_data:
-        contrato = contrato_data['contrato']
-        if contrato.estado == 'activo' and contrato.fecha_fin:
-            try:
-                if isinstance(contrato.fecha_fin, str):
-                    fecha_fin = datetime.strptime(contrato.fecha_fin, '%Y-%m-%d').date()
-                else:
-                    fecha_fin = contrato.fecha_fin
-                
-                if fecha_fin < fecha_actual:
-                    contratos_vencidos += 1
-            except (ValueError, TypeError):
-                continue
+    # Valor total de contratos activos
+    valor_total = stats['valor_total']
+    valor_total_formatted = f"{valor_total/1000000:.1f}M" if valor_total > 1000000 else f"{valor_total:,.0f}"
     
     contratos_stats = {
         'total': total_contratos,
@@ -448,15 +417,19 @@ def buscar():
     if not search_term:
         return jsonify([])
     
-    contratos = Contrato.search(search_term, cliente_id=cliente_id, estado=estado)
+    # Los 10 resultados más relevantes, con el cliente cargado en lote
+    contratos = Contrato.search(search_term, cliente_id=cliente_id, estado=estado,
+                                include=['cliente'], limit=10)
     
     results = []
-    for contrato in contratos[:10]:  # Limitar a 10 resultados
+    for contrato in contratos:
         cliente = contrato.get_cliente()
         results.append({
             'id': contrato.id,
             'numero_contrato': contrato.numero_contrato,
             'titulo': contrato.titulo,
+            'titulo_resaltado': contrato.titulo_resaltado,
+            'fragmento': contrato.fragmento,
             'cliente_nombre': cliente.nombre if cliente else 'N/A',
             'estado': contrato.estado,
             'monto_actual': float(contrato.monto_actual) if contrato.monto_actual else 0
@@ -2,6 +2,7 @@ from flask import Blueprint, request, jsonify, send_file, session
 from functools import wraps
 from services.document_service import DocumentService
 from database.models import DocumentoContrato
+from .utils import get_pagination_args, pagination_info
 import os
 
 # Decorador para requerir login (simplificado)
@@ -177,31 +178,23 @@ def get_documents_by_contract(contrato_id):
 @login_required
 def list_all_documents():
     """
-    Lista todos los documentos del sistema
+    Lista los documentos del sistema, paginados con ?cursor=&limit=
     """
     try:
-        # Parámetros de paginación opcionales
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 50, type=int)
-        
-        documents = document_service.get_all_documents()
-        
-        # Aplicar paginación simple
-        start_idx = (page - 1) * per_page
-        end_idx = start_idx + per_page
-        paginated_documents = documents[start_idx:end_idx]
+        cursor, page_size = get_pagination_args()
+        documents = document_service.get_all_documents(cursor=cursor, page_size=page_size)
         
         return jsonify({
             'success': True,
-            'documents': paginated_documents,
-            'pagination': {
-                'page': page,
-                'per_page': per_page,
-                'total_count': len(documents),
-                'total_pages': (len(documents) + per_page - 1) // per_page
-            }
+            'documents': list(documents),
+            'pagination': pagination_info(documents, page_size)
         })
         
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -1,56 +1,28 @@
-from flask import Blueprint, render_template, redirect, url_for, session, flash, jsonify
+from flask import Blueprint, render_template, redirect, url_for, session, flash, jsonify, request
 from datetime import datetime, timedelta
 import random
 from database.models import Usuario, Cliente, Contrato, Suplemento, ActividadSistema, Notificacion
-from services.system_metrics import get_system_metrics
+from database.models import identity_map
+from database.models.reference_cache import reference_cache
+from services.system_metrics import get_system_metrics, get_metrics_history
 from services.config_metrics import get_config_metrics
-from .decorators import login_required, admin_required
+from services.dashboard_summary import DashboardSummaryService
+from services.request_metrics import request_metrics
+from .decorators import login_required, admin_required, api_admin_required
 from .utils import get_notificaciones_count, get_current_user_id
 
 main_bp = Blueprint('main', __name__)
 
 def obtener_estadisticas_contratos():
-    """Obtiene estadísticas de contratos desde la base de datos"""
+    """Obtiene estadísticas de contratos desde el resumen materializado del dashboard"""
     try:
-        contratos = Contrato.get_all()
+        stats = DashboardSummaryService().get_dashboard_stats()
         
-        if not contratos:
-            return {
-                'total_contratos': 0,
-                'contratos_activos': 0,
-                'valor_total': 0,
-                'proximos_vencer': 0
-            }
-        
-        total_contratos = len(contratos)
-        contratos_activos = len([c for c in contratos if c.estado == 'activo'])
-        
-        # Calcular valor total
-        valor_total = sum([c.monto_actual for c in contratos if c.estado == 'activo'])
-        
-        # Contratos próximos a vencer (30 días)
-        fecha_limite = datetime.now().date() + timedelta(days=30)
-        proximos_vencer = 0
-        
-        for c in contratos:
-            if c.estado == 'activo' and c.fecha_fin:
-                # Convertir fecha_fin de string a date si es necesario
-                if isinstance(c.fecha_fin, str):
-                    try:
-                        fecha_fin = datetime.strptime(c.fecha_fin, '%Y-%m-%d').date()
-                    except ValueError:
-                        continue
-                else:
-                    fecha_fin = c.fecha_fin
-                
-                if fecha_fin <= fecha_limite:
-                    proximos_vencer += 1
-    
         return {
-            'total_contratos': total_contratos,
-            'contratos_activos': contratos_activos,
-            'valor_total': valor_total,
-            'proximos_vencer': proximos_vencer
+            'total_contratos': stats['total_contratos'],
+            'contratos_activos': stats['contratos_activos'],
+            'valor_total': stats['valor_total'],
+            'proximos_vencer': stats['proximos_vencer']
         }
     except Exception as e:
         return {
@@ -74,12 +46,12 @@ def dashboard():
     # Obtener estadísticas reales de la base de datos
     estadisticas = obtener_estadisticas_contratos()
     
-    # Obtener contratos recientes (últimos 5)
-    contratos = Contrato.get_all()
+    # Obtener contratos recientes (últimos 5) con cliente y responsable en lote
+    contratos = Contrato.get_all(include=['cliente', 'usuario_responsable'], limit=5)
     contratos_recientes = []
-    for contrato in contratos[:5]:
-        cliente = Cliente.get_by_id(contrato.cliente_id)
-        usuario = Usuario.get_by_id(contrato.usuario_responsable_id)
+    for contrato in contratos:
+        cliente = contrato.get_cliente()
+        usuario = contrato.get_usuario_responsable()
         contratos_recientes.append({
             'id': contrato.numero_contrato,
             'nombre': contrato.titulo,
@@ -94,9 +66,10 @@ def dashboard():
     
     # Obtener actividad reciente
     actividades = ActividadSistema.get_recent(5)
+    usuarios_actividad = {u.id: u for u in Usuario.get_by_ids(list({a.usuario_id for a in actividades if a.usuario_id}))}
     actividad_reciente = []
     for actividad in actividades:
-        usuario = Usuario.get_by_id(actividad.usuario_id) if actividad.usuario_id else None
+        usuario = usuarios_actividad.get(actividad.usuario_id)
         actividad_reciente.append({
             'usuario': usuario.nombre if usuario else 'Sistema',
             'accion': actividad.accion,
@@ -110,8 +83,12 @@ def dashboard():
     reportes_pendientes = 5
     usuarios_activos = 12
     sesiones_mes = 156
-    uptime = 99.8
-    tiempo_respuesta = 245  # ms
+    
+    # Disponibilidad (peticiones sin error 5xx) y tiempo de respuesta medidos por el
+    # middleware de métricas, sin contar los archivos estáticos
+    metricas_peticiones = request_metrics.get_summary()
+    disponibilidad = metricas_peticiones['availability']
+    tiempo_respuesta = round(metricas_peticiones['avg_ms'])  # ms
     
     estadisticas_completas = {
         'total_contratos': estadisticas['total_contratos'],
@@ -123,7 +100,7 @@ def dashboard():
         'reportes_pendientes': reportes_pendientes,
         'usuarios_activos': usuarios_activos,
         'sesiones_mes': sesiones_mes,
-        'uptime': uptime,
+        'disponibilidad': disponibilidad,
         'tiempo_respuesta': tiempo_respuesta
     }
     
@@ -149,16 +126,16 @@ def dashboard():
 
 def obtener_todos_suplementos():
     """Obtiene todos los suplementos con información enriquecida"""
-    suplementos = Suplemento.get_all()
+    suplementos = Suplemento.get_all(include=['contrato', 'usuario_autoriza'])
     
     for suplemento in suplementos:
         # Enriquecer con información del contrato
-        contrato = Contrato.get_by_id(suplemento.contrato_id)
+        contrato = suplemento.get_contrato()
         suplemento.contrato_numero = contrato.numero_contrato if contrato else 'N/A'
         suplemento.contrato_titulo = contrato.titulo if contrato else 'N/A'
         
         # Enriquecer con información del usuario
-        usuario = Usuario.get_by_id(suplemento.usuario_autoriza_id)
+        usuario = suplemento.get_usuario_autoriza()
         suplemento.usuario_autoriza_nombre = usuario.nombre if usuario else 'N/A'
     
     return suplementos
@@ -350,9 +327,12 @@ def backup():
 
 @main_bp.route('/api/system-metrics')
 def get_system_metrics_api():
-    """API endpoint para obtener métricas del sistema en tiempo real"""
+    """
+    API endpoint para obtener métricas del sistema en tiempo real.
+    Con ?history=N incluye las últimas N muestras para gráficos.
+    """
     try:
-        # Obtener métricas del sistema
+        # Última muestra del muestreador en segundo plano
         metrics = get_system_metrics()
         
         # Agregar información adicional de la aplicación
@@ -363,11 +343,56 @@ def get_system_metrics_api():
             'last_backup': 'N/A'  # Esto se podría obtener de la configuración
         }
         
-        return jsonify({
+        response = {
             'success': True,
             'metrics': metrics,
             'app_info': app_info,
             'timestamp': datetime.now().isoformat()
+        }
+        
+        history = request.args.get('history', 0, type=int)
+        if history:
+            response['history'] = get_metrics_history(history)
+        
+        return jsonify(response)
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'timestamp': datetime.now().isoformat()
+        }), 500
+
+@main_bp.route('/api/cache/stats')
+@api_admin_required
+def get_cache_stats_api():
+    """API endpoint con los aciertos y fallos de las cachés de modelos"""
+    return jsonify({
+        'success': True,
+        'identity_map': identity_map.get_stats(),
+        'reference_cache': reference_cache.get_stats(),
+        'timestamp': datetime.now().isoformat()
+    })
+
+@main_bp.route('/api/metrics/requests')
+@api_admin_required
+def get_request_metrics_api():
+    """API endpoint con la latencia, los códigos de estado y las consultas SQL por endpoint"""
+    return jsonify({
+        'success': True,
+        'metrics': request_metrics.get_stats(),
+        'timestamp': datetime.now().isoformat()
+    })
+
+@main_bp.route('/api/dashboard/summary/rebuild', methods=['POST'])
+@api_admin_required
+def rebuild_dashboard_summary_api():
+    """API endpoint para reconstruir el resumen del dashboard"""
+    try:
+        resumen = DashboardSummaryService().rebuild()
+        return jsonify({
+            'success': True,
+            'summary': resumen,
+            'timestamp': datetime.now().isoformat()
         })
     except Exception as e:
         return jsonify({
@@ -1,7 +1,18 @@
-from flask import Blueprint, jsonify, request, session, url_for
+from flask import Blueprint, Response, jsonify, request, session, url_for
 from functools import wraps
 from datetime import datetime, timedelta
-from database.models import Notificacion, Contrato
+import json
+import queue
+import time
+from database.models import Notificacion, Contrato, Usuario
+from database.models.notification_bus import notification_bus
+
+# Segundos sin eventos tras los que se envía un comentario para mantener viva la conexión SSE
+NOTIFICATION_STREAM_KEEPALIVE = 25
+# Duración máxima de cada conexión SSE: al cerrarla se libera el hilo del servidor
+# y el navegador se reconecta solo tras NOTIFICATION_STREAM_RETRY_MS
+NOTIFICATION_STREAM_MAX_AGE = 300
+NOTIFICATION_STREAM_RETRY_MS = 5000
 
 notifications_bp = Blueprint('notifications', __name__)
 
@@ -46,11 +57,10 @@ def get_notification_count():
     """Obtiene el contador de notificaciones no leídas"""
     try:
         user_id = session.get('user_id')
-        unread_notifications = Notificacion.get_by_user(user_id, unread_only=True)
         
         return jsonify({
             'success': True,
-            'count': len(unread_notifications)
+            'count': Notificacion.get_cached_unread_count(user_id)
         })
     except Exception as e:
         return jsonify({
@@ -58,6 +68,44 @@ def get_notification_count():
             'message': f'Error al obtener contador: {str(e)}'
         }), 500
 
+@notifications_bp.route('/api/notifications/stream')
+@api_login_required
+def notification_stream():
+    """
+    Envía por Server-Sent Events el contador de no leídas cada vez que cambia,
+    en lugar de que el navegador lo consulte periódicamente. La conexión se
+    cierra tras NOTIFICATION_STREAM_MAX_AGE segundos y EventSource se reconecta.
+    """
+    user_id = session.get('user_id')
+    
+    def _event(delta):
+        data = {'count': Notificacion.get_cached_unread_count(user_id), 'delta': delta}
+        return f"event: count\ndata: {json.dumps(data)}\n\n"
+    
+    def generate():
+        cola = notification_bus.subscribe(user_id)
+        deadline = time.monotonic() + NOTIFICATION_STREAM_MAX_AGE
+        try:
+            yield f"retry: {NOTIFICATION_STREAM_RETRY_MS}\n\n"
+            yield _event(None)
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                try:
+                    delta = cola.get(timeout=min(NOTIFICATION_STREAM_KEEPALIVE, remaining))
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                yield _event(delta)
+        finally:
+            notification_bus.unsubscribe(user_id, cola)
+    
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
 @notifications_bp.route('/api/notifications/<int:notification_id>/read', methods=['POST'])
 @api_login_required
 def mark_notification_read(notification_id):
@@ -96,7 +144,10 @@ def mark_all_notifications_read():
 @notifications_bp.route('/api/notifications/create', methods=['POST'])
 @api_login_required
 def create_notification():
-    """Crea una nueva notificación del sistema"""
+    """
+    Crea una nueva notificación. Los administradores pueden enviarla a varios
+    usuarios con usuario_ids; se insertan todas en una sola transacción.
+    """
     try:
         data = request.get_json()
         user_id = session.get('user_id')
@@ -104,6 +155,7 @@ def create_notification():
         title = data.get('title')
         message = data.get('message')
         notification_type = data.get('type', 'system')
+        usuario_ids = data.get('usuario_ids', [user_id])
         
         if not title or not message:
             return jsonify({
@@ -111,16 +163,39 @@ def create_notification():
                 'message': 'Título y mensaje son requeridos'
             }), 400
         
-        notification = Notificacion.create_system_notification(
-            usuario_id=user_id,
+        if notification_type not in Notificacion.TYPES:
+            return jsonify({
+                'success': False,
+                'message': f'Tipo de notificación no válido: {notification_type}'
+            }), 400
+        
+        if (not isinstance(usuario_ids, list) or not usuario_ids
+                or not all(isinstance(uid, int) and not isinstance(uid, bool) for uid in usuario_ids)):
+            return jsonify({
+                'success': False,
+                'message': 'usuario_ids debe ser una lista no vacía de IDs de usuario'
+            }), 400
+        
+        if usuario_ids != [user_id]:
+            # Consultar la BD como api_admin_required: el permiso pudo cambiar tras el login
+            usuario = Usuario.get_by_id(user_id)
+            if not usuario or not usuario.es_admin:
+                return jsonify({
+                    'success': False,
+                    'message': 'Solo los administradores pueden notificar a otros usuarios'
+                }), 403
+        
+        notifications_created = Notificacion.create_for_users(
+            usuario_ids,
             title=title,
-            message=message
+            message=message,
+            type=notification_type
         )
         
         return jsonify({
             'success': True,
             'message': 'Notificación creada exitosamente',
-            'notification': notification.to_dict()
+            'notifications_created': notifications_created
         })
     except Exception as e:
         return jsonify({
@@ -140,7 +215,8 @@ def check_contract_reminders():
         warning_date = today + timedelta(days=30)
         
         contratos = Contrato.get_all()
-        notifications_created = 0
+        existing_notifications = Notificacion.get_by_user(user_id)
+        nuevas = []
         
         for contrato in contratos:
             if contrato.fecha_fin and contrato.fecha_fin <= warning_date and contrato.estado == 'activo':
@@ -148,7 +224,6 @@ def check_contract_reminders():
                 
                 if days_remaining <= 30 and days_remaining >= 0:
                     # Verificar si ya existe una notificación para este contrato
-                    existing_notifications = Notificacion.get_by_user(user_id)
                     contract_notified = any(
                         n.contract_id == contrato.id and n.type == 'contract_expiring' and not n.is_read
                         for n in existing_notifications
@@ -158,15 +233,15 @@ def check_contract_reminders():
                         title = f"Contrato próximo a vencer: {contrato.numero_contrato}"
                         message = f"El contrato '{contrato.titulo}' vence en {days_remaining} días ({contrato.fecha_fin})"
                         
-                        notification = Notificacion(
+                        nuevas.append(Notificacion(
                             usuario_id=user_id,
                             title=title,
                             message=message,
                             type='contract_expiring',
                             contract_id=contrato.id
-                        )
-                        notification.save()
-                        notifications_created += 1
+                        ))
+        
+        notifications_created = Notificacion.create_many(nuevas)
         
         return jsonify({
             'success': True,
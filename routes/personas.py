@@ -1,8 +1,10 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, session
 from database.models import PersonaResponsable, Cliente, Notificacion, Usuario
 from database.database import DatabaseManager
+from database.models.identity_map import evict_all
+from database.models.reference_cache import reference_cache
 from .decorators import login_required, api_login_required
-from .utils import get_notificaciones_count, get_current_user_id, create_success_response, create_error_response
+from .utils import get_notificaciones_count, get_current_user_id, create_success_response, create_error_response, get_pagination_args, pagination_info
 import logging
 import os
 from werkzeug.utils import secure_filename
@@ -98,6 +100,8 @@ def crear_persona():
                     "UPDATE personas_responsables SET es_principal = 0 WHERE cliente_id = ?",
                     (cliente_id,)
                 )
+                evict_all('PersonaResponsable')
+                reference_cache.invalidate('PersonaResponsable')
             
             # Crear nueva persona
             persona = PersonaResponsable(
@@ -184,6 +188,8 @@ def editar_persona(persona_id):
                     "UPDATE personas_responsables SET es_principal = 0 WHERE cliente_id = ? AND id != ?",
                     (cliente_id, persona_id)
                 )
+                evict_all('PersonaResponsable')
+                reference_cache.invalidate('PersonaResponsable')
             
             # Actualizar datos de la persona
             persona.nombre = nombre
@@ -394,18 +400,19 @@ def get_personas_by_ids():
 @api_personas_bp.route('/api/personas')
 @api_login_required
 def get_all_personas():
-    """API endpoint para obtener todas las personas responsables con información de clientes"""
+    """
+    API endpoint para obtener las personas responsables con información de clientes,
+    paginada con ?cursor=&limit= y filtrada con ?q=
+    """
     try:
-        # Obtener todas las personas (incluyendo inactivas)
-        personas = PersonaResponsable.get_all(activos_solo=False)
+        # Obtener una página de personas (incluyendo inactivas)
+        cursor, page_size = get_pagination_args()
+        personas = PersonaResponsable.get_all(activos_solo=False, cursor=cursor, page_size=page_size,
+                                              search=request.args.get('q'))
         
-        # Obtener información de clientes
-        clientes = {}
-        for persona in personas:
-            if persona.cliente_id and persona.cliente_id not in clientes:
-                cliente = Cliente.get_by_id(persona.cliente_id)
-                if cliente:
-                    clientes[persona.cliente_id] = cliente
+        # Obtener información de clientes de la página en una sola consulta
+        cliente_ids = list({persona.cliente_id for persona in personas if persona.cliente_id})
+        clientes = {cliente.id: cliente for cliente in Cliente.get_by_ids(cliente_ids)}
         
         # Formatear datos para el frontend
         personas_data = []
@@ -427,9 +434,12 @@ def get_all_personas():
         
         return jsonify({
             'success': True,
-            'personas': personas_data
+            'personas': personas_data,
+            'pagination': pagination_info(personas, page_size)
         })
         
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         logger.error(f"Error al obtener todas las personas: {str(e)}")
         return jsonify({'success': False, 'error': 'Error al obtener personas'}), 500
@@ -2,7 +2,7 @@ from flask import Blueprint, render_template, redirect, url_for, session, flash,
 from datetime import datetime, timedelta
 from database.models import Usuario, Cliente, Contrato, Notificacion, Proveedor
 from .decorators import login_required, admin_required, api_login_required
-from .utils import get_notificaciones_count, get_current_user_id, create_success_response, create_error_response
+from .utils import get_notificaciones_count, get_current_user_id, create_success_response, create_error_response, get_pagination_args, pagination_info
 
 providers_bp = Blueprint('providers', __name__)
 
@@ -252,10 +252,12 @@ def proveedores():
 @providers_bp.route('/api/proveedores', methods=['GET'])
 @api_login_required
 def api_get_proveedores():
-    """API para obtener lista de proveedores"""
+    """API para obtener lista de proveedores, paginada con ?cursor=&limit= y filtrada con ?q="""
     try:
         # Obtener solo proveedores activos para mantener consistencia con clientes
-        proveedores = Proveedor.get_all(activos_solo=True)
+        cursor, page_size = get_pagination_args()
+        proveedores = Proveedor.get_all(activos_solo=True, cursor=cursor, page_size=page_size,
+                                        search=request.args.get('q'))
         
         proveedores_data = []
         for proveedor in proveedores:
@@ -280,9 +282,15 @@ def api_get_proveedores():
             'success': True,
             'proveedores': proveedores_data,
             'total': len(proveedores_data),
-            'activos': len(proveedores_data)  # Ya están filtrados solo activos
+            'activos': len(proveedores_data),  # Ya están filtrados solo activos
+            'pagination': pagination_info(proveedores, page_size)
         })
         
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
     except Exception as e:
         # Manejo de errores consistente
         error_msg = f'Error al obtener proveedores: {str(e)}'
@@ -11,16 +11,16 @@ suplementos_bp = Blueprint('suplementos', __name__, url_prefix='/suplementos')
 def obtener_todos_suplementos():
     """Obtiene todos los suplementos con información enriquecida"""
     try:
-        suplementos = Suplemento.get_all()
+        suplementos = Suplemento.get_all(include=['contrato', 'usuario_autoriza'])
         
         for suplemento in suplementos:
             # Enriquecer con información del contrato
-            contrato = Contrato.get_by_id(suplemento.contrato_id)
+            contrato = suplemento.get_contrato()
             suplemento.contrato_numero = contrato.numero_contrato if contrato else 'N/A'
             suplemento.contrato_titulo = contrato.titulo if contrato else 'N/A'
             
             # Enriquecer con información del usuario
-            usuario = Usuario.get_by_id(suplemento.usuario_autoriza_id)
+            usuario = suplemento.get_usuario_autoriza()
             suplemento.usuario_autoriza_nombre = usuario.nombre if usuario else 'N/A'
         
         return suplementos
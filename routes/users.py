@@ -3,6 +3,7 @@ from datetime import datetime, timedelta
 from database.models import Usuario, ActividadSistema, Contrato, Notificacion
 from services.system_metrics import get_system_metrics
 from services.user_stats import get_user_personal_stats
+from services.contract_stats import ContractStatsService
 from .decorators import login_required, admin_required, api_login_required
 from .utils import get_notificaciones_count, get_current_user_id, create_success_response, create_error_response
 
@@ -34,14 +35,8 @@ def usuario():
         usuario_actual.dias_activo = dias_activo
         usuario_actual.nivel_acceso = nivel_acceso
     
-    # Obtener estadísticas de contratos
-    from .main import obtener_estadisticas_contratos
-    estadisticas_contratos = obtener_estadisticas_contratos()
-    
-    # Calcular estadísticas del usuario
-    from database.models import Contrato
-    contratos = Contrato.get_all()
-    contratos_usuario = [c for c in contratos if usuario_actual and c.usuario_responsable_id == usuario_actual.id]
+    # Calcular estadísticas de contratos del usuario con una consulta agregada
+    stats_usuario = ContractStatsService().get_stats(usuario_id=usuario_actual.id) if usuario_actual else None
     
     # Obtener reportes del mes actual
     import random
@@ -63,11 +58,12 @@ def usuario():
     actividades_usuario = actividades_usuario[:5]
     
     # Estadísticas del usuario
+    valor_total = stats_usuario['valor_total'] if stats_usuario else 0
     estadisticas_usuario = {
-        'contratos_asignados': len(contratos_usuario),
-        'contratos_activos': len([c for c in contratos_usuario if c.estado == 'activo']),
-        'proximos_vencer': len([c for c in contratos_usuario if c.estado == 'activo']),  # Simulado
-        'valor_total': '2.4M',  # Simulado
+        'contratos_asignados': stats_usuario['total_contratos'] if stats_usuario else 0,
+        'contratos_activos': stats_usuario['contratos_activos'] if stats_usuario else 0,
+        'proximos_vencer': stats_usuario['proximos_vencer'] if stats_usuario else 0,
+        'valor_total': f"{valor_total/1000000:.1f}M" if valor_total > 1000000 else f"{valor_total:,.0f}",
         'reportes_generados': reportes_mes,
         'actividades_recientes': len(actividades_usuario)
     }
@@ -1,5 +1,6 @@
-from flask import session
+from flask import session, request
 from database.models import Notificacion
+from database.models.pagination import clamp_page_size, DEFAULT_PAGE_SIZE
 from werkzeug.utils import secure_filename
 import os
 
@@ -16,7 +17,7 @@ def get_notificaciones_count():
         return 0
     
     try:
-        return Notificacion.get_unread_count(session['user_id'])
+        return Notificacion.get_cached_unread_count(session['user_id'])
     except Exception:
         return 0
 
@@ -51,6 +52,37 @@ def is_current_user_admin():
     return session.get('es_admin', False)
 
 
+def get_pagination_args(default_page_size=DEFAULT_PAGE_SIZE):
+    """
+    Obtiene los parámetros de paginación por cursor de la petición actual.
+    El tamaño de página se limita en el servidor a MAX_PAGE_SIZE.
+    
+    Returns:
+        tuple: (cursor o None, tamaño de página)
+    """
+    cursor = request.args.get('cursor') or None
+    page_size = clamp_page_size(request.args.get('limit'), default_page_size)
+    return cursor, page_size
+
+
+def pagination_info(page, page_size):
+    """
+    Datos de paginación para incluir en las respuestas JSON.
+    
+    Args:
+        page (Page): Página retornada por el modelo
+        page_size (int): Tamaño de página aplicado
+    
+    Returns:
+        dict: limit, next_cursor y has_more
+    """
+    return {
+        'limit': page_size,
+        'next_cursor': page.next_cursor,
+        'has_more': page.has_more
+    }
+
+
 # Configuración para subida de archivos
 ALLOWED_EXTENSIONS = {'pdf', 'doc', 'docx', 'txt', 'jpg', 'jpeg', 'png'}
 
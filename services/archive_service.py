@@ -0,0 +1,225 @@
+import os
+import gzip
+import json
+import time
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+from database.database import DatabaseManager
+from database.models.notification_bus import notification_bus
+
+# Tablas de registro que se archivan: columna de fecha y días que se conservan en la BD
+ARCHIVE_TABLES = {
+    'actividad_sistema': {'date_column': 'fecha_actividad', 'retention_days': 180},
+    'notificaciones': {'date_column': 'created_at', 'retention_days': 90}
+}
+
+# Filas movidas por transacción y pausa entre lotes para dejar pasar a otros escritores
+ARCHIVE_CHUNK_SIZE = 1000
+ARCHIVE_CHUNK_SLEEP = 0.01
+
+class ArchiveService:
+    """
+    Mueve las filas antiguas de actividad_sistema y notificaciones a archivos
+    mensuales comprimidos (archive/<tabla>/<AAAA-MM>.jsonl.gz), para que las
+    tablas de la base de datos y sus índices se mantengan pequeños.
+    
+    Cada lote se agrega al archivo como un miembro gzip nuevo y después se borra
+    de la tabla en una transacción corta. Si el proceso se interrumpe entre ambos
+    pasos, el lote puede quedar repetido en el archivo; las consultas descartan
+    los id duplicados.
+    """
+    
+    def __init__(self, archive_dir: str = 'archive', retention_days: Optional[Dict[str, int]] = None,
+                 chunk_size: int = ARCHIVE_CHUNK_SIZE, chunk_sleep: float = ARCHIVE_CHUNK_SLEEP):
+        """
+        Args:
+            archive_dir: Directorio de los archivos mensuales
+            retention_days: Días que se conservan en la BD por tabla, por ejemplo {'notificaciones': 30}
+            chunk_size: Filas movidas por transacción
+            chunk_sleep: Pausa en segundos entre lotes
+        """
+        retention_days = retention_days or {}
+        for tabla in retention_days:
+            if tabla not in ARCHIVE_TABLES:
+                raise ValueError(f"Tabla no archivable: {tabla}")
+        
+        self.db_manager = DatabaseManager()
+        self.archive_dir = Path(archive_dir)
+        self.retention_days = {tabla: retention_days.get(tabla, config['retention_days'])
+                               for tabla, config in ARCHIVE_TABLES.items()}
+        self.chunk_size = chunk_size
+        self.chunk_sleep = chunk_sleep
+        self._lock = threading.Lock()
+    
+    def _archive_path(self, tabla: str, periodo: str) -> Path:
+        return self.archive_dir / tabla / f"{periodo}.jsonl.gz"
+    
+    def archive_old_records(self, tablas: Optional[List[str]] = None) -> Dict:
+        """
+        Archiva las filas más antiguas que el horizonte de cada tabla
+        
+        Returns:
+            Dict con el número de filas archivadas y los meses afectados por tabla
+        """
+        resultados = {}
+        try:
+            with self._lock:
+                for tabla in tablas or list(ARCHIVE_TABLES):
+                    if tabla not in ARCHIVE_TABLES:
+                        raise ValueError(f"Tabla no archivable: {tabla}")
+                    resultados[tabla] = self._archive_table(tabla)
+            
+            return {
+                'success': True,
+                'tables': resultados,
+                'archived_count': sum(r['archived'] for r in resultados.values())
+            }
+        
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e),
+                'tables': resultados
+            }
+        finally:
+            # Las notificaciones no leídas archivadas cambian los contadores
+            if resultados.get('notificaciones', {}).get('archived'):
+                notification_bus.invalidate()
+    
+    def _archive_table(self, tabla: str) -> Dict:
+        """Mueve por lotes las filas antiguas de una tabla a sus archivos mensuales"""
+        date_column = ARCHIVE_TABLES[tabla]['date_column']
+        horizonte = f"-{self.retention_days[tabla]} days"
+        archived = 0
+        periodos = set()
+        
+        while True:
+            with self.db_manager.get_connection() as conn:
+                filas = conn.execute(f"""
+                    SELECT * FROM {tabla}
+                    WHERE {date_column} < datetime('now', ?)
+                    ORDER BY {date_column}
+                    LIMIT ?
+                """, (horizonte, self.chunk_size)).fetchall()
+            
+            if not filas:
+                break
+            
+            por_periodo = {}
+            for fila in filas:
+                registro = dict(fila)
+                por_periodo.setdefault(str(registro[date_column])[:7], []).append(registro)
+            
+            for periodo, registros in por_periodo.items():
+                self._append(tabla, periodo, registros)
+            periodos.update(por_periodo)
+            
+            # Borrar el lote solo después de que quedó escrito en disco
+            ids = [fila['id'] for fila in filas]
+            placeholders = ','.join(['?' for _ in ids])
+            with self.db_manager.get_connection() as conn:
+                conn.execute(f"DELETE FROM {tabla} WHERE id IN ({placeholders})", ids)
+                conn.commit()
+            
+            archived += len(filas)
+            if len(filas) < self.chunk_size:
+                break
+            time.sleep(self.chunk_sleep)
+        
+        if archived:
+            print(f"Archivadas {archived} filas de {tabla} en {len(periodos)} archivos mensuales")
+        return {'archived': archived, 'periods': sorted(periodos)}
+    
+    def _append(self, tabla: str, periodo: str, registros: List[Dict]):
+        """Agrega un lote al archivo del mes como un miembro gzip nuevo"""
+        archive_path = self._archive_path(tabla, periodo)
+        archive_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        with open(archive_path, 'ab') as raw:
+            inicio = raw.tell()
+            try:
+                with gzip.GzipFile(fileobj=raw, mode='ab') as gz:
+                    for registro in registros:
+                        gz.write((json.dumps(registro, ensure_ascii=False, default=str) + '\n').encode('utf-8'))
+                raw.flush()
+                os.fsync(raw.fileno())
+            except Exception:
+                # No dejar un miembro incompleto que impida leer los lotes siguientes
+                raw.truncate(inicio)
+                raise
+    
+    def _read_archive(self, archive_path: Path):
+        """Lee los registros de un archivo mensual"""
+        try:
+            with gzip.open(archive_path, 'rt', encoding='utf-8') as f:
+                for linea in f:
+                    if linea.strip():
+                        yield json.loads(linea)
+        except (EOFError, OSError, ValueError) as e:
+            # Un lote incompleto al final (proceso interrumpido) no invalida los anteriores
+            print(f"Archivo {archive_path} truncado o dañado: {e}")
+    
+    def list_archives(self, tabla: Optional[str] = None) -> List[Dict]:
+        """Lista los archivos mensuales disponibles"""
+        archivos = []
+        for nombre in [tabla] if tabla else list(ARCHIVE_TABLES):
+            table_dir = self.archive_dir / nombre
+            if not table_dir.exists():
+                continue
+            for archive_path in sorted(table_dir.glob('*.jsonl.gz')):
+                archivos.append({
+                    'table': nombre,
+                    'period': archive_path.name[:-len('.jsonl.gz')],
+                    'size': archive_path.stat().st_size,
+                    'path': str(archive_path)
+                })
+        return archivos
+    
+    def query_archive(self, tabla: str, desde: Optional[str] = None, hasta: Optional[str] = None,
+                      filtros: Optional[Dict] = None, limit: Optional[int] = None) -> Dict:
+        """
+        Consulta las filas archivadas de una tabla. Solo se leen los meses del rango.
+        
+        Args:
+            tabla: 'actividad_sistema' o 'notificaciones'
+            desde: Fecha inicial inclusive ('AAAA-MM-DD' o 'AAAA-MM-DD HH:MM:SS')
+            hasta: Fecha final exclusiva, en el mismo formato
+            filtros: Igualdades por columna, por ejemplo {'usuario_id': 3}
+            limit: Máximo de filas (las más recientes primero)
+        """
+        if tabla not in ARCHIVE_TABLES:
+            return {'success': False, 'error': f'Tabla no archivable: {tabla}'}
+        
+        try:
+            date_column = ARCHIVE_TABLES[tabla]['date_column']
+            filtros = filtros or {}
+            periodos = [a['period'] for a in self.list_archives(tabla)
+                        if (not desde or a['period'] >= desde[:7]) and (not hasta or a['period'] <= hasta[:7])]
+            
+            registros = {}
+            for periodo in periodos:
+                for registro in self._read_archive(self._archive_path(tabla, periodo)):
+                    fecha = str(registro.get(date_column))
+                    if desde and fecha < desde:
+                        continue
+                    if hasta and fecha >= hasta:
+                        continue
+                    if any(str(registro.get(columna)) != str(valor) for columna, valor in filtros.items()):
+                        continue
+                    registros[registro['id']] = registro
+            
+            resultado = sorted(registros.values(), key=lambda r: (str(r.get(date_column)), r['id']), reverse=True)
+            return {
+                'success': True,
+                'table': tabla,
+                'periods': periodos,
+                'total': len(resultado),
+                'records': resultado[:limit] if limit else resultado
+            }
+        
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e)
+            }
@@ -0,0 +1,168 @@
+import os
+import json
+import zipfile
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Tipos de backup (subdirectorios de backups/)
+BACKUP_TYPES = ['automatic', 'manual', 'imported']
+
+# Nombre del manifiesto de uploads de los backups incrementales
+UPLOAD_MANIFEST = 'upload_manifest.json'
+
+class BackupCatalog:
+    """
+    Índice persistente de los archivos de backup (backups/catalog.json).
+    
+    Guarda por cada ZIP su tamaño, fecha de modificación, metadata y si incluye
+    uploads, para que los listados no tengan que abrir cada archivo. Una entrada
+    cuyo tamaño o mtime ya no coincide con el archivo se vuelve a leer, así el
+    índice se corrige solo si alguien modifica el directorio por fuera.
+    """
+    
+    def __init__(self, backup_dir: Path):
+        self.backup_dir = Path(backup_dir)
+        self.catalog_path = self.backup_dir / 'catalog.json'
+        self._lock = threading.RLock()
+        self._entries = self._load()
+    
+    def _load(self) -> Dict:
+        try:
+            with open(self.catalog_path, 'r', encoding='utf-8') as f:
+                return json.load(f).get('entries', {})
+        except (OSError, ValueError):
+            return {}
+    
+    def _save(self):
+        """Guarda el índice de forma atómica"""
+        self.backup_dir.mkdir(parents=True, exist_ok=True)
+        temp_path = self.catalog_path.with_suffix('.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': 1, 'entries': self._entries}, f, ensure_ascii=False)
+        os.replace(temp_path, self.catalog_path)
+    
+    def _key(self, backup_path: Path) -> str:
+        return Path(backup_path).as_posix()
+    
+    def _read_archive(self, backup_path: Path, backup_type: str, stat: os.stat_result) -> Dict:
+        """Lee la metadata de un ZIP abriéndolo una sola vez"""
+        metadata = None
+        has_uploads = False
+        
+        try:
+            with zipfile.ZipFile(backup_path, 'r') as zipf:
+                names = zipf.namelist()
+                if 'backup_metadata.json' in names:
+                    with zipf.open('backup_metadata.json') as f:
+                        metadata = json.load(f)
+                if UPLOAD_MANIFEST in names:
+                    with zipf.open(UPLOAD_MANIFEST) as f:
+                        has_uploads = bool(json.load(f).get('files'))
+                else:
+                    has_uploads = any(name.startswith('uploads/') for name in names)
+        except Exception as e:
+            print(f"Error leyendo metadata de {backup_path}: {e}")
+        
+        return {
+            'type': backup_type,
+            'size': stat.st_size,
+            'mtime': stat.st_mtime,
+            'metadata': metadata,
+            'has_uploads': has_uploads
+        }
+    
+    def _entry_info(self, key: str, entry: Dict) -> Dict:
+        """Formato que usan los listados"""
+        return {
+            'name': Path(key).stem,
+            'path': str(Path(key)),
+            'type': entry['type'],
+            'size': entry['size'],
+            'size_mb': round(entry['size'] / (1024 * 1024), 2),
+            'created_at': datetime.fromtimestamp(entry['mtime']).isoformat(),
+            'metadata': entry['metadata'],
+            'has_uploads': entry['has_uploads']
+        }
+    
+    def record(self, backup_path: Path, backup_type: Optional[str] = None) -> Optional[Dict]:
+        """
+        Agrega o actualiza un backup en el índice (tras crearlo o importarlo)
+        """
+        backup_path = Path(backup_path)
+        backup_type = backup_type or backup_path.parent.name
+        
+        with self._lock:
+            try:
+                stat = backup_path.stat()
+            except OSError:
+                self.remove(backup_path)
+                return None
+            
+            key = self._key(backup_path)
+            self._entries[key] = self._read_archive(backup_path, backup_type, stat)
+            self._save()
+            return self._entry_info(key, self._entries[key])
+    
+    def remove(self, backup_path: Path):
+        """Quita un backup del índice (tras eliminarlo)"""
+        with self._lock:
+            if self._entries.pop(self._key(backup_path), None) is not None:
+                self._save()
+    
+    def list(self, backup_types: Optional[List[str]] = None) -> List[Dict]:
+        """
+        Lista los backups desde el índice. Solo hace stat() de cada archivo;
+        los ZIP nuevos o modificados se leen y se agregan al índice.
+        """
+        backup_types = backup_types or BACKUP_TYPES
+        backups = []
+        changed = False
+        
+        with self._lock:
+            vistos = set()
+            for backup_type in backup_types:
+                backup_subdir = self.backup_dir / backup_type
+                if not backup_subdir.exists():
+                    continue
+                
+                for backup_file in backup_subdir.glob('*.zip'):
+                    key = self._key(backup_file)
+                    vistos.add(key)
+                    try:
+                        stat = backup_file.stat()
+                    except OSError:
+                        continue
+                    
+                    entry = self._entries.get(key)
+                    if (entry is None or entry['size'] != stat.st_size
+                            or entry['mtime'] != stat.st_mtime or entry['type'] != backup_type):
+                        entry = self._entries[key] = self._read_archive(backup_file, backup_type, stat)
+                        changed = True
+                    
+                    backups.append(self._entry_info(key, entry))
+            
+            # Olvidar los archivos que ya no existen
+            for key in [key for key, entry in self._entries.items()
+                        if entry['type'] in backup_types and key not in vistos]:
+                del self._entries[key]
+                changed = True
+            
+            if changed:
+                self._save()
+        
+        backups.sort(key=lambda x: x['created_at'], reverse=True)
+        return backups
+
+# Una instancia por directorio, compartida por BackupService y RestoreService
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+def get_backup_catalog(backup_dir: Path) -> BackupCatalog:
+    """Obtiene el catálogo compartido de un directorio de backups"""
+    key = os.path.abspath(backup_dir)
+    with _catalogs_lock:
+        if key not in _catalogs:
+            _catalogs[key] = BackupCatalog(backup_dir)
+        return _catalogs[key]
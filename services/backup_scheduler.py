@@ -2,10 +2,13 @@ import atexit
 from datetime import datetime, time
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 from apscheduler.executors.pool import ThreadPoolExecutor
 from apscheduler.jobstores.memory import MemoryJobStore
 from services.backup_service import BackupService
 from services.change_detection_service import ChangeDetectionService
+from services.archive_service import ArchiveService
+from database.models import Notificacion
 import logging
 
 # Configurar logging para APScheduler
@@ -15,6 +18,7 @@ class BackupScheduler:
     def __init__(self):
         self.backup_service = BackupService()
         self.change_detection = ChangeDetectionService()
+        self.archive_service = ArchiveService()
         
         # Configurar el scheduler
         jobstores = {
@@ -73,6 +77,33 @@ class BackupScheduler:
             name='Limpieza de Registros de Cambios',
             replace_existing=True
         )
+        
+        # Archivado diario de actividad y notificaciones antiguas
+        self.scheduler.add_job(
+            func=self._archive_old_records_job,
+            trigger=CronTrigger(hour=2, minute=0),  # 2:00 AM
+            id='archive_old_records',
+            name='Archivado de Actividad y Notificaciones',
+            replace_existing=True
+        )
+        
+        # Corrección diaria de los contadores de notificaciones no leídas
+        self.scheduler.add_job(
+            func=self._reconcile_notification_counters_job,
+            trigger=CronTrigger(hour=4, minute=30),  # 4:30 AM
+            id='reconcile_notification_counters',
+            name='Conciliación de Contadores de Notificaciones',
+            replace_existing=True
+        )
+        
+        # Checkpoint periódico del WAL para que no crezca indefinidamente
+        self.scheduler.add_job(
+            func=self._wal_checkpoint_job,
+            trigger=IntervalTrigger(minutes=10),
+            id='wal_checkpoint',
+            name='Checkpoint del WAL de la Base de Datos',
+            replace_existing=True
+        )
     
     def _daily_backup_job(self):
         """
@@ -91,17 +122,22 @@ class BackupScheduler:
             
             print(f"[{datetime.now()}] Se encontraron {changes_info.get('total_changes', 0)} cambios. Iniciando backup...")
             
-            # Crear backup automático
+            # Crear backup automático incremental: los uploads sin cambios ya están en el almacén de chunks
+            changed_tables = sorted({change['table'] for change in changes_info.get('changes', [])})
             backup_result = self.backup_service.create_backup(
                 backup_type='automatic',
-                reason=f"Backup automático - {changes_info.get('total_changes', 0)} cambios detectados"
+                reason=f"Backup automático - {changes_info.get('total_changes', 0)} cambios detectados",
+                incremental=True,
+                changed_tables=changed_tables
             )
             
             if backup_result.get('success', False):
                 print(f"[{datetime.now()}] Backup automático completado exitosamente: {backup_result['backup_info']['name']}")
                 
-                # Marcar cambios como procesados
-                mark_result = self.change_detection.mark_changes_as_processed()
+                # Marcar como procesados solo los cambios incluidos en el backup
+                mark_result = self.change_detection.mark_changes_as_processed(
+                    up_to_id=changes_info.get('high_water_mark')
+                )
                 if mark_result.get('success', False):
                     print(f"[{datetime.now()}] Se marcaron {mark_result.get('processed_count', 0)} cambios como procesados")
                 
@@ -148,6 +184,48 @@ class BackupScheduler:
         except Exception as e:
             print(f"[{datetime.now()}] Error en trabajo de limpieza de registros: {str(e)}")
     
+    def _archive_old_records_job(self):
+        """
+        Trabajo programado para mover a los archivos mensuales las filas de
+        actividad_sistema y notificaciones más antiguas que su horizonte
+        """
+        try:
+            print(f"[{datetime.now()}] Iniciando archivado de registros antiguos...")
+            
+            archive_result = self.archive_service.archive_old_records()
+            
+            if archive_result.get('success', False):
+                print(f"[{datetime.now()}] Archivado completado: {archive_result.get('archived_count', 0)} filas archivadas")
+            else:
+                print(f"[{datetime.now()}] Error en archivado: {archive_result.get('error', 'Error desconocido')}")
+        
+        except Exception as e:
+            print(f"[{datetime.now()}] Error en trabajo de archivado: {str(e)}")
+    
+    def _reconcile_notification_counters_job(self):
+        """
+        Trabajo programado para corregir los contadores de no leídas que se
+        hayan desviado (por ejemplo, por escrituras hechas sin los triggers)
+        """
+        try:
+            repaired = Notificacion.reconcile_unread_counts()
+            if repaired:
+                print(f"[{datetime.now()}] Contadores de notificaciones corregidos para {repaired} usuarios")
+        except Exception as e:
+            print(f"[{datetime.now()}] Error conciliando contadores de notificaciones: {str(e)}")
+    
+    def _wal_checkpoint_job(self):
+        """
+        Trabajo programado para volcar el WAL al archivo principal.
+        Usa el modo PASSIVE, que nunca bloquea a lectores ni escritores.
+        """
+        try:
+            result = self.backup_service.db_manager.checkpoint('PASSIVE')
+            if result['busy']:
+                print(f"[{datetime.now()}] Checkpoint del WAL parcial: {result['checkpointed_frames']}/{result['log_frames']} frames")
+        except Exception as e:
+            print(f"[{datetime.now()}] Error en checkpoint del WAL: {str(e)}")
+    
     def start(self):
         """
         Inicia el scheduler
@@ -210,6 +288,9 @@ class BackupScheduler:
         try:
             print(f"[{datetime.now()}] Iniciando backup manual...")
             
+            # Último cambio registrado antes de empezar el backup
+            high_water_mark = self.change_detection.has_changes_since_last_backup().get('high_water_mark')
+            
             backup_result = self.backup_service.create_backup(
                 backup_type='manual',
                 reason='Backup manual solicitado por usuario'
@@ -219,7 +300,7 @@ class BackupScheduler:
                 print(f"[{datetime.now()}] Backup manual completado: {backup_result['backup_info']['name']}")
                 
                 # Marcar cambios como procesados también para backups manuales
-                self.change_detection.mark_changes_as_processed()
+                self.change_detection.mark_changes_as_processed(up_to_id=high_water_mark)
             
             return backup_result
             
@@ -1,32 +1,123 @@
 import os
 import sqlite3
+import contextlib
+import threading
+import time
 import zipfile
-import shutil
 import json
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 from database.database import DatabaseManager
+from services.backup_catalog import UPLOAD_MANIFEST, get_backup_catalog
+from services.chunk_store import ChunkStore
+from services.parallel_zip import ParallelZipWriter, default_workers
+
+# Códecs de compresión disponibles para los backups
+COMPRESSION_CODECS = {
+    'deflate': zipfile.ZIP_DEFLATED,
+    'bzip2': zipfile.ZIP_BZIP2,
+    'lzma': zipfile.ZIP_LZMA,
+    'stored': zipfile.ZIP_STORED
+}
+DEFAULT_COMPRESSION = 'deflate'
+DEFAULT_COMPRESSLEVEL = 6   # Nivel 9 apenas reduce el tamaño y es mucho más lento
+
+# Formatos que ya están comprimidos: recomprimirlos solo gasta CPU
+STORED_EXTENSIONS = {
+    '.pdf', '.jpg', '.jpeg', '.png', '.gif', '.webp',
+    '.docx', '.xlsx', '.pptx', '.odt', '.ods',
+    '.zip', '.gz', '.bz2', '.xz', '.7z', '.rar', '.mp3', '.mp4'
+}
+
+# Manifiesto con el SHA-256 de cada miembro del ZIP, se escribe al final
+CHECKSUM_MANIFEST = 'checksums.json'
+
+# Snapshot de la BD con la API de backup de SQLite: se copia por bloques de páginas
+# y se hace una pausa entre bloques para no acaparar la base de datos
+SNAPSHOT_PAGES_PER_STEP = 256
+SNAPSHOT_STEP_SLEEP = 0.005
+# Si las escrituras concurrentes reinician la copia demasiadas veces, se copia en un solo paso
+SNAPSHOT_MAX_RESTARTS = 3
+
+# Progreso del snapshot en curso (compartido por todas las instancias del servicio)
+_snapshot_progress = {'status': 'idle'}
+_snapshot_lock = threading.Lock()
+
+# Los chunks de un backup incremental en curso todavía no los referencia ningún
+# ZIP terminado: la recolección de basura espera a que el backup termine
+_chunk_store_lock = threading.Lock()
+
+
+class _SnapshotRestartLimit(Exception):
+    pass
+
+
+def _update_snapshot_progress(**values):
+    with _snapshot_lock:
+        _snapshot_progress.update(values)
+
+
+def get_snapshot_progress() -> Dict:
+    """Estado del último snapshot de la base de datos (en curso o terminado)"""
+    with _snapshot_lock:
+        return dict(_snapshot_progress)
 
 class BackupService:
-    def __init__(self):
+    def __init__(self, compression: str = DEFAULT_COMPRESSION, compresslevel: int = DEFAULT_COMPRESSLEVEL,
+                 snapshot_pages: int = SNAPSHOT_PAGES_PER_STEP, snapshot_sleep: float = SNAPSHOT_STEP_SLEEP,
+                 workers: Optional[int] = None, codec_by_extension: Optional[Dict[str, str]] = None):
+        """
+        Args:
+            compression: Códec por defecto ('deflate', 'bzip2', 'lzma' o 'stored')
+            compresslevel: Nivel de compresión
+            snapshot_pages: Páginas copiadas por paso en el snapshot de la BD
+            snapshot_sleep: Pausa en segundos entre pasos del snapshot
+            workers: Hilos de compresión (1 = secuencial; por defecto, según los núcleos)
+            codec_by_extension: Códec por extensión, por ejemplo {'.csv': 'lzma'}
+        """
+        codec_by_extension = {ext.lower(): codec for ext, codec in (codec_by_extension or {}).items()}
+        for codec in [compression, *codec_by_extension.values()]:
+            if codec not in COMPRESSION_CODECS:
+                raise ValueError(f"Códec de compresión desconocido: {codec}")
+        
         self.db_manager = DatabaseManager()
+        self.codec = compression
+        self.compression = COMPRESSION_CODECS[compression]
+        self.compresslevel = compresslevel
+        self.snapshot_pages = snapshot_pages
+        self.snapshot_sleep = snapshot_sleep
+        self.workers = workers or default_workers()
+        self.codec_by_extension = codec_by_extension
         self.backup_dir = Path('backups')
         self.uploads_dir = Path('uploads')
+        # Archivos mensuales de ArchiveService: sus filas ya no están en la BD
+        self.archive_dir = Path('archive')
         self.backup_dir.mkdir(exist_ok=True)
         
         # Crear subdirectorios para diferentes tipos de backup
         (self.backup_dir / 'automatic').mkdir(exist_ok=True)
         (self.backup_dir / 'manual').mkdir(exist_ok=True)
+        
+        # Almacén compartido por los backups incrementales
+        self.chunk_store = ChunkStore(self.backup_dir / 'chunks')
+        # Índice de backups para no abrir cada ZIP al listarlos
+        self.catalog = get_backup_catalog(self.backup_dir)
     
-    def create_backup(self, backup_type: str = 'manual', reason: str = '', custom_name: str = None) -> Dict:
+    def create_backup(self, backup_type: str = 'manual', reason: str = '', custom_name: str = None,
+                      incremental: bool = False, changed_tables: Optional[List[str]] = None,
+                      verify_integrity: bool = False) -> Dict:
         """
-        Crea un backup completo de la aplicación
+        Crea un backup de la aplicación
         
         Args:
             backup_type: 'automatic' o 'manual'
             reason: Razón del backup (para logs)
             custom_name: Nombre personalizado para el backup (opcional)
+            incremental: Si es True, los uploads se guardan en el almacén de chunks
+                y el ZIP solo contiene la base de datos y el manifiesto de uploads
+            changed_tables: Tablas modificadas desde el último backup (informativo)
+            verify_integrity: Ejecutar PRAGMA integrity_check sobre la copia de la BD
         
         Returns:
             Dict con información del backup creado
@@ -46,30 +137,55 @@ class BackupService:
             backup_subdir = self.backup_dir / backup_type
             backup_path = backup_subdir / f"{backup_name}.zip"
             
-            # Crear directorio temporal para el backup
-            temp_dir = Path(f"temp_backup_{timestamp}")
-            temp_dir.mkdir(exist_ok=True)
+            # El ZIP se escribe con otro nombre y se renombra al terminar, así un
+            # backup a medio escribir nunca aparece en los listados
+            partial_path = backup_subdir / f"{backup_name}.zip.partial"
             
             try:
-                # 1. Crear backup de la base de datos
-                db_backup_path = self._backup_database(temp_dir)
-                
-                # 2. Copiar archivos de uploads si existen
-                uploads_backup_path = self._backup_uploads(temp_dir)
-                
-                # 3. Crear metadata del backup
+                # 1. Crear metadata del backup
                 metadata = self._create_backup_metadata(backup_type, reason, timestamp)
-                metadata_path = temp_dir / 'backup_metadata.json'
-                with open(metadata_path, 'w', encoding='utf-8') as f:
-                    json.dump(metadata, f, indent=2, ensure_ascii=False)
-                
-                # 4. Comprimir todo en un archivo ZIP
-                self._create_zip_backup(temp_dir, backup_path)
+                metadata['mode'] = 'incremental' if incremental else 'full'
+                if changed_tables is not None:
+                    metadata['changed_tables'] = changed_tables
                 
-                # 5. Limpiar directorio temporal
-                shutil.rmtree(temp_dir)
+                with _chunk_store_lock if incremental else contextlib.nullcontext():
+                    with zipfile.ZipFile(partial_path, 'w', self.compression,
+                                         compresslevel=self.compresslevel) as zipf:
+                        writer = ParallelZipWriter(zipf, self.workers)
+                        try:
+                            # 2. Agregar la copia de la base de datos
+                            metadata['database_snapshot'] = self._backup_database(writer, timestamp, verify_integrity)
+                            
+                            # 3. Agregar los archivos de uploads directamente desde su ubicación,
+                            #    o solo su manifiesto si el backup es incremental
+                            if incremental:
+                                metadata['uploads'] = self._backup_uploads_incremental(writer)
+                            else:
+                                metadata['uploads'] = self._backup_uploads(writer)
+                            
+                            # 4. Agregar los archivos mensuales de actividad y notificaciones;
+                            #    ya son .gz y no cambian, así que van completos en ambos modos
+                            metadata['archives'] = self._backup_archives(writer)
+                            
+                            metadata['compression'].update(writer.close())
+                        except Exception:
+                            writer.abort()
+                            raise
+                        
+                        # 5. Agregar la metadata
+                        writer.writestr('backup_metadata.json',
+                                        json.dumps(metadata, indent=2, ensure_ascii=False))
+                        
+                        # 6. Agregar el manifiesto de checksums de todos los miembros
+                        zipf.writestr(CHECKSUM_MANIFEST, json.dumps({
+                            'algorithm': 'sha256',
+                            'members': writer.checksums
+                        }, indent=2, ensure_ascii=False))
+                    
+                    os.replace(partial_path, backup_path)
+                self.catalog.record(backup_path, backup_type)
                 
-                # 6. Registrar el backup en el sistema
+                # 7. Registrar el backup en el sistema
                 backup_info = {
                     'name': backup_name,
                     'path': str(backup_path),
@@ -90,8 +206,8 @@ class BackupService:
                 
             except Exception as e:
                 # Limpiar en caso de error
-                if temp_dir.exists():
-                    shutil.rmtree(temp_dir)
+                if partial_path.exists():
+                    partial_path.unlink()
                 raise e
                 
         except Exception as e:
@@ -101,29 +217,203 @@ class BackupService:
                 'message': f'Error al crear backup: {str(e)}'
             }
     
-    def _backup_database(self, temp_dir: Path) -> Path:
+    def _backup_database(self, writer: ParallelZipWriter, timestamp: str, verify_integrity: bool = False) -> Dict:
         """
-        Crea una copia de la base de datos SQLite
+        Agrega al ZIP una copia consistente de la base de datos SQLite
         """
-        db_backup_path = temp_dir / 'pacta_local.db'
+        # La API de backup necesita un archivo de destino; la copia se borra en cuanto se archiva
+        snapshot_path = self.backup_dir / f".snapshot_{timestamp}.db"
         
-        # Usar el comando VACUUM INTO para crear una copia limpia
-        with self.db_manager.get_connection() as conn:
-            conn.execute(f"VACUUM INTO '{db_backup_path}'")
+        try:
+            snapshot_info = self._snapshot_database(snapshot_path, verify_integrity)
+            writer.add_file(snapshot_path, 'pacta_local.db', self.compression, self.compresslevel)
+            # La copia temporal debe estar escrita en el ZIP antes de borrarla
+            writer.flush()
+            return snapshot_info
+        finally:
+            if snapshot_path.exists():
+                snapshot_path.unlink()
+    
+    def _snapshot_database(self, snapshot_path: Path, verify_integrity: bool = False) -> Dict:
+        """
+        Copia la base de datos con sqlite3.Connection.backup, por bloques de páginas.
+        
+        Entre bloques la base de datos queda libre para las peticiones. Usa una conexión
+        propia en lugar de una del pool para no ocupar una conexión durante toda la copia.
+        """
+        started = time.monotonic()
+        state = {'remaining': None, 'restarts': 0}
+        _update_snapshot_progress(status='running', started_at=datetime.now().isoformat(),
+                                  finished_at=None, total_pages=0, remaining_pages=0,
+                                  percent=0.0, restarts=0, error=None)
+        
+        def progress(status, remaining, total):
+            # Si otra conexión escribe durante la copia, SQLite la reinicia desde el principio
+            if state['remaining'] is not None and remaining > state['remaining']:
+                state['restarts'] += 1
+                if state['restarts'] > SNAPSHOT_MAX_RESTARTS:
+                    raise _SnapshotRestartLimit()
+            state['remaining'] = remaining
+            
+            _update_snapshot_progress(total_pages=total, remaining_pages=remaining,
+                                      percent=round((total - remaining) * 100 / total, 1) if total else 100.0,
+                                      restarts=state['restarts'])
+            if self.snapshot_sleep:
+                time.sleep(self.snapshot_sleep)
+        
+        source = sqlite3.connect(self.db_manager.db_path, timeout=30)
+        target = sqlite3.connect(snapshot_path)
+        try:
+            try:
+                source.backup(target, pages=self.snapshot_pages, progress=progress)
+                mode = 'incremental'
+            except _SnapshotRestartLimit:
+                # Demasiadas escrituras concurrentes: copiar todo en un solo paso
+                source.backup(target, pages=-1)
+                mode = 'single_step'
+            
+            integrity = None
+            if verify_integrity:
+                _update_snapshot_progress(status='verifying')
+                integrity = target.execute("PRAGMA integrity_check").fetchone()[0]
+                if integrity != 'ok':
+                    raise sqlite3.DatabaseError(f"La copia de la base de datos no pasó integrity_check: {integrity}")
+            
+            snapshot_info = {
+                'method': 'sqlite_backup_api',
+                'mode': mode,
+                'pages': target.execute("PRAGMA page_count").fetchone()[0],
+                'restarts': state['restarts'],
+                'integrity_check': integrity,
+                'duration_seconds': round(time.monotonic() - started, 3)
+            }
+            _update_snapshot_progress(status='completed', finished_at=datetime.now().isoformat(),
+                                      remaining_pages=0, percent=100.0)
+            return snapshot_info
         
-        return db_backup_path
+        except Exception as e:
+            _update_snapshot_progress(status='failed', finished_at=datetime.now().isoformat(), error=str(e))
+            raise
+        finally:
+            target.close()
+            source.close()
+    
+    def _compress_type_for(self, file_path: Path) -> int:
+        """Códec para un archivo según su extensión"""
+        extension = file_path.suffix.lower()
+        if extension in self.codec_by_extension:
+            return COMPRESSION_CODECS[self.codec_by_extension[extension]]
+        if extension in STORED_EXTENSIONS:
+            return zipfile.ZIP_STORED
+        return self.compression
     
-    def _backup_uploads(self, temp_dir: Path) -> Optional[Path]:
+    def _backup_uploads(self, writer: ParallelZipWriter) -> Dict:
         """
-        Copia todos los archivos de uploads
+        Agrega los archivos de uploads al ZIP desde su ubicación, comprimiéndolos en paralelo.
+        Los formatos ya comprimidos se guardan sin volver a comprimir.
         """
+        stats = {'files': 0, 'bytes': 0, 'stored_without_compression': 0}
+        
         if not self.uploads_dir.exists():
-            return None
+            return stats
         
-        uploads_backup_path = temp_dir / 'uploads'
-        shutil.copytree(self.uploads_dir, uploads_backup_path)
+        for root, dirs, files in os.walk(self.uploads_dir):
+            dirs.sort()
+            for filename in sorted(files):
+                file_path = Path(root) / filename
+                arcname = Path('uploads') / file_path.relative_to(self.uploads_dir)
+                
+                compress_type = self._compress_type_for(file_path)
+                writer.add_file(file_path, arcname, compress_type, self.compresslevel)
+                if compress_type == zipfile.ZIP_STORED:
+                    stats['stored_without_compression'] += 1
+                
+                stats['files'] += 1
+                stats['bytes'] += file_path.stat().st_size
         
-        return uploads_backup_path
+        return stats
+    
+    def _backup_archives(self, writer: ParallelZipWriter) -> Dict:
+        """
+        Agrega los archivos de archive/ al ZIP. Las filas archivadas se borran de la
+        base de datos, así que sin ellos el backup no tendría ese historial.
+        """
+        stats = {'files': 0, 'bytes': 0}
+        
+        if not self.archive_dir.exists():
+            return stats
+        
+        for root, dirs, files in os.walk(self.archive_dir):
+            dirs.sort()
+            for filename in sorted(files):
+                file_path = Path(root) / filename
+                arcname = Path('archive') / file_path.relative_to(self.archive_dir)
+                writer.add_file(file_path, arcname, self._compress_type_for(file_path), self.compresslevel)
+                
+                stats['files'] += 1
+                stats['bytes'] += file_path.stat().st_size
+        
+        return stats
+    
+    def _backup_uploads_incremental(self, writer: ParallelZipWriter) -> Dict:
+        """
+        Guarda en el almacén de chunks los archivos de uploads que aún no estén
+        y agrega al ZIP el manifiesto que los referencia por hash
+        """
+        stats = {'files': 0, 'bytes': 0, 'new_chunks': 0, 'new_bytes': 0}
+        manifest = {}
+        
+        if self.uploads_dir.exists():
+            for root, dirs, files in os.walk(self.uploads_dir):
+                dirs.sort()
+                for filename in sorted(files):
+                    file_path = Path(root) / filename
+                    relative = file_path.relative_to(self.uploads_dir).as_posix()
+                    
+                    chunk = self.chunk_store.put_file(file_path, index_key=relative)
+                    manifest[relative] = {'sha256': chunk['sha256'], 'size': chunk['size']}
+                    
+                    stats['files'] += 1
+                    stats['bytes'] += chunk['size']
+                    if chunk['stored']:
+                        stats['new_chunks'] += 1
+                        stats['new_bytes'] += chunk['size']
+            
+            self.chunk_store.save_index()
+        
+        writer.writestr(UPLOAD_MANIFEST, json.dumps({'files': manifest}, indent=2, ensure_ascii=False))
+        return stats
+    
+    def _iter_backup_files(self):
+        """Recorre los archivos ZIP de todos los tipos de backup"""
+        for backup_type in ['automatic', 'manual', 'imported']:
+            backup_subdir = self.backup_dir / backup_type
+            if backup_subdir.exists():
+                yield from backup_subdir.glob('*.zip')
+    
+    def collect_unreferenced_chunks(self) -> Dict:
+        """
+        Elimina del almacén los chunks que no referencia ningún backup existente.
+        Si algún manifiesto no se puede leer no se elimina nada: sus chunks
+        quedarían contados como no referenciados.
+        """
+        try:
+            with _chunk_store_lock:
+                referenced = set()
+                for backup_file in self._iter_backup_files():
+                    manifest = read_upload_manifest(backup_file, strict=True)
+                    if manifest:
+                        referenced.update(entry['sha256'] for entry in manifest.values())
+                
+                result = self.chunk_store.collect_garbage(referenced)
+            result['success'] = True
+            return result
+        
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e)
+            }
     
     def _create_backup_metadata(self, backup_type: str, reason: str, timestamp: str) -> Dict:
         """
@@ -135,6 +425,11 @@ class BackupService:
             'created_at': datetime.now().isoformat(),
             'reason': reason,
             'version': '1.0',
+            'compression': {
+                'codec': self.codec,
+                'level': self.compresslevel,
+                'codec_by_extension': self.codec_by_extension
+            },
             'database_stats': self._get_database_stats()
         }
         
@@ -162,16 +457,6 @@ class BackupService:
         
         return stats
     
-    def _create_zip_backup(self, source_dir: Path, zip_path: Path):
-        """
-        Crea un archivo ZIP comprimido con todos los archivos del backup
-        """
-        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED, compresslevel=9) as zipf:
-            for file_path in source_dir.rglob('*'):
-                if file_path.is_file():
-                    arcname = file_path.relative_to(source_dir)
-                    zipf.write(file_path, arcname)
-    
     def _log_backup_activity(self, backup_info: Dict):
         """
         Registra la actividad de backup en el sistema
@@ -206,17 +491,8 @@ class BackupService:
                 'imported': []
             }
             
-            for backup_type in ['automatic', 'manual', 'imported']:
-                backup_subdir = self.backup_dir / backup_type
-                if backup_subdir.exists():
-                    for backup_file in backup_subdir.glob('*.zip'):
-                        backup_info = self._get_backup_info(backup_file)
-                        if backup_info:
-                            backups[backup_type].append(backup_info)
-            
-            # Ordenar por fecha de creación (más reciente primero)
-            for backup_type in backups:
-                backups[backup_type].sort(key=lambda x: x['created_at'], reverse=True)
+            for backup_info in self.catalog.list():
+                backups[backup_info['type']].append(backup_info)
             
             return {
                 'success': True,
@@ -229,35 +505,6 @@ class BackupService:
                 'error': str(e)
             }
     
-    def _get_backup_info(self, backup_path: Path) -> Optional[Dict]:
-        """
-        Obtiene información de un archivo de backup
-        """
-        try:
-            stat = backup_path.stat()
-            
-            # Intentar leer metadata del ZIP
-            metadata = None
-            try:
-                with zipfile.ZipFile(backup_path, 'r') as zipf:
-                    if 'backup_metadata.json' in zipf.namelist():
-                        with zipf.open('backup_metadata.json') as f:
-                            metadata = json.load(f)
-            except:
-                pass
-            
-            return {
-                'name': backup_path.stem,
-                'path': str(backup_path),
-                'size': stat.st_size,
-                'size_mb': round(stat.st_size / (1024 * 1024), 2),
-                'created_at': datetime.fromtimestamp(stat.st_mtime).isoformat(),
-                'metadata': metadata
-            }
-            
-        except Exception:
-            return None
-    
     def cleanup_old_backups(self, retention_days: int = 7, keep_minimum: int = 3) -> Dict:
         """
         Elimina backups automáticos obsoletos según política de retención
@@ -297,15 +544,20 @@ class BackupService:
                 elif file_date < cutoff_date:
                     # Eliminar los que superan la fecha de retención
                     backup_file.unlink()
+                    self.catalog.remove(backup_file)
                     deleted_count += 1
                 else:
                     # Mantener los que están dentro del período de retención
                     kept_count += 1
             
+            # Liberar los chunks que solo usaban los backups eliminados
+            chunks_result = self.collect_unreferenced_chunks() if deleted_count else {}
+            
             return {
                 'success': True,
                 'deleted_count': deleted_count,
                 'kept_count': kept_count,
+                'chunks_deleted': chunks_result.get('deleted_count', 0),
                 'retention_days': retention_days,
                 'keep_minimum': keep_minimum,
                 'message': f'Política de retención aplicada: {deleted_count} eliminados, {kept_count} mantenidos'
@@ -325,6 +577,8 @@ class BackupService:
             backup_file = Path(backup_path)
             if backup_file.exists() and backup_file.suffix == '.zip':
                 backup_file.unlink()
+                self.catalog.remove(backup_file)
+                self.collect_unreferenced_chunks()
                 return {
                     'success': True,
                     'message': 'Backup eliminado exitosamente'
@@ -339,4 +593,25 @@ class BackupService:
             return {
                 'success': False,
                 'error': str(e)
-            }
\ No newline at end of file
+            }
+
+def read_upload_manifest(backup_path: Path, strict: bool = False) -> Optional[Dict]:
+    """
+    Lee el manifiesto de uploads de un backup incremental
+    
+    Args:
+        strict: Propagar los errores de lectura en lugar de retornar None
+    
+    Returns:
+        Dict ruta -> {sha256, size}, o None si el backup es completo
+    """
+    try:
+        with zipfile.ZipFile(backup_path, 'r') as zipf:
+            if UPLOAD_MANIFEST not in zipf.namelist():
+                return None
+            with zipf.open(UPLOAD_MANIFEST) as f:
+                return json.load(f).get('files', {})
+    except (zipfile.BadZipFile, OSError, ValueError) as e:
+        if strict:
+            raise ValueError(f"No se pudo leer el manifiesto de uploads de {backup_path.name}: {e}")
+        return None
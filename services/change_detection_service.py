@@ -1,8 +1,14 @@
+import os
 import sqlite3
 import json
+import threading
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
-from database.database import DatabaseManager
+from database.database import CHANGE_CAPTURE_TABLES, DatabaseManager
+
+# Bases de datos cuya tabla change_tracking ya se verificó en este proceso
+_tracking_tables_ready = set()
+_tracking_tables_lock = threading.Lock()
 
 class ChangeDetectionService:
     def __init__(self):
@@ -11,94 +17,46 @@ class ChangeDetectionService:
     
     def _ensure_change_tracking_table(self):
         """
-        Crea la tabla para rastrear cambios si no existe
+        Crea la tabla para rastrear cambios si no existe (una sola vez por proceso)
         """
-        with self.db_manager.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS change_tracking (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    table_name TEXT NOT NULL,
-                    operation TEXT NOT NULL,
-                    record_id INTEGER,
-                    change_data TEXT,
-                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    backup_processed BOOLEAN DEFAULT FALSE
-                )
-            """)
-            
-            # Crear índices para mejorar el rendimiento
-            cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_change_tracking_table 
-                ON change_tracking(table_name)
-            """)
-            
-            cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_change_tracking_timestamp 
-                ON change_tracking(timestamp)
-            """)
-            
-            cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_change_tracking_processed 
-                ON change_tracking(backup_processed)
-            """)
-            
-            conn.commit()
+        db_key = os.path.abspath(self.db_manager.db_path)
+        with _tracking_tables_lock:
+            if db_key in _tracking_tables_ready:
+                return
+            self._create_change_tracking_table()
+            _tracking_tables_ready.add(db_key)
     
-    def record_change(self, table_name: str, operation: str, record_id: Optional[int] = None, 
-                     change_data: Optional[Dict] = None):
-        """
-        Registra un cambio en el sistema
-        
-        Args:
-            table_name: Nombre de la tabla afectada
-            operation: Tipo de operación (INSERT, UPDATE, DELETE)
-            record_id: ID del registro afectado
-            change_data: Datos adicionales del cambio
-        """
-        try:
-            with self.db_manager.get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    INSERT INTO change_tracking 
-                    (table_name, operation, record_id, change_data, timestamp)
-                    VALUES (?, ?, ?, ?, ?)
-                """, (
-                    table_name,
-                    operation,
-                    record_id,
-                    json.dumps(change_data) if change_data else None,
-                    datetime.now()
-                ))
-                conn.commit()
-        except Exception as e:
-            print(f"Error registrando cambio: {e}")
+    def _create_change_tracking_table(self):
+        # Las marcas de agua y los triggers de captura los crea init_database()
+        self.db_manager.init_change_tracking_table()
     
     def has_changes_since_last_backup(self) -> Dict:
         """
-        Verifica si hay cambios relevantes desde el último backup
+        Verifica si hay cambios relevantes desde el último backup.
+        Lee las marcas de agua por tabla, sin recorrer change_tracking.
         
         Returns:
-            Dict con información sobre cambios pendientes
+            Dict con información sobre cambios pendientes. high_water_mark es el
+            último cambio registrado; se pasa a mark_changes_as_processed()
+            para no marcar cambios hechos durante el backup.
         """
         try:
             # Tablas que requieren backup cuando cambian
-            relevant_tables = ['usuarios', 'clientes', 'contratos', 'suplementos', 
-                             'personas_responsables', 'documentos_contratos']
+            relevant_tables = CHANGE_CAPTURE_TABLES
             
             with self.db_manager.get_connection() as conn:
                 cursor = conn.cursor()
                 
-                # Buscar cambios no procesados en tablas relevantes
+                cursor.execute("SELECT MAX(last_change_id) FROM change_watermarks")
+                high_water_mark = cursor.fetchone()[0] or 0
+                
+                # Cambios pendientes por tabla y operación
                 placeholders = ','.join(['?' for _ in relevant_tables])
                 cursor.execute(f"""
-                    SELECT table_name, operation, COUNT(*) as change_count,
-                           MIN(timestamp) as first_change,
-                           MAX(timestamp) as last_change
-                    FROM change_tracking 
+                    SELECT table_name, operation, pending_changes, first_change, last_change
+                    FROM change_watermarks
                     WHERE table_name IN ({placeholders})
-                    AND backup_processed = FALSE
-                    GROUP BY table_name, operation
+                    AND pending_changes > 0
                     ORDER BY last_change DESC
                 """, relevant_tables)
                 
@@ -109,6 +67,7 @@ class ChangeDetectionService:
                         'has_changes': False,
                         'changes': [],
                         'total_changes': 0,
+                        'high_water_mark': high_water_mark,
                         'message': 'No hay cambios pendientes de backup'
                     }
                 
@@ -131,6 +90,7 @@ class ChangeDetectionService:
                     'has_changes': True,
                     'changes': formatted_changes,
                     'total_changes': total_changes,
+                    'high_water_mark': high_water_mark,
                     'message': f'Se encontraron {total_changes} cambios pendientes de backup'
                 }
                 
@@ -141,27 +101,50 @@ class ChangeDetectionService:
                 'message': f'Error verificando cambios: {str(e)}'
             }
     
-    def mark_changes_as_processed(self) -> Dict:
+    def mark_changes_as_processed(self, up_to_id: Optional[int] = None) -> Dict:
         """
-        Marca todos los cambios pendientes como procesados después de un backup
+        Marca los cambios pendientes como procesados después de un backup
+        
+        Args:
+            up_to_id: Último cambio incluido en el backup (high_water_mark de
+                has_changes_since_last_backup). Sin él se marcan todos.
         """
         try:
             with self.db_manager.get_connection() as conn:
                 cursor = conn.cursor()
                 
-                # Contar cambios antes de marcarlos
-                cursor.execute("""
-                    SELECT COUNT(*) FROM change_tracking 
-                    WHERE backup_processed = FALSE
-                """)
-                pending_count = cursor.fetchone()[0]
+                if up_to_id is None:
+                    cursor.execute("SELECT COALESCE(MAX(id), 0) FROM change_tracking")
+                    up_to_id = cursor.fetchone()[0]
+                
+                cursor.execute("SELECT COALESCE(SUM(pending_changes), 0) FROM change_watermarks")
+                pending_before = cursor.fetchone()[0]
                 
                 # Marcar como procesados
                 cursor.execute("""
                     UPDATE change_tracking 
                     SET backup_processed = TRUE 
-                    WHERE backup_processed = FALSE
-                """)
+                    WHERE backup_processed = FALSE AND id <= ?
+                """, (up_to_id,))
+                
+                # Dejar en las marcas de agua solo los cambios posteriores al backup
+                cursor.execute("""
+                    UPDATE change_watermarks SET
+                        pending_changes = (
+                            SELECT COUNT(*) FROM change_tracking c
+                            WHERE c.id > ? AND c.table_name = change_watermarks.table_name
+                            AND c.operation = change_watermarks.operation
+                        ),
+                        first_change = (
+                            SELECT MIN(c.timestamp) FROM change_tracking c
+                            WHERE c.id > ? AND c.table_name = change_watermarks.table_name
+                            AND c.operation = change_watermarks.operation
+                        )
+                    WHERE pending_changes > 0
+                """, (up_to_id, up_to_id))
+                
+                cursor.execute("SELECT COALESCE(SUM(pending_changes), 0) FROM change_watermarks")
+                pending_count = pending_before - cursor.fetchone()[0]
                 
                 conn.commit()
                 
@@ -311,39 +294,3 @@ class ChangeDetectionService:
         except Exception as e:
             print(f"Error obteniendo información del último backup: {e}")
             return None
-
-# Funciones auxiliares para integrar con las operaciones de BD existentes
-def track_user_change(operation: str, user_id: Optional[int] = None, user_data: Optional[Dict] = None):
-    """
-    Función auxiliar para rastrear cambios en usuarios
-    """
-    service = ChangeDetectionService()
-    service.record_change('usuarios', operation, user_id, user_data)
-
-def track_contract_change(operation: str, contract_id: Optional[int] = None, contract_data: Optional[Dict] = None):
-    """
-    Función auxiliar para rastrear cambios en contratos
-    """
-    service = ChangeDetectionService()
-    service.record_change('contratos', operation, contract_id, contract_data)
-
-def track_supplement_change(operation: str, supplement_id: Optional[int] = None, supplement_data: Optional[Dict] = None):
-    """
-    Función auxiliar para rastrear cambios en suplementos
-    """
-    service = ChangeDetectionService()
-    service.record_change('suplementos', operation, supplement_id, supplement_data)
-
-def track_client_change(operation: str, client_id: Optional[int] = None, client_data: Optional[Dict] = None):
-    """
-    Función auxiliar para rastrear cambios en clientes
-    """
-    service = ChangeDetectionService()
-    service.record_change('clientes', operation, client_id, client_data)
-
-def track_document_change(operation: str, document_id: Optional[int] = None, document_data: Optional[Dict] = None):
-    """
-    Función auxiliar para rastrear cambios en documentos
-    """
-    service = ChangeDetectionService()
-    service.record_change('documentos_contratos', operation, document_id, document_data)
\ No newline at end of file
@@ -0,0 +1,120 @@
+import os
+import json
+import hashlib
+import shutil
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+# Tamaño de lectura para calcular hashes y copiar archivos
+READ_BLOCK_SIZE = 1024 * 1024
+
+class ChunkStore:
+    """
+    Almacén direccionado por contenido para los archivos de uploads.
+    
+    Cada archivo se guarda una sola vez en chunks/<aa>/<sha256>, sin importar
+    cuántos backups incrementales lo referencien. Un índice (ruta, tamaño, mtime)
+    evita volver a calcular el hash de los archivos que no cambiaron.
+    """
+    
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.index_path = self.root / 'index.json'
+        self._index = self._load_index()
+    
+    def _load_index(self) -> Dict:
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    def save_index(self):
+        """Guarda el índice de hashes de forma atómica"""
+        temp_path = self.index_path.with_suffix('.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._index, f)
+        os.replace(temp_path, self.index_path)
+    
+    def chunk_path(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest
+    
+    def has(self, digest: str) -> bool:
+        return self.chunk_path(digest).exists()
+    
+    def _hash_file(self, file_path: Path) -> str:
+        sha256 = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(READ_BLOCK_SIZE), b''):
+                sha256.update(block)
+        return sha256.hexdigest()
+    
+    def put_file(self, file_path: Path, index_key: Optional[str] = None) -> Dict:
+        """
+        Agrega un archivo al almacén si su contenido no estaba guardado.
+        
+        Returns:
+            Dict con sha256, size y stored (True si se copió un chunk nuevo)
+        """
+        stat = file_path.stat()
+        index_key = index_key or str(file_path)
+        cached = self._index.get(index_key)
+        
+        if cached and cached['size'] == stat.st_size and cached['mtime_ns'] == stat.st_mtime_ns:
+            digest = cached['sha256']
+        else:
+            digest = self._hash_file(file_path)
+            self._index[index_key] = {
+                'size': stat.st_size,
+                'mtime_ns': stat.st_mtime_ns,
+                'sha256': digest
+            }
+        
+        stored = False
+        destino = self.chunk_path(digest)
+        if not destino.exists():
+            destino.parent.mkdir(exist_ok=True)
+            temp_path = destino.with_name(destino.name + '.partial')
+            shutil.copyfile(file_path, temp_path)
+            os.replace(temp_path, destino)
+            stored = True
+        
+        return {'sha256': digest, 'size': stat.st_size, 'stored': stored}
+    
+    def restore_file(self, digest: str, destino: Path):
+        """Copia el contenido de un chunk a la ruta indicada"""
+        origen = self.chunk_path(digest)
+        if not origen.exists():
+            raise FileNotFoundError(f"Chunk no encontrado en el almacén: {digest}")
+        destino.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(origen, destino)
+    
+    def collect_garbage(self, referenced: Iterable[str]) -> Dict:
+        """
+        Elimina los chunks que ya no referencia ningún backup
+        
+        Args:
+            referenced: Hashes usados por los manifiestos existentes
+        """
+        referenced = set(referenced)
+        deleted_count = 0
+        freed_bytes = 0
+        
+        for subdir in self.root.iterdir():
+            if not subdir.is_dir():
+                continue
+            for chunk in subdir.iterdir():
+                # Los .partial son copias en curso de put_file, no chunks terminados
+                if chunk.name.endswith('.partial'):
+                    continue
+                if chunk.name not in referenced:
+                    freed_bytes += chunk.stat().st_size
+                    chunk.unlink()
+                    deleted_count += 1
+        
+        # Olvidar los hashes del índice cuyo chunk ya no existe
+        self._index = {key: entry for key, entry in self._index.items() if entry['sha256'] in referenced}
+        self.save_index()
+        
+        return {'deleted_count': deleted_count, 'freed_bytes': freed_bytes}
@@ -5,207 +5,227 @@ Sistema de Recordatorios de Contratos
 Genera notificaciones automáticas para contratos próximos a vencer
 """
 
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from database import db_manager
-from database.models import Contrato, Notificacion, Usuario
+from database.models import Notificacion, Usuario
 import logging
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Umbral de cada recordatorio: se envía cuando faltan como máximo esos días.
+# Un contrato vencido tiene -1 días o menos. Ordenados del más urgente al menos urgente.
+REMINDER_THRESHOLDS = [
+    ('expired', -1),
+    ('urgent', 7),      # 7 días antes
+    ('warning', 30),    # 30 días antes
+    ('notice', 90)      # 90 días antes
+]
+
 class ContractReminderSystem:
-    """Sistema de recordatorios para contratos"""
+    """
+    Sistema de recordatorios para contratos.
+    
+    Cada ejecución consulta, con el índice (estado, fecha_fin), solo los contratos
+    cuyo vencimiento cruzó un umbral desde la ejecución anterior, más los
+    contratos modificados desde entonces. reminder_ledger guarda qué recordatorio
+    se envió por contrato para no repetirlo.
+    """
     
     def __init__(self):
-        self.reminder_periods = {
-            'urgent': 7,      # 7 días antes
-            'warning': 30,    # 30 días antes
-            'notice': 90      # 90 días antes
-        }
+        self.reminder_periods = {tipo: dias for tipo, dias in REMINDER_THRESHOLDS if dias >= 0}
     
-    def check_expiring_contracts(self):
+    def check_expiring_contracts(self, today=None):
         """Verifica contratos próximos a vencer y genera notificaciones"""
         try:
             logger.info("Iniciando verificación de contratos próximos a vencer")
+            today = today or date.today()
             
-            # Obtener todos los contratos activos
-            contratos = Contrato.get_all()
-            active_contracts = [c for c in contratos if c.estado == 'activo']
+            with db_manager.get_connection() as conn:
+                cursor = conn.cursor()
+                last_run = cursor.execute(
+                    "SELECT run_date, ran_at FROM reminder_runs ORDER BY run_date DESC LIMIT 1"
+                ).fetchone()
+                
+                contratos = self._contracts_crossing_thresholds(cursor, today, last_run)
+                enviados = self._ledger_entries(cursor, list(contratos))
             
-            notifications_created = 0
+            notificaciones = []
+            ledger = []
             
-            for contrato in active_contracts:
-                notifications_created += self._process_contract_reminders(contrato)
+            for contrato in contratos.values():
+                reminder_type, days_until_expiry = self._reminder_for(contrato['fecha_fin'], today)
+                if reminder_type is None:
+                    continue
+                
+                # Ya avisado para esta fecha de vencimiento
+                if enviados.get((contrato['id'], reminder_type)) == contrato['fecha_fin']:
+                    continue
+                
+                notificacion = self._build_reminder_notification(contrato, reminder_type, days_until_expiry)
+                if notificacion is not None:
+                    notificaciones.append(notificacion)
+                ledger.append((contrato['id'], reminder_type, contrato['fecha_fin']))
             
-            logger.info(f"Proceso completado. {notifications_created} notificaciones creadas")
+            # Notificaciones, ledger y registro de la ejecución en una sola transacción:
+            # si algo falla no queda ningún recordatorio enviado sin su entrada en el ledger
+            with db_manager.get_connection() as conn:
+                cursor = conn.cursor()
+                notifications_created = Notificacion.create_many(notificaciones, cursor=cursor)
+                cursor.executemany("""
+                    INSERT INTO reminder_ledger (contract_id, reminder_type, fecha_fin, notified_at)
+                    VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+                    ON CONFLICT(contract_id, reminder_type) DO UPDATE SET
+                        fecha_fin = excluded.fecha_fin,
+                        notified_at = excluded.notified_at
+                """, ledger)
+                cursor.execute("""
+                    INSERT INTO reminder_runs (run_date, ran_at, notifications_created)
+                    VALUES (?, CURRENT_TIMESTAMP, ?)
+                    ON CONFLICT(run_date) DO UPDATE SET
+                        ran_at = excluded.ran_at,
+                        notifications_created = notifications_created + excluded.notifications_created
+                """, (today.isoformat(), notifications_created))
+                conn.commit()
+            
+            Notificacion.publish_created(notificaciones)
+            
+            logger.info(f"Proceso completado. {len(contratos)} contratos revisados, "
+                        f"{notifications_created} notificaciones creadas")
             return notifications_created
             
         except Exception as e:
             logger.error(f"Error al verificar contratos: {str(e)}")
             return 0
     
-    def _process_contract_reminders(self, contrato):
-        """Procesa recordatorios para un contrato específico"""
-        notifications_created = 0
+    def _contracts_crossing_thresholds(self, cursor, today, last_run):
+        """
+        Obtiene los contratos activos que cruzaron algún umbral desde la última
+        ejecución: faltaban más de N días entonces y ahora faltan N o menos.
+        En la primera ejecución se toman todos los que ya están dentro de un umbral.
+        """
+        columnas = "id, numero_contrato, titulo, usuario_responsable_id, fecha_fin"
+        contratos = {}
         
-        try:
-            # Calcular días hasta vencimiento
-            today = datetime.now().date()
-            expiry_date = contrato.fecha_fin.date() if hasattr(contrato.fecha_fin, 'date') else contrato.fecha_fin
-            days_until_expiry = (expiry_date - today).days
-            
-            # Verificar si el contrato ya venció
-            if days_until_expiry < 0:
-                notifications_created += self._create_expired_notification(contrato)
-                return notifications_created
-            
-            # Verificar cada período de recordatorio
-            for reminder_type, days_before in self.reminder_periods.items():
-                if days_until_expiry <= days_before:
-                    # Verificar si ya existe una notificación reciente para este contrato y tipo
-                    if not self._notification_exists_recently(contrato.id, reminder_type):
-                        notifications_created += self._create_reminder_notification(
-                            contrato, reminder_type, days_until_expiry
-                        )
-            
-            return notifications_created
-            
-        except Exception as e:
-            logger.error(f"Error procesando contrato {contrato.numero_contrato}: {str(e)}")
-            return 0
+        if last_run is None:
+            _, mayor_umbral = REMINDER_THRESHOLDS[-1]
+            cursor.execute(f"""
+                SELECT {columnas} FROM contratos
+                WHERE estado = 'activo' AND fecha_fin <= ?
+            """, ((today + timedelta(days=mayor_umbral)).isoformat(),))
+            for row in cursor.fetchall():
+                contratos[row['id']] = dict(row)
+            return contratos
+        
+        last_date = datetime.strptime(last_run['run_date'], '%Y-%m-%d').date()
+        if last_date < today:
+            for _, dias in REMINDER_THRESHOLDS:
+                cursor.execute(f"""
+                    SELECT {columnas} FROM contratos
+                    WHERE estado = 'activo' AND fecha_fin > ? AND fecha_fin <= ?
+                """, ((last_date + timedelta(days=dias)).isoformat(),
+                      (today + timedelta(days=dias)).isoformat()))
+                for row in cursor.fetchall():
+                    contratos[row['id']] = dict(row)
+        
+        # Contratos creados, renovados o reactivados después de la última ejecución
+        cursor.execute(f"""
+            SELECT {columnas} FROM contratos
+            WHERE fecha_modificacion >= ? AND estado = 'activo'
+        """, (last_run['ran_at'],))
+        for row in cursor.fetchall():
+            contratos[row['id']] = dict(row)
+        
+        return contratos
     
-    def _create_reminder_notification(self, contrato, reminder_type, days_until_expiry):
-        """Crea notificación de recordatorio"""
-        try:
-            # Definir títulos y mensajes según el tipo de recordatorio
-            titles = {
-                'urgent': '🚨 Contrato Próximo a Vencer',
-                'warning': '⚠️ Contrato Vence Pronto',
-                'notice': '📅 Recordatorio de Vencimiento'
-            }
-            
-            messages = {
-                'urgent': f'El contrato {contrato.numero_contrato} vence en {days_until_expiry} días. Acción inmediata requerida.',
-                'warning': f'El contrato {contrato.numero_contrato} vence en {days_until_expiry} días. Considere renovar o tomar acción.',
-                'notice': f'El contrato {contrato.numero_contrato} vence en {days_until_expiry} días. Planifique la renovación.'
-            }
-            
-            title = titles.get(reminder_type, 'Recordatorio de Contrato')
-            message = messages.get(reminder_type, f'Contrato {contrato.numero_contrato} requiere atención.')
-            
-            # Crear notificación para el usuario responsable
-            Notificacion.create_contract_notification(
-                user_id=contrato.usuario_responsable_id,
-                title=title,
-                message=message,
-                contract_id=contrato.id
-            )
-            
-            logger.info(f"Notificación {reminder_type} creada para contrato {contrato.numero_contrato}")
-            return 1
-            
-        except Exception as e:
-            logger.error(f"Error creando notificación para contrato {contrato.numero_contrato}: {str(e)}")
-            return 0
+    def _ledger_entries(self, cursor, contract_ids):
+        """Recordatorios ya enviados a los contratos indicados: {(id, tipo): fecha_fin}"""
+        enviados = {}
+        for inicio in range(0, len(contract_ids), 500):
+            lote = contract_ids[inicio:inicio + 500]
+            placeholders = ','.join(['?' for _ in lote])
+            cursor.execute(f"""
+                SELECT contract_id, reminder_type, fecha_fin FROM reminder_ledger
+                WHERE contract_id IN ({placeholders})
+            """, lote)
+            for row in cursor.fetchall():
+                enviados[(row['contract_id'], row['reminder_type'])] = row['fecha_fin']
+        return enviados
     
-    def _create_expired_notification(self, contrato):
-        """Crea notificación para contrato vencido"""
-        try:
-            # Verificar si ya existe notificación de vencimiento reciente
-            if self._notification_exists_recently(contrato.id, 'expired'):
-                return 0
-            
-            today = datetime.now().date()
-            expiry_date = contrato.fecha_fin.date() if hasattr(contrato.fecha_fin, 'date') else contrato.fecha_fin
-            days_expired = (today - expiry_date).days
-            
-            title = '🔴 Contrato Vencido'
-            message = f'El contrato {contrato.numero_contrato} venció hace {days_expired} días. Requiere atención inmediata.'
-            
-            Notificacion.create_contract_notification(
-                user_id=contrato.usuario_responsable_id,
-                title=title,
-                message=message,
-                contract_id=contrato.id
-            )
-            
-            logger.info(f"Notificación de vencimiento creada para contrato {contrato.numero_contrato}")
-            return 1
-            
-        except Exception as e:
-            logger.error(f"Error creando notificación de vencimiento para contrato {contrato.numero_contrato}: {str(e)}")
-            return 0
+    def _reminder_for(self, fecha_fin, today):
+        """Recordatorio más urgente que corresponde a una fecha de vencimiento"""
+        if not fecha_fin:
+            return None, None
+        
+        expiry_date = datetime.strptime(str(fecha_fin)[:10], '%Y-%m-%d').date()
+        days_until_expiry = (expiry_date - today).days
+        
+        for reminder_type, dias in REMINDER_THRESHOLDS:
+            if days_until_expiry <= dias:
+                return reminder_type, days_until_expiry
+        return None, days_until_expiry
     
-    def _notification_exists_recently(self, contract_id, notification_type, days=1):
-        """Verifica si ya existe una notificación reciente para el contrato"""
-        try:
-            # Buscar notificaciones recientes para este contrato
-            cutoff_date = datetime.now() - timedelta(days=days)
-            
-            query = """
-                SELECT COUNT(*) as count
-                FROM notificaciones 
-                WHERE contract_id = ? 
-                AND created_at >= ? 
-                AND (title LIKE ? OR message LIKE ?)
-            """
-            
-            # Patrones de búsqueda según el tipo
-            patterns = {
-                'urgent': '%Próximo a Vencer%',
-                'warning': '%Vence Pronto%',
-                'notice': '%Recordatorio%',
-                'expired': '%Vencido%'
-            }
-            
-            pattern = patterns.get(notification_type, '%')
-            
-            with db_manager.get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute(query, (contract_id, cutoff_date, pattern, pattern))
-                result = cursor.fetchone()
-                return result['count'] > 0 if result else False
-                
-        except Exception as e:
-            logger.error(f"Error verificando notificaciones existentes: {str(e)}")
-            return False
+    def _build_reminder_notification(self, contrato, reminder_type, days_until_expiry):
+        """Prepara la notificación de recordatorio para el usuario responsable"""
+        numero_contrato = contrato['numero_contrato']
+        if not contrato['usuario_responsable_id']:
+            return None
+        
+        # Definir títulos y mensajes según el tipo de recordatorio
+        titles = {
+            'expired': '🔴 Contrato Vencido',
+            'urgent': '🚨 Contrato Próximo a Vencer',
+            'warning': '⚠️ Contrato Vence Pronto',
+            'notice': '📅 Recordatorio de Vencimiento'
+        }
+        
+        messages = {
+            'expired': f'El contrato {numero_contrato} venció hace {-days_until_expiry} días. Requiere atención inmediata.',
+            'urgent': f'El contrato {numero_contrato} vence en {days_until_expiry} días. Acción inmediata requerida.',
+            'warning': f'El contrato {numero_contrato} vence en {days_until_expiry} días. Considere renovar o tomar acción.',
+            'notice': f'El contrato {numero_contrato} vence en {days_until_expiry} días. Planifique la renovación.'
+        }
+        
+        logger.info(f"Notificación {reminder_type} preparada para contrato {numero_contrato}")
+        return Notificacion(
+            usuario_id=contrato['usuario_responsable_id'],
+            title=titles.get(reminder_type, 'Recordatorio de Contrato'),
+            message=messages.get(reminder_type, f'Contrato {numero_contrato} requiere atención.'),
+            type='contract_expired' if reminder_type == 'expired' else 'contract_expiring',
+            contract_id=contrato['id']
+        )
     
-    def create_system_reminders(self):
+    def create_system_reminders(self, today=None):
         """Crea recordatorios del sistema para administradores"""
         try:
-            # Obtener estadísticas de contratos
-            contratos = Contrato.get_all()
-            active_contracts = [c for c in contratos if c.estado == 'activo']
-            
-            today = datetime.now().date()
-            expiring_soon = []
-            expired = []
+            today = today or date.today()
             
-            for contrato in active_contracts:
-                expiry_date = contrato.fecha_fin.date() if hasattr(contrato.fecha_fin, 'date') else contrato.fecha_fin
-                days_until_expiry = (expiry_date - today).days
-                
-                if days_until_expiry < 0:
-                    expired.append(contrato)
-                elif days_until_expiry <= 30:
-                    expiring_soon.append(contrato)
+            # Conteos por rango de fecha_fin sobre el índice (estado, fecha_fin)
+            with db_manager.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT
+                        COUNT(CASE WHEN fecha_fin < ? THEN 1 END) AS expired,
+                        COUNT(CASE WHEN fecha_fin >= ? THEN 1 END) AS expiring_soon
+                    FROM contratos
+                    WHERE estado = 'activo' AND fecha_fin <= ?
+                """, (today.isoformat(), today.isoformat(), (today + timedelta(days=30)).isoformat()))
+                row = cursor.fetchone()
+                expired, expiring_soon = row['expired'], row['expiring_soon']
             
             # Crear notificación para administradores si hay contratos que requieren atención
             if expiring_soon or expired:
                 admins = [u for u in Usuario.get_all() if u.es_admin]
                 
                 title = '📊 Resumen de Contratos - Atención Requerida'
-                message = f'Contratos que requieren atención: {len(expiring_soon)} próximos a vencer, {len(expired)} vencidos.'
+                message = f'Contratos que requieren atención: {expiring_soon} próximos a vencer, {expired} vencidos.'
                 
-                notifications_created = 0
-                for admin in admins:
-                    Notificacion.create_system_notification(
-                        user_id=admin.id,
-                        title=title,
-                        message=message
-                    )
-                    notifications_created += 1
+                notifications_created = Notificacion.create_for_users(
+                    [admin.id for admin in admins],
+                    title=title,
+                    message=message
+                )
                 
                 logger.info(f"Notificaciones de resumen enviadas a {notifications_created} administradores")
                 return notifications_created
@@ -0,0 +1,103 @@
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from database import db_manager
+
+# Claves de las estadísticas devueltas por cada ámbito
+STATS_KEYS = [
+    'total_contratos', 'contratos_activos', 'contratos_pendientes',
+    'contratos_suspendidos', 'contratos_terminados', 'contratos_cancelados',
+    'valor_total', 'proximos_vencer', 'contratos_vencidos'
+]
+
+class ContractStatsService:
+    """
+    Estadísticas de contratos calculadas en SQLite con una sola consulta
+    agregada por ámbito (global, por cliente o por usuario responsable)
+    """
+    
+    def __init__(self, dias_proximos_vencer: int = 30):
+        self.dias_proximos_vencer = dias_proximos_vencer
+    
+    def _aggregate_query(self, where: str = '', group_by: Optional[str] = None):
+        """
+        Construye la consulta agregada. Las fechas se pasan como parámetros
+        para usar la fecha local del servidor, igual que el cálculo anterior en Python.
+        """
+        select_group = f"{group_by} AS grupo, " if group_by else ''
+        query = f"""
+            SELECT {select_group}
+                COUNT(*) AS total_contratos,
+                COALESCE(SUM(estado = 'activo'), 0) AS contratos_activos,
+                COALESCE(SUM(estado = 'borrador'), 0) AS contratos_pendientes,
+                COALESCE(SUM(estado = 'suspendido'), 0) AS contratos_suspendidos,
+                COALESCE(SUM(estado = 'terminado'), 0) AS contratos_terminados,
+                COALESCE(SUM(estado = 'cancelado'), 0) AS contratos_cancelados,
+                COALESCE(SUM(CASE WHEN estado = 'activo' THEN monto_actual END), 0) AS valor_total,
+                COALESCE(SUM(estado = 'activo' AND fecha_fin <= ?), 0) AS proximos_vencer,
+                COALESCE(SUM(estado = 'activo' AND fecha_fin < ?), 0) AS contratos_vencidos
+            FROM contratos
+            {where}
+        """
+        if group_by:
+            query += f" GROUP BY {group_by}"
+        
+        hoy = datetime.now().date()
+        fecha_limite = hoy + timedelta(days=self.dias_proximos_vencer)
+        return query, [fecha_limite.isoformat(), hoy.isoformat()]
+    
+    @staticmethod
+    def _row_to_stats(row) -> Dict:
+        """Convierte una fila agregada en diccionario de estadísticas"""
+        return {key: row[key] for key in STATS_KEYS}
+    
+    def get_stats(self, cliente_id: Optional[int] = None, usuario_id: Optional[int] = None,
+                  estado: Optional[str] = None, contrato_ids: Optional[List[int]] = None) -> Dict:
+        """
+        Obtiene las estadísticas de un ámbito con una sola consulta
+        
+        Args:
+            cliente_id: Limitar a los contratos de un cliente
+            usuario_id: Limitar a los contratos de un usuario responsable
+            estado: Limitar a un estado concreto
+            contrato_ids: Limitar a un conjunto de contratos (por ejemplo, resultados de búsqueda)
+        """
+        condiciones = []
+        filtros = []
+        
+        if cliente_id:
+            condiciones.append("cliente_id = ?")
+            filtros.append(cliente_id)
+        
+        if usuario_id:
+            condiciones.append("usuario_responsable_id = ?")
+            filtros.append(usuario_id)
+        
+        if estado:
+            condiciones.append("estado = ?")
+            filtros.append(estado)
+        
+        if contrato_ids is not None:
+            if not contrato_ids:
+                return {key: 0 for key in STATS_KEYS}
+            placeholders = ','.join(['?' for _ in contrato_ids])
+            condiciones.append(f"id IN ({placeholders})")
+            filtros.extend(contrato_ids)
+        
+        where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ''
+        query, params = self._aggregate_query(where)
+        
+        result = db_manager.execute_query(query, params + filtros)
+        return self._row_to_stats(result[0])
+    
+    def get_stats_by_cliente(self) -> Dict[int, Dict]:
+        """Obtiene las estadísticas de todos los clientes con una consulta agrupada"""
+        return self._get_grouped_stats('cliente_id')
+    
+    def get_stats_by_usuario(self) -> Dict[int, Dict]:
+        """Obtiene las estadísticas de todos los usuarios responsables con una consulta agrupada"""
+        return self._get_grouped_stats('usuario_responsable_id')
+    
+    def _get_grouped_stats(self, group_by: str) -> Dict[int, Dict]:
+        query, params = self._aggregate_query(group_by=group_by)
+        results = db_manager.execute_query(query, params)
+        return {row['grupo']: self._row_to_stats(row) for row in results}
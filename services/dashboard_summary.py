@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Resumen materializado del dashboard
+Lee los totales mantenidos por triggers en dashboard_summary y permite reconstruirlos
+"""
+
+from datetime import datetime, timedelta
+from typing import Dict
+from database import db_manager
+import logging
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class DashboardSummaryService:
+    """
+    Consulta el resumen del dashboard. El coste no depende del número de contratos:
+    se leen unas pocas filas por estado y los vencimientos de los próximos días.
+    """
+    
+    def __init__(self, dias_proximos_vencer: int = 30):
+        self.dias_proximos_vencer = dias_proximos_vencer
+    
+    def get_summary(self) -> Dict:
+        """
+        Obtiene los totales por estado de contratos y suplementos
+        
+        Returns:
+            dict: {'contratos': {estado: {'total', 'valor'}}, 'suplementos': {...}}
+        """
+        resumen = {'contratos': {}, 'suplementos': {}}
+        rows = db_manager.execute_query("SELECT ambito, clave, total, valor FROM dashboard_summary")
+        for row in rows:
+            resumen.setdefault(row['ambito'], {})[row['clave']] = {
+                'total': row['total'],
+                'valor': round(row['valor'] or 0, 2)
+            }
+        return resumen
+    
+    def get_proximos_vencer(self) -> int:
+        """Cuenta los contratos activos que vencen dentro del plazo configurado (incluye vencidos)"""
+        fecha_limite = datetime.now().date() + timedelta(days=self.dias_proximos_vencer)
+        result = db_manager.execute_query(
+            "SELECT COALESCE(SUM(activos), 0) AS total FROM dashboard_vencimientos WHERE fecha_fin <= ?",
+            (fecha_limite.isoformat(),)
+        )
+        return result[0]['total']
+    
+    def get_dashboard_stats(self) -> Dict:
+        """Estadísticas de contratos que muestra el dashboard"""
+        contratos = self.get_summary()['contratos']
+        activos = contratos.get('activo', {'total': 0, 'valor': 0})
+        
+        return {
+            'total_contratos': sum(estado['total'] for estado in contratos.values()),
+            'contratos_activos': activos['total'],
+            'valor_total': activos['valor'],
+            'proximos_vencer': self.get_proximos_vencer(),
+            'contratos_por_estado': {clave: estado['total'] for clave, estado in contratos.items()}
+        }
+    
+    def rebuild(self) -> Dict:
+        """Reconstruye el resumen completo desde las tablas de origen"""
+        logger.info("Reconstruyendo resumen del dashboard")
+        db_manager.rebuild_dashboard_summary()
+        return self.get_summary()
+
+def rebuild_dashboard_summary():
+    """Función principal para reparar el resumen del dashboard"""
+    resumen = DashboardSummaryService().rebuild()
+    
+    print("Resumen del dashboard reconstruido exitosamente.")
+    for ambito, estados in resumen.items():
+        for estado, datos in sorted(estados.items()):
+            print(f"- {ambito}/{estado}: {datos['total']} (valor {datos['valor']})")
+    
+    return resumen
+
+if __name__ == '__main__':
+    rebuild_dashboard_summary()
@@ -6,8 +6,12 @@ from typing import Dict, List, Optional, Tuple
 from werkzeug.utils import secure_filename
 from database.models import DocumentoContrato
 from database.database import DatabaseManager
+from database.models.pagination import Page, build_page, keyset_filter, order_by
 
 class DocumentService:
+    # Orden estable del listado paginado de documentos
+    PAGE_KEY = ['d.fecha_subida', 'd.id']
+    
     def __init__(self):
         self.db_manager = DatabaseManager()
         self.base_upload_dir = Path('uploads')
@@ -174,21 +178,43 @@ class DocumentService:
         except Exception as e:
             return []
     
-    def get_all_documents(self) -> List[Dict]:
+    def get_all_documents(self, cursor: Optional[str] = None, page_size: Optional[int] = None) -> List[Dict]:
         """
         Obtiene información de todos los documentos en el sistema
+        
+        Con page_size retorna una Page (los más recientes primero) cuyo next_cursor
+        se pasa como cursor para obtener la página siguiente.
+        
+        Raises:
+            ValueError: Si el cursor no es válido
         """
+        condiciones = []
+        params = []
+        
+        if page_size:
+            keyset, keyset_params = keyset_filter(self.PAGE_KEY, cursor, descending=True)
+            if keyset:
+                condiciones.append(keyset)
+                params.extend(keyset_params)
+        
+        where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ''
+        limit = "LIMIT ?" if page_size else ''
+        if page_size:
+            params.append(page_size + 1)
+        
         try:
             with self.db_manager.get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute("""
+                db_cursor = conn.cursor()
+                db_cursor.execute(f"""
                     SELECT d.*, c.titulo as contrato_titulo
                     FROM documentos_contratos d
                     LEFT JOIN contratos c ON d.contrato_id = c.id
-                    ORDER BY d.fecha_subida DESC
-                """)
+                    {where}
+                    {order_by(self.PAGE_KEY, descending=True)}
+                    {limit}
+                """, params)
                 
-                results = cursor.fetchall()
+                results = db_cursor.fetchall()
                 documents = []
                 
                 for row in results:
@@ -206,10 +232,12 @@ class DocumentService:
                         'file_exists': file_path.exists()
                     })
                 
+                if page_size:
+                    return build_page(documents, page_size, lambda doc: (doc['fecha_subida'], doc['id']))
                 return documents
                 
         except Exception as e:
-            return []
+            return Page() if page_size else []
     
     def get_storage_stats(self) -> Dict:
         """
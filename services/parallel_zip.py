@@ -0,0 +1,168 @@
+import os
+import time
+import hashlib
+import zlib
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional
+
+# Los archivos más grandes se comprimen en el hilo principal leyendo por bloques,
+# para no cargar archivos enormes completos en memoria
+PARALLEL_MAX_MEMBER_SIZE = 32 * 1024 * 1024
+
+# Tamaño de lectura para calcular el SHA-256 de los archivos grandes
+HASH_BLOCK_SIZE = 1024 * 1024
+
+def default_workers() -> int:
+    """Número de hilos de compresión por defecto"""
+    return max(1, min(8, os.cpu_count() or 1))
+
+def _compress_member(file_path: Path, compress_type: int, compresslevel: Optional[int]):
+    """
+    Comprime un archivo en memoria con el mismo compresor que usa zipfile.
+    zlib, bz2 y lzma liberan el GIL, así que varios hilos usan varios núcleos.
+    """
+    with open(file_path, 'rb') as f:
+        data = f.read()
+    
+    crc = zlib.crc32(data)
+    digest = hashlib.sha256(data).hexdigest()
+    compressor = zipfile._get_compressor(compress_type, compresslevel)
+    if compressor is not None:
+        compressed = compressor.compress(data) + compressor.flush()
+    else:
+        compressed = data
+    return crc, digest, len(data), compressed
+
+def _hash_file(file_path: Path) -> str:
+    sha256 = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+class ParallelZipWriter:
+    """
+    Agrega archivos a un ZipFile comprimiéndolos en paralelo.
+    
+    Los miembros se comprimen en un pool de hilos y se escriben en el archivo
+    en el mismo orden en que se agregaron. Se limita la cantidad de miembros
+    pendientes para acotar la memoria usada. Registra el SHA-256 de cada miembro
+    en checksums.
+    """
+    
+    def __init__(self, zipf: zipfile.ZipFile, workers: Optional[int] = None,
+                 max_member_size: int = PARALLEL_MAX_MEMBER_SIZE):
+        self.zipf = zipf
+        self.workers = workers or default_workers()
+        self.max_member_size = max_member_size
+        self.max_pending = self.workers * 2
+        
+        self._executor = ThreadPoolExecutor(max_workers=self.workers) if self.workers > 1 else None
+        self._pending = deque()
+        self._started = time.monotonic()
+        self.stats = {'files': 0, 'input_bytes': 0, 'output_bytes': 0, 'parallel_files': 0}
+        self.checksums = {}
+    
+    def add_file(self, file_path: Path, arcname: str, compress_type: int, compresslevel: Optional[int] = None):
+        """Agrega un archivo al ZIP con el códec indicado"""
+        size = file_path.stat().st_size
+        
+        if (self._executor is not None and compress_type != zipfile.ZIP_STORED
+                and size <= self.max_member_size):
+            future = self._executor.submit(_compress_member, file_path, compress_type, compresslevel)
+            self._pending.append((file_path, str(arcname), compress_type, compresslevel, future))
+            self.stats['parallel_files'] += 1
+        else:
+            self._pending.append((file_path, str(arcname), compress_type, compresslevel, None))
+        
+        self._drain(self.max_pending)
+    
+    def _drain(self, limit: int):
+        """Escribe los miembros pendientes, en orden, hasta dejar como máximo limit"""
+        while len(self._pending) > limit:
+            file_path, arcname, compress_type, compresslevel, future = self._pending.popleft()
+            
+            if future is None:
+                digest = _hash_file(file_path)
+                self.zipf.write(file_path, arcname, compress_type=compress_type, compresslevel=compresslevel)
+                zinfo = self.zipf.getinfo(arcname)
+            else:
+                crc, digest, file_size, compressed = future.result()
+                zinfo = zipfile.ZipInfo.from_file(file_path, arcname)
+                zinfo.compress_type = compress_type
+                zinfo._compresslevel = compresslevel
+                zinfo.CRC = crc
+                zinfo.file_size = file_size
+                zinfo.compress_size = len(compressed)
+                self._write_compressed(zinfo, compressed)
+            
+            self._record(zinfo, digest)
+    
+    def _record(self, zinfo: zipfile.ZipInfo, digest: str):
+        self.checksums[zinfo.filename] = {'sha256': digest, 'size': zinfo.file_size}
+        self.stats['files'] += 1
+        self.stats['input_bytes'] += zinfo.file_size
+        self.stats['output_bytes'] += zinfo.compress_size
+    
+    def writestr(self, arcname: str, data: str):
+        """Agrega un miembro generado en memoria (manifiestos, metadata)"""
+        self._drain(0)
+        data = data.encode('utf-8')
+        self.zipf.writestr(arcname, data)
+        self._record(self.zipf.getinfo(arcname), hashlib.sha256(data).hexdigest())
+    
+    def _write_compressed(self, zinfo: zipfile.ZipInfo, compressed: bytes):
+        """
+        Escribe un miembro ya comprimido. zipfile no expone una API para datos
+        precomprimidos, así que se escribe la cabecera local y se registra el
+        miembro igual que lo hace ZipFile.write().
+        """
+        zipf = self.zipf
+        zipf._writecheck(zinfo)
+        zipf._didModify = True
+        
+        zinfo.header_offset = zipf.fp.tell()
+        if zinfo.compress_type == zipfile.ZIP_LZMA:
+            # Requiere la versión 6.3 del formato, igual que ZipFile.write()
+            zinfo.create_version = max(zinfo.create_version, zipfile.LZMA_VERSION)
+            zinfo.extract_version = max(zinfo.extract_version, zipfile.LZMA_VERSION)
+        elif zinfo.compress_type == zipfile.ZIP_BZIP2:
+            zinfo.create_version = max(zinfo.create_version, zipfile.BZIP2_VERSION)
+            zinfo.extract_version = max(zinfo.extract_version, zipfile.BZIP2_VERSION)
+        
+        zipf.fp.write(zinfo.FileHeader())
+        zipf.fp.write(compressed)
+        zipf.start_dir = zipf.fp.tell()
+        
+        zipf.filelist.append(zinfo)
+        zipf.NameToInfo[zinfo.filename] = zinfo
+    
+    def flush(self):
+        """Escribe todos los miembros pendientes (por ejemplo, antes de borrar un archivo temporal)"""
+        self._drain(0)
+    
+    def abort(self):
+        """Descarta los miembros pendientes tras un error"""
+        self._pending.clear()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+    
+    def close(self) -> Dict:
+        """
+        Escribe los miembros pendientes y retorna las estadísticas de compresión
+        """
+        try:
+            self._drain(0)
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True, cancel_futures=True)
+        
+        seconds = time.monotonic() - self._started
+        stats = dict(self.stats)
+        stats['workers'] = self.workers
+        stats['seconds'] = round(seconds, 3)
+        stats['throughput_mb_s'] = round(stats['input_bytes'] / (1024 * 1024) / seconds, 2) if seconds > 0 else None
+        return stats
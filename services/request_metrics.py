@@ -0,0 +1,179 @@
+# Métricas de latencia por endpoint, acumuladas en memoria desde que arrancó el proceso
+import threading
+import time
+from flask import g, has_request_context, request
+from database.database import add_query_listener
+
+# Límites superiores (ms) de los buckets del histograma de latencia
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# Endpoints que no se miden: los archivos estáticos dominarían los promedios, y la
+# conexión SSE dura minutos pero after_request solo ve cuándo se devuelve la respuesta
+EXCLUDED_ENDPOINTS = {'static', 'notifications.notification_stream'}
+
+
+def _percentile(buckets, count, fraction):
+    """Estima un percentil con el límite superior del bucket que lo contiene"""
+    if not count:
+        return 0
+    objetivo = count * fraction
+    acumulado = 0
+    for limite, cantidad in zip(LATENCY_BUCKETS_MS, buckets):
+        acumulado += cantidad
+        if acumulado >= objetivo:
+            return limite
+    return None   # Por encima del último bucket
+
+
+class RequestMetrics:
+    """
+    Acumula por endpoint el número de peticiones, los códigos de estado, un
+    histograma de latencia y las consultas SQL hechas con DatabaseManager.execute_*.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._started = time.time()
+        self._endpoints = {}
+    
+    def _new_entry(self):
+        return {
+            'count': 0,
+            'total_ms': 0.0,
+            'max_ms': 0.0,
+            'status': {},
+            'buckets': [0] * (len(LATENCY_BUCKETS_MS) + 1),
+            'sql_queries': 0,
+            'sql_ms': 0.0
+        }
+    
+    def record(self, endpoint, status_code, elapsed_ms, sql_queries=0, sql_ms=0.0):
+        """Registra una petición terminada (se ignoran los EXCLUDED_ENDPOINTS)"""
+        if endpoint in EXCLUDED_ENDPOINTS:
+            return
+        
+        bucket = len(LATENCY_BUCKETS_MS)
+        for i, limite in enumerate(LATENCY_BUCKETS_MS):
+            if elapsed_ms <= limite:
+                bucket = i
+                break
+        
+        with self._lock:
+            entry = self._endpoints.get(endpoint)
+            if entry is None:
+                entry = self._endpoints[endpoint] = self._new_entry()
+            entry['count'] += 1
+            entry['total_ms'] += elapsed_ms
+            entry['max_ms'] = max(entry['max_ms'], elapsed_ms)
+            entry['status'][status_code] = entry['status'].get(status_code, 0) + 1
+            entry['buckets'][bucket] += 1
+            entry['sql_queries'] += sql_queries
+            entry['sql_ms'] += sql_ms
+    
+    def _summarize(self, entry):
+        count = entry['count']
+        errors = sum(cantidad for status, cantidad in entry['status'].items() if status >= 500)
+        return {
+            'count': count,
+            'avg_ms': round(entry['total_ms'] / count, 2) if count else 0,
+            'p50_ms': _percentile(entry['buckets'], count, 0.5),
+            'p95_ms': _percentile(entry['buckets'], count, 0.95),
+            'p99_ms': _percentile(entry['buckets'], count, 0.99),
+            'max_ms': round(entry['max_ms'], 2),
+            'total_ms': round(entry['total_ms'], 2),
+            'errors': errors,
+            'status': {str(status): cantidad for status, cantidad in sorted(entry['status'].items())},
+            'histogram': dict(zip([f'le_{limite}' for limite in LATENCY_BUCKETS_MS] + ['inf'], entry['buckets'])),
+            'sql_queries': entry['sql_queries'],
+            'sql_queries_avg': round(entry['sql_queries'] / count, 2) if count else 0,
+            'sql_ms': round(entry['sql_ms'], 2)
+        }
+    
+    def _merge(self, entries):
+        total = self._new_entry()
+        for entry in entries:
+            total['count'] += entry['count']
+            total['total_ms'] += entry['total_ms']
+            total['max_ms'] = max(total['max_ms'], entry['max_ms'])
+            for status, cantidad in entry['status'].items():
+                total['status'][status] = total['status'].get(status, 0) + cantidad
+            total['buckets'] = [a + b for a, b in zip(total['buckets'], entry['buckets'])]
+            total['sql_queries'] += entry['sql_queries']
+            total['sql_ms'] += entry['sql_ms']
+        return total
+    
+    def get_summary(self):
+        """
+        Resumen global: latencia media y percentiles, y disponibilidad
+        (porcentaje de peticiones sin error 5xx)
+        """
+        with self._lock:
+            total = self._merge(self._endpoints.values())
+        
+        resumen = self._summarize(total)
+        resumen['availability'] = round(100 * (1 - resumen['errors'] / resumen['count']), 2) if resumen['count'] else 100.0
+        resumen['uptime_seconds'] = round(time.time() - self._started)
+        return resumen
+    
+    def get_stats(self):
+        """Métricas por endpoint y por blueprint, de mayor a menor tiempo total"""
+        with self._lock:
+            endpoints = {nombre: dict(entry, status=dict(entry['status']), buckets=list(entry['buckets']))
+                         for nombre, entry in self._endpoints.items()}
+        
+        blueprints = {}
+        for nombre, entry in endpoints.items():
+            blueprint = nombre.split('.', 1)[0] if '.' in nombre else 'app'
+            blueprints.setdefault(blueprint, []).append(entry)
+        
+        por_tiempo = lambda item: item[1]['total_ms']
+        return {
+            'summary': self.get_summary(),
+            'blueprints': {nombre: self._summarize(self._merge(entries))
+                           for nombre, entries in sorted(blueprints.items(),
+                                                         key=lambda item: -sum(e['total_ms'] for e in item[1]))},
+            'endpoints': {nombre: self._summarize(entry)
+                          for nombre, entry in sorted(endpoints.items(), key=por_tiempo, reverse=True)}
+        }
+    
+    def reset(self):
+        with self._lock:
+            self._endpoints = {}
+            self._started = time.time()
+
+
+# Instancia compartida por el middleware y las rutas de administración
+request_metrics = RequestMetrics()
+
+
+def _on_query(duracion):
+    """Suma la consulta a los contadores de la petición en curso"""
+    if has_request_context() and hasattr(g, '_metrics_start'):
+        g._metrics_sql_queries += 1
+        g._metrics_sql_seconds += duracion
+
+
+def init_request_metrics(app):
+    """Registra el middleware que mide cada petición de la aplicación"""
+    add_query_listener(_on_query)
+    
+    @app.before_request
+    def _start_request_timer():
+        g._metrics_start = time.perf_counter()
+        g._metrics_sql_queries = 0
+        g._metrics_sql_seconds = 0.0
+    
+    @app.after_request
+    def _record_request(response):
+        inicio = getattr(g, '_metrics_start', None)
+        if inicio is not None:
+            request_metrics.record(
+                request.endpoint or 'unknown',
+                response.status_code,
+                (time.perf_counter() - inicio) * 1000,
+                g._metrics_sql_queries,
+                g._metrics_sql_seconds * 1000
+            )
+        return response
+    
+    return request_metrics
@@ -3,35 +3,74 @@ import sqlite3
 import zipfile
 import shutil
 import json
+import hashlib
+import threading
 from datetime import datetime
-from pathlib import Path
-from typing import Dict, List, Optional
+from pathlib import Path, PurePosixPath
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
 from database.database import DatabaseManager
+from database.models.reference_cache import reference_cache
+from database.models.notification_bus import notification_bus
+from services.backup_service import CHECKSUM_MANIFEST, read_upload_manifest
+from services.backup_catalog import get_backup_catalog
+from services.chunk_store import ChunkStore
+
+# Modos de validación: 'fast' revisa la estructura y el manifiesto de checksums sin
+# descomprimir; 'deep' además lee cada miembro y verifica su SHA-256
+VALIDATION_MODES = ('fast', 'deep')
+VALIDATION_WORKERS = max(1, min(4, os.cpu_count() or 1))
+VALIDATION_BLOCK_SIZE = 1024 * 1024
+
+# Tamaño del búfer al escribir los miembros del backup en disco
+RESTORE_COPY_BUFFER = 1024 * 1024
+
+# Progreso de la última validación profunda (compartido por todas las instancias)
+_validation_progress = {'status': 'idle'}
+_validation_lock = threading.Lock()
+
+
+def _update_validation_progress(**values):
+    with _validation_lock:
+        _validation_progress.update(values)
+
+
+def get_validation_progress() -> Dict:
+    """Estado de la validación profunda en curso o de la última terminada"""
+    with _validation_lock:
+        return dict(_validation_progress)
+
+
+def _partition_members(members: List[zipfile.ZipInfo], groups: int) -> List[List[zipfile.ZipInfo]]:
+    """Reparte los miembros en grupos de tamaño similar (los más grandes primero)"""
+    buckets = [[] for _ in range(groups)]
+    sizes = [0] * groups
+    for member in sorted(members, key=lambda m: m.file_size, reverse=True):
+        index = sizes.index(min(sizes))
+        buckets[index].append(member)
+        sizes[index] += member.file_size
+    return [bucket for bucket in buckets if bucket]
 
 class RestoreService:
     def __init__(self):
         self.db_manager = DatabaseManager()
         self.backup_dir = Path('backups')
         self.uploads_dir = Path('uploads')
-        self.temp_restore_dir = Path('temp_restore')
+        self.archive_dir = Path('archive')
+        self.chunk_store = ChunkStore(self.backup_dir / 'chunks')
+        self.catalog = get_backup_catalog(self.backup_dir)
     
     def list_available_backups(self) -> Dict:
         """
         Lista todos los backups disponibles para restauración
         """
         try:
+            # El catálogo ya viene ordenado por fecha de creación (más reciente primero)
             backups = []
-            
-            for backup_type in ['automatic', 'manual']:
-                backup_subdir = self.backup_dir / backup_type
-                if backup_subdir.exists():
-                    for backup_file in backup_subdir.glob('*.zip'):
-                        backup_info = self._get_backup_details(backup_file, backup_type)
-                        if backup_info:
-                            backups.append(backup_info)
-            
-            # Ordenar por fecha de creación (más reciente primero)
-            backups.sort(key=lambda x: x['created_at'], reverse=True)
+            for backup_info in self.catalog.list(['automatic', 'manual']):
+                metadata = backup_info['metadata']
+                backup_info['database_stats'] = metadata.get('database_stats', {}) if metadata else None
+                backups.append(backup_info)
             
             return {
                 'success': True,
@@ -46,63 +85,27 @@ class RestoreService:
                 'message': f'Error listando backups: {str(e)}'
             }
     
-    def _get_backup_details(self, backup_path: Path, backup_type: str) -> Optional[Dict]:
-        """
-        Obtiene detalles completos de un backup
-        """
-        try:
-            stat = backup_path.stat()
-            
-            # Leer metadata del backup
-            metadata = None
-            database_stats = None
-            
-            try:
-                with zipfile.ZipFile(backup_path, 'r') as zipf:
-                    if 'backup_metadata.json' in zipf.namelist():
-                        with zipf.open('backup_metadata.json') as f:
-                            metadata = json.load(f)
-                            database_stats = metadata.get('database_stats', {})
-            except Exception as e:
-                print(f"Error leyendo metadata de {backup_path}: {e}")
-            
-            return {
-                'name': backup_path.stem,
-                'path': str(backup_path),
-                'type': backup_type,
-                'size': stat.st_size,
-                'size_mb': round(stat.st_size / (1024 * 1024), 2),
-                'created_at': datetime.fromtimestamp(stat.st_mtime).isoformat(),
-                'metadata': metadata,
-                'database_stats': database_stats,
-                'has_uploads': self._backup_has_uploads(backup_path)
-            }
-            
-        except Exception as e:
-            print(f"Error obteniendo detalles de backup {backup_path}: {e}")
-            return None
-    
-    def _backup_has_uploads(self, backup_path: Path) -> bool:
-        """
-        Verifica si el backup contiene archivos de uploads
-        """
-        try:
-            with zipfile.ZipFile(backup_path, 'r') as zipf:
-                return any(name.startswith('uploads/') for name in zipf.namelist())
-        except:
-            return False
-    
-    def validate_backup(self, backup_path: str) -> Dict:
+    def validate_backup(self, backup_path: str, mode: str = 'fast',
+                        progress: Optional[Callable[[Dict], None]] = None) -> Dict:
         """
         Valida la integridad de un archivo de backup
         
         Args:
             backup_path: Ruta al archivo de backup
+            mode: 'fast' (estructura y manifiesto de checksums) o 'deep'
+                (además lee cada miembro y verifica su SHA-256 en paralelo)
+            progress: Función opcional que recibe el progreso de la validación profunda
         
         Returns:
             Dict con resultado de la validación
         """
         try:
+            if mode not in VALIDATION_MODES:
+                return {
+                    'valid': False,
+                    'error': f'Modo de validación inválido: {mode}'
+                }
+            
             backup_file = Path(backup_path)
             
             if not backup_file.exists():
@@ -117,17 +120,9 @@ class RestoreService:
                     'error': 'El archivo no es un backup válido (.zip)'
                 }
             
-            # Verificar que el ZIP no esté corrupto
+            # Verificar la estructura del ZIP (solo lee el directorio central)
             try:
                 with zipfile.ZipFile(backup_file, 'r') as zipf:
-                    # Verificar integridad del ZIP
-                    bad_file = zipf.testzip()
-                    if bad_file:
-                        return {
-                            'valid': False,
-                            'error': f'Archivo corrupto en el backup: {bad_file}'
-                        }
-                    
                     # Verificar archivos esenciales
                     files_in_zip = zipf.namelist()
                     
@@ -159,6 +154,43 @@ class RestoreService:
                             'valid': False,
                             'error': f'Error leyendo metadata: {str(e)}'
                         }
+                    
+                    # Comparar el directorio del ZIP con el manifiesto de checksums
+                    checksums = None
+                    if CHECKSUM_MANIFEST in files_in_zip:
+                        try:
+                            with zipf.open(CHECKSUM_MANIFEST) as f:
+                                checksums = json.load(f)['members']
+                        except Exception as e:
+                            return {
+                                'valid': False,
+                                'error': f'Error leyendo el manifiesto de checksums: {str(e)}'
+                            }
+                        
+                        error = self._check_manifest(zipf, checksums)
+                        if error:
+                            return {
+                                'valid': False,
+                                'error': error
+                            }
+                    
+                    # Validación profunda: leer y verificar cada miembro
+                    if mode == 'deep':
+                        if checksums is None:
+                            # Backup anterior sin manifiesto: solo se pueden verificar los CRC
+                            bad_file = zipf.testzip()
+                            if bad_file:
+                                return {
+                                    'valid': False,
+                                    'error': f'Archivo corrupto en el backup: {bad_file}'
+                                }
+                        else:
+                            error = self._verify_checksums(backup_file, zipf, checksums, progress)
+                            if error:
+                                return {
+                                    'valid': False,
+                                    'error': error
+                                }
             
             except zipfile.BadZipFile:
                 return {
@@ -166,8 +198,20 @@ class RestoreService:
                     'error': 'El archivo ZIP está corrupto'
                 }
             
+            # Un backup incremental necesita todos sus chunks en el almacén
+            manifest = read_upload_manifest(backup_file)
+            if manifest:
+                missing = [path for path, entry in manifest.items() if not self.chunk_store.has(entry['sha256'])]
+                if missing:
+                    return {
+                        'valid': False,
+                        'error': f'Faltan {len(missing)} archivos de uploads en el almacén de chunks (por ejemplo: {missing[0]})'
+                    }
+            
             return {
                 'valid': True,
+                'mode': mode,
+                'has_checksums': checksums is not None,
                 'message': 'Backup válido y listo para restaurar'
             }
             
@@ -177,16 +221,107 @@ class RestoreService:
                 'error': str(e)
             }
     
+    def _check_manifest(self, zipf: zipfile.ZipFile, checksums: Dict) -> Optional[str]:
+        """
+        Compara los miembros del ZIP con el manifiesto sin descomprimir nada.
+        
+        Returns:
+            Mensaje de error, o None si coinciden
+        """
+        infos = {info.filename: info for info in zipf.infolist() if info.filename != CHECKSUM_MANIFEST}
+        
+        faltantes = [name for name in checksums if name not in infos]
+        if faltantes:
+            return f'Faltan {len(faltantes)} archivos del manifiesto en el backup (por ejemplo: {faltantes[0]})'
+        
+        sobrantes = [name for name in infos if name not in checksums]
+        if sobrantes:
+            return f'El backup contiene archivos que no están en el manifiesto (por ejemplo: {sobrantes[0]})'
+        
+        distinto_tamano = [name for name, entry in checksums.items() if infos[name].file_size != entry['size']]
+        if distinto_tamano:
+            return f'Tamaño inesperado en el backup: {distinto_tamano[0]}'
+        
+        return None
+    
+    def _verify_checksums(self, backup_file: Path, zipf: zipfile.ZipFile, checksums: Dict,
+                          progress: Optional[Callable[[Dict], None]] = None) -> Optional[str]:
+        """
+        Lee cada miembro por bloques y verifica su SHA-256 en varios hilos.
+        Cada hilo abre su propio ZipFile para no compartir la posición de lectura.
+        
+        Returns:
+            Mensaje de error, o None si todos coinciden
+        """
+        members = [zipf.getinfo(name) for name in checksums]
+        total_bytes = sum(member.file_size for member in members)
+        estado = {'members': 0, 'bytes': 0}
+        lock = threading.Lock()
+        
+        _update_validation_progress(status='running', backup=backup_file.name,
+                                    started_at=datetime.now().isoformat(), finished_at=None,
+                                    total_members=len(members), checked_members=0,
+                                    total_bytes=total_bytes, checked_bytes=0, percent=0.0, error=None)
+        
+        def report(member_done, nbytes):
+            with lock:
+                estado['bytes'] += nbytes
+                estado['members'] += member_done
+                snapshot = {
+                    'checked_members': estado['members'],
+                    'checked_bytes': estado['bytes'],
+                    'percent': round(estado['bytes'] * 100 / total_bytes, 1) if total_bytes else 100.0
+                }
+            _update_validation_progress(**snapshot)
+            if progress:
+                progress(get_validation_progress())
+        
+        def verify_group(group):
+            with zipfile.ZipFile(backup_file, 'r') as own_zip:
+                for member in group:
+                    sha256 = hashlib.sha256()
+                    with own_zip.open(member) as f:
+                        for block in iter(lambda: f.read(VALIDATION_BLOCK_SIZE), b''):
+                            sha256.update(block)
+                            report(0, len(block))
+                    report(1, 0)
+                    if sha256.hexdigest() != checksums[member.filename]['sha256']:
+                        return f'Checksum incorrecto en el backup: {member.filename}'
+            return None
+        
+        try:
+            groups = _partition_members(members, VALIDATION_WORKERS)
+            with ThreadPoolExecutor(max_workers=max(1, len(groups))) as executor:
+                errores = [error for error in executor.map(verify_group, groups) if error]
+        except Exception as e:
+            # Datos comprimidos dañados (zlib, bz2, lzma) o ZIP truncado
+            errores = [f'Archivo corrupto en el backup: {str(e)}']
+        
+        _update_validation_progress(status='failed' if errores else 'completed',
+                                    finished_at=datetime.now().isoformat(),
+                                    error=errores[0] if errores else None)
+        return errores[0] if errores else None
+    
     def restore_from_backup(self, backup_path: str, restore_options: Optional[Dict] = None) -> Dict:
         """
         Restaura la aplicación desde un archivo de backup
         
+        Los miembros del ZIP se escriben directamente en rutas de preparación junto
+        a su destino (pacta_local.db.restore-<ts>, uploads.restore-<ts>) y luego se
+        intercambian con renombres. El estado anterior queda renombrado hasta que
+        la restauración termina, así que deshacerla también es un renombre.
+        
         Args:
             backup_path: Ruta al archivo de backup
             restore_options: Opciones de restauración
                 - restore_database: bool (default: True)
                 - restore_uploads: bool (default: True)
+                - restore_archives: bool (default: restore_database); los archivos
+                  mensuales completan las filas archivadas de la base de datos
                 - backup_current: bool (default: True)
+                - validation_mode: 'fast' o 'deep' (default: 'fast')
+                - contract_ids: lista de IDs de contratos; si se indica, solo se
+                  restauran los documentos de esos contratos
         
         Returns:
             Dict con resultado de la restauración
@@ -199,14 +334,25 @@ class RestoreService:
         
         restore_database = restore_options.get('restore_database', True)
         restore_uploads = restore_options.get('restore_uploads', True)
+        restore_archives = restore_options.get('restore_archives', restore_database)
         backup_current = restore_options.get('backup_current', True)
+        contract_ids = restore_options.get('contract_ids')
         
-        print(f"[RESTORE] Opciones: database={restore_database}, uploads={restore_uploads}, backup_current={backup_current}")
+        print(f"[RESTORE] Opciones: database={restore_database}, uploads={restore_uploads}, archives={restore_archives}, backup_current={backup_current}, contracts={contract_ids}")
         
         try:
+            if contract_ids is not None:
+                try:
+                    contract_ids = [int(contract_id) for contract_id in contract_ids]
+                except (TypeError, ValueError):
+                    return {
+                        'success': False,
+                        'error': 'contract_ids debe ser una lista de IDs de contratos'
+                    }
+            
             print(f"[RESTORE] Validando backup...")
             # Validar backup antes de proceder
-            validation = self.validate_backup(backup_path)
+            validation = self.validate_backup(backup_path, restore_options.get('validation_mode', 'fast'))
             if not validation.get('valid', False):
                 print(f"[RESTORE] Error en validación: {validation.get('error')}")
                 return {
@@ -240,52 +386,40 @@ class RestoreService:
                         'details': current_backup_result.get('error', '')
                     }
             
-            # Crear directorio temporal para la restauración
-            print(f"[RESTORE] Preparando directorio temporal...")
-            if self.temp_restore_dir.exists():
-                shutil.rmtree(self.temp_restore_dir)
-            self.temp_restore_dir.mkdir()
+            current_db_path = Path(self.db_manager.db_path)
+            staged = {}
+            restore_results = []
             
             try:
-                # Extraer el backup
-                print(f"[RESTORE] Extrayendo backup...")
                 with zipfile.ZipFile(backup_file, 'r') as zipf:
-                    zipf.extractall(self.temp_restore_dir)
-                print(f"[RESTORE] Backup extraído correctamente")
-                
-                # Leer metadata
-                print(f"[RESTORE] Leyendo metadata...")
-                metadata_path = self.temp_restore_dir / 'backup_metadata.json'
-                with open(metadata_path, 'r', encoding='utf-8') as f:
-                    metadata = json.load(f)
-                print(f"[RESTORE] Metadata leída correctamente")
-                
-                restore_results = []
-                
-                # Restaurar base de datos
-                if restore_database:
-                    print(f"[RESTORE] Iniciando restauración de base de datos...")
-                    db_result = self._restore_database()
-                    restore_results.append(('database', db_result))
-                    print(f"[RESTORE] Resultado restauración BD: {db_result.get('success', False)}")
+                    print(f"[RESTORE] Leyendo metadata...")
+                    with zipf.open('backup_metadata.json') as f:
+                        metadata = json.load(f)
                     
-                    if not db_result.get('success', False):
-                        print(f"[RESTORE] Error en restauración BD: {db_result.get('error', '')}")
-                        raise Exception(f"Error restaurando base de datos: {db_result.get('error', '')}")
-                
-                # Restaurar archivos de uploads
-                if restore_uploads:
-                    print(f"[RESTORE] Iniciando restauración de uploads...")
-                    uploads_result = self._restore_uploads()
-                    restore_results.append(('uploads', uploads_result))
-                    print(f"[RESTORE] Resultado restauración uploads: {uploads_result.get('success', False)}")
+                    # Restauración selectiva: solo los documentos de algunos contratos
+                    if contract_ids is not None:
+                        documents_result = self._restore_contract_documents(zipf, backup_file, contract_ids, timestamp)
+                        restore_results.append(('documents', documents_result))
+                        if not documents_result.get('success', False):
+                            raise Exception(f"Error restaurando documentos: {documents_result.get('error', '')}")
                     
-                    if not uploads_result.get('success', False):
-                        print(f"Advertencia restaurando uploads: {uploads_result.get('error', '')}")
+                    else:
+                        # 1. Preparar los datos del backup junto a su destino (la aplicación sigue funcionando)
+                        if restore_database:
+                            print(f"[RESTORE] Preparando base de datos...")
+                            staged['database'] = self._stage_database(zipf, current_db_path, timestamp)
+                        
+                        if restore_uploads:
+                            print(f"[RESTORE] Preparando uploads...")
+                            staged['uploads'] = self._stage_uploads(zipf, backup_file, timestamp)
+                        
+                        if restore_archives:
+                            print(f"[RESTORE] Preparando archivos mensuales...")
+                            staged['archives'] = self._stage_archives(zipf, timestamp)
                 
-                # Limpiar directorio temporal
-                print(f"[RESTORE] Limpiando directorio temporal...")
-                shutil.rmtree(self.temp_restore_dir)
+                # 2. Intercambiar con renombres
+                if staged:
+                    restore_results.extend(self._swap_staged(staged, current_db_path, timestamp))
                 
                 # Registrar la restauración en el sistema
                 self._log_restore_activity(backup_file.name, metadata, restore_results)
@@ -300,11 +434,11 @@ class RestoreService:
                     'restore_results': restore_results
                 }
                 
-            except Exception as e:
-                # Limpiar en caso de error
-                if self.temp_restore_dir.exists():
-                    shutil.rmtree(self.temp_restore_dir)
-                raise e
+            finally:
+                # Limpiar lo que haya quedado preparado sin usar
+                for staging_path in staged.values():
+                    if staging_path is not None and staging_path.exists():
+                        self._remove_path(staging_path)
                 
         except Exception as e:
             return {
@@ -313,134 +447,313 @@ class RestoreService:
                 'message': f'Error durante la restauración: {str(e)}'
             }
     
-    def _restore_database(self) -> Dict:
+    def _stage_database(self, zipf: zipfile.ZipFile, current_db_path: Path, timestamp: str) -> Path:
         """
-        Restaura la base de datos desde el backup
+        Escribe la base de datos del backup junto a la actual y verifica que se pueda abrir
         """
+        staging_path = current_db_path.with_name(f"{current_db_path.name}.restore-{timestamp}")
+        
+        with zipf.open('pacta_local.db') as source, open(staging_path, 'wb') as target:
+            shutil.copyfileobj(source, target, RESTORE_COPY_BUFFER)
+        
+        test_conn = sqlite3.connect(staging_path)
         try:
-            print(f"[RESTORE_DB] Iniciando restauración de base de datos...")
-            backup_db_path = self.temp_restore_dir / 'pacta_local.db'
-            current_db_path = Path('pacta_local.db')
-            
-            print(f"[RESTORE_DB] Verificando archivo de BD en backup: {backup_db_path}")
-            if not backup_db_path.exists():
-                print(f"[RESTORE_DB] Error: BD no encontrada en {backup_db_path}")
-                return {
-                    'success': False,
-                    'error': 'Base de datos no encontrada en el backup'
-                }
-            
-            print(f"[RESTORE_DB] Preparando para restaurar BD...")
-            
-            # Crear backup temporal de la BD actual
-            print(f"[RESTORE_DB] Creando backup temporal de BD actual...")
-            if current_db_path.exists():
-                temp_current_db = Path(f'pacta_local_temp_{datetime.now().strftime("%Y%m%d_%H%M%S")}.db')
-                shutil.copy2(current_db_path, temp_current_db)
-                print(f"[RESTORE_DB] Backup temporal creado: {temp_current_db}")
-            
-            try:
-                # Reemplazar la base de datos actual
-                print(f"[RESTORE_DB] Reemplazando base de datos actual...")
-                if current_db_path.exists():
-                    current_db_path.unlink()
-                    print(f"[RESTORE_DB] BD actual eliminada")
-                
-                shutil.copy2(backup_db_path, current_db_path)
-                print(f"[RESTORE_DB] BD del backup copiada")
-                
-                # Verificar que la BD restaurada funciona
-                print(f"[RESTORE_DB] Verificando BD restaurada...")
-                test_conn = sqlite3.connect(current_db_path)
-                result = test_conn.execute("SELECT COUNT(*) FROM usuarios").fetchone()
-                test_conn.close()
-                print(f"[RESTORE_DB] BD verificada - usuarios encontrados: {result[0] if result else 0}")
+            result = test_conn.execute("SELECT COUNT(*) FROM usuarios").fetchone()
+        finally:
+            test_conn.close()
+        print(f"[RESTORE_DB] BD preparada - usuarios encontrados: {result[0] if result else 0}")
+        
+        return staging_path
+    
+    def _safe_upload_path(self, root: Path, relative: str) -> Path:
+        """Ruta dentro de root para un archivo del backup; rechaza rutas que salgan de root"""
+        destino = root / relative
+        if root.resolve() not in destino.resolve().parents:
+            raise ValueError(f"Ruta inválida en el backup: {relative}")
+        return destino
+    
+    def _stage_uploads(self, zipf: zipfile.ZipFile, backup_file: Path, timestamp: str) -> Optional[Path]:
+        """
+        Escribe los uploads del backup en uploads.restore-<ts>, leyendo cada miembro
+        del ZIP (o cada chunk, en backups incrementales) directamente a su ruta final
+        
+        Returns:
+            Directorio preparado, o None si el backup no incluye uploads
+        """
+        staging_dir = self.uploads_dir.with_name(f"{self.uploads_dir.name}.restore-{timestamp}")
+        manifest = read_upload_manifest(backup_file)
+        
+        if manifest is not None:
+            staging_dir.mkdir()
+            for relative, entry in manifest.items():
+                self.chunk_store.restore_file(entry['sha256'], self._safe_upload_path(staging_dir, relative))
+            return staging_dir
+        
+        members = [info for info in zipf.infolist() if info.filename.startswith('uploads/') and not info.is_dir()]
+        if not members:
+            return None
+        
+        staging_dir.mkdir()
+        for info in members:
+            destino = self._safe_upload_path(staging_dir, info.filename[len('uploads/'):])
+            destino.parent.mkdir(parents=True, exist_ok=True)
+            with zipf.open(info) as source, open(destino, 'wb') as target:
+                shutil.copyfileobj(source, target, RESTORE_COPY_BUFFER)
+        return staging_dir
+    
+    def _stage_archives(self, zipf: zipfile.ZipFile, timestamp: str) -> Optional[Path]:
+        """
+        Escribe los archivos mensuales del backup en archive.restore-<ts>
+        
+        Returns:
+            Directorio preparado, o None si el backup no incluye archive/
+        """
+        members = [info for info in zipf.infolist() if info.filename.startswith('archive/') and not info.is_dir()]
+        if not members:
+            return None
+        
+        staging_dir = self.archive_dir.with_name(f"{self.archive_dir.name}.restore-{timestamp}")
+        staging_dir.mkdir()
+        for info in members:
+            destino = self._safe_upload_path(staging_dir, info.filename[len('archive/'):])
+            destino.parent.mkdir(parents=True, exist_ok=True)
+            with zipf.open(info) as source, open(destino, 'wb') as target:
+                shutil.copyfileobj(source, target, RESTORE_COPY_BUFFER)
+        return staging_dir
+    
+    def _swap_staged(self, staged: Dict, current_db_path: Path, timestamp: str) -> List:
+        """
+        Reemplaza la base de datos, los uploads y los archivos mensuales por las
+        versiones preparadas.
+        Si algo falla, se deshacen los intercambios ya hechos con renombres.
+        """
+        swapped = []   # (destino, ruta de rollback)
+        restore_results = []
+        
+        try:
+            if staged.get('database') is not None:
+                print(f"[RESTORE_DB] Intercambiando base de datos...")
+                # Volcar el WAL y esperar a que se devuelvan las conexiones del pool
+                # antes de cambiar el archivo: ninguna puede seguir abierta sobre el -wal
+                try:
+                    self.db_manager.checkpoint('TRUNCATE')
+                except sqlite3.Error as e:
+                    print(f"[RESTORE_DB] Advertencia: no se pudo hacer checkpoint del WAL: {e}")
+                self.db_manager.pause_connections()
+                try:
+                    self._remove_wal_files(current_db_path)
+                    swapped.append((current_db_path, self._swap_path(staged['database'], current_db_path, timestamp)))
+                finally:
+                    self.db_manager.resume_connections()
                 
                 # Reinicializar el DatabaseManager
-                print(f"[RESTORE_DB] Reinicializando DatabaseManager...")
                 self.db_manager = DatabaseManager()
-                print(f"[RESTORE_DB] DatabaseManager reinicializado")
-                
-                # Eliminar backup temporal si todo salió bien
-                if 'temp_current_db' in locals() and temp_current_db.exists():
-                    temp_current_db.unlink()
-                    print(f"[RESTORE_DB] Backup temporal eliminado")
-                
-                print(f"[RESTORE_DB] Restauración de BD completada exitosamente")
-                return {
+                # Un backup anterior puede no tener el resumen del dashboard ni sus triggers
+                self.db_manager.init_database()
+                restore_results.append(('database', {
                     'success': True,
                     'message': 'Base de datos restaurada exitosamente'
-                }
-                
-            except Exception as e:
-                # Restaurar BD original en caso de error
-                if 'temp_current_db' in locals() and temp_current_db.exists():
-                    if current_db_path.exists():
-                        current_db_path.unlink()
-                    shutil.copy2(temp_current_db, current_db_path)
-                    temp_current_db.unlink()
-                
-                raise e
-                
-        except Exception as e:
-            return {
-                'success': False,
-                'error': str(e)
-            }
+                }))
+            
+            if 'uploads' in staged:
+                if staged['uploads'] is None:
+                    restore_results.append(('uploads', {
+                        'success': True,
+                        'message': 'No hay archivos de uploads en el backup'
+                    }))
+                else:
+                    print(f"[RESTORE] Intercambiando uploads...")
+                    swapped.append((self.uploads_dir, self._swap_path(staged['uploads'], self.uploads_dir, timestamp)))
+                    file_count = sum(1 for _ in self.uploads_dir.rglob('*') if _.is_file())
+                    restore_results.append(('uploads', {
+                        'success': True,
+                        'message': f'Se restauraron {file_count} archivos de uploads'
+                    }))
+            
+            if 'archives' in staged:
+                if staged['archives'] is None:
+                    restore_results.append(('archives', {
+                        'success': True,
+                        'message': 'No hay archivos mensuales en el backup'
+                    }))
+                else:
+                    print(f"[RESTORE] Intercambiando archivos mensuales...")
+                    swapped.append((self.archive_dir, self._swap_path(staged['archives'], self.archive_dir, timestamp)))
+                    file_count = sum(1 for _ in self.archive_dir.rglob('*') if _.is_file())
+                    restore_results.append(('archives', {
+                        'success': True,
+                        'message': f'Se restauraron {file_count} archivos mensuales'
+                    }))
+        
+        except Exception:
+            print(f"[RESTORE] Error durante el intercambio, deshaciendo cambios...")
+            for target, rollback_path in reversed(swapped):
+                if target == current_db_path:
+                    self.db_manager.pause_connections()
+                    try:
+                        self._remove_wal_files(current_db_path)
+                        self._remove_path(target)
+                        if rollback_path is not None:
+                            os.replace(rollback_path, target)
+                    finally:
+                        self.db_manager.resume_connections()
+                    continue
+                self._remove_path(target)
+                if rollback_path is not None:
+                    os.replace(rollback_path, target)
+            self.db_manager = DatabaseManager()
+            raise
+        
+        # Todo salió bien: descartar el estado anterior
+        for _, rollback_path in swapped:
+            if rollback_path is not None:
+                self._remove_path(rollback_path)
+        
+        # Las listas de referencia y los contadores de no leídas en caché corresponden
+        # a la base de datos anterior
+        reference_cache.clear()
+        notification_bus.invalidate()
+        return restore_results
     
-    def _restore_uploads(self) -> Dict:
+    def _swap_path(self, staging_path: Path, target: Path, timestamp: str) -> Optional[Path]:
         """
-        Restaura los archivos de uploads desde el backup
+        Pone staging_path en lugar de target con renombres. Si el segundo renombre
+        falla, el target anterior vuelve a su lugar antes de propagar el error.
+        
+        Returns:
+            Ruta donde quedó el target anterior, o None si no existía
         """
+        rollback_path = None
+        if target.exists():
+            rollback_path = target.with_name(f"{target.name}.rollback-{timestamp}")
+            os.replace(target, rollback_path)
         try:
-            backup_uploads_path = self.temp_restore_dir / 'uploads'
-            
-            if not backup_uploads_path.exists():
-                return {
-                    'success': True,
-                    'message': 'No hay archivos de uploads en el backup'
-                }
-            
-            # Crear backup de uploads actuales si existen
-            if self.uploads_dir.exists():
-                temp_uploads_backup = Path(f'uploads_backup_{datetime.now().strftime("%Y%m%d_%H%M%S")}')
-                shutil.copytree(self.uploads_dir, temp_uploads_backup)
-            
-            try:
-                # Eliminar uploads actuales
-                if self.uploads_dir.exists():
-                    shutil.rmtree(self.uploads_dir)
-                
-                # Restaurar uploads desde backup
-                shutil.copytree(backup_uploads_path, self.uploads_dir)
-                
-                # Eliminar backup temporal si todo salió bien
-                if 'temp_uploads_backup' in locals() and temp_uploads_backup.exists():
-                    shutil.rmtree(temp_uploads_backup)
-                
-                # Contar archivos restaurados
-                file_count = sum(1 for _ in self.uploads_dir.rglob('*') if _.is_file())
-                
-                return {
-                    'success': True,
-                    'message': f'Se restauraron {file_count} archivos de uploads'
-                }
-                
-            except Exception as e:
-                # Restaurar uploads originales en caso de error
-                if 'temp_uploads_backup' in locals() and temp_uploads_backup.exists():
-                    if self.uploads_dir.exists():
-                        shutil.rmtree(self.uploads_dir)
-                    shutil.copytree(temp_uploads_backup, self.uploads_dir)
-                    shutil.rmtree(temp_uploads_backup)
-                
-                raise e
-                
-        except Exception as e:
+            os.replace(staging_path, target)
+        except Exception:
+            if rollback_path is not None:
+                os.replace(rollback_path, target)
+            raise
+        return rollback_path
+    
+    def _remove_path(self, path: Path):
+        """Elimina un archivo o directorio"""
+        if path.is_dir():
+            shutil.rmtree(path)
+        elif path.exists():
+            path.unlink()
+    
+    def _remove_wal_files(self, db_path: Path):
+        """
+        Elimina los archivos -wal y -shm residuales para que no se apliquen
+        sobre la base de datos restaurada
+        """
+        for suffix in ('-wal', '-shm'):
+            wal_file = Path(f"{db_path}{suffix}")
+            if wal_file.exists():
+                wal_file.unlink()
+    
+    def _upload_relative_path(self, ruta_archivo: str) -> Optional[str]:
+        """
+        Convierte una ruta_archivo guardada en la BD ('uploads/contratos/x.pdf',
+        con barras de Windows o absoluta) en la ruta relativa a uploads/
+        """
+        parts = PurePosixPath(ruta_archivo.replace('\\', '/')).parts
+        if self.uploads_dir.name not in parts:
+            return None
+        index = len(parts) - 1 - parts[::-1].index(self.uploads_dir.name)
+        relative = parts[index + 1:]
+        return '/'.join(relative) if relative else None
+    
+    def _restore_contract_documents(self, zipf: zipfile.ZipFile, backup_file: Path,
+                                    contract_ids: List[int], timestamp: str) -> Dict:
+        """
+        Restaura solo los documentos de los contratos indicados.
+        
+        Los documentos se buscan en la BD del backup; cada archivo se escribe junto a su
+        destino y se coloca con un renombre. Los registros de documentos que ya no existen
+        en la BD actual se vuelven a insertar si el contrato sigue existiendo.
+        """
+        if not contract_ids:
             return {
                 'success': False,
-                'error': str(e)
+                'error': 'No se indicaron contratos'
             }
+        
+        staging_db = self._stage_database(zipf, Path(self.db_manager.db_path), timestamp)
+        try:
+            backup_conn = sqlite3.connect(staging_db)
+            backup_conn.row_factory = sqlite3.Row
+            try:
+                placeholders = ','.join('?' for _ in contract_ids)
+                documentos = backup_conn.execute(
+                    f"SELECT * FROM documentos_contratos WHERE contrato_id IN ({placeholders})",
+                    contract_ids
+                ).fetchall()
+            finally:
+                backup_conn.close()
+        finally:
+            self._remove_path(staging_db)
+        
+        manifest = read_upload_manifest(backup_file)
+        names = set(zipf.namelist())
+        restored_files = 0
+        missing_files = []
+        
+        for documento in documentos:
+            relative = self._upload_relative_path(documento['ruta_archivo'])
+            if relative is None:
+                missing_files.append(documento['ruta_archivo'])
+                continue
+            
+            destino = self._safe_upload_path(self.uploads_dir, relative)
+            destino.parent.mkdir(parents=True, exist_ok=True)
+            staging_path = destino.with_name(f"{destino.name}.restore-{timestamp}")
+            
+            try:
+                if manifest is not None and relative in manifest:
+                    self.chunk_store.restore_file(manifest[relative]['sha256'], staging_path)
+                elif f"uploads/{relative}" in names:
+                    with zipf.open(f"uploads/{relative}") as source, open(staging_path, 'wb') as target:
+                        shutil.copyfileobj(source, target, RESTORE_COPY_BUFFER)
+                else:
+                    missing_files.append(documento['ruta_archivo'])
+                    continue
+                os.replace(staging_path, destino)
+                restored_files += 1
+            finally:
+                if staging_path.exists():
+                    staging_path.unlink()
+        
+        # Volver a registrar los documentos eliminados de la BD actual
+        restored_rows = 0
+        with self.db_manager.get_connection() as conn:
+            for documento in documentos:
+                try:
+                    cursor = conn.execute("""
+                        INSERT INTO documentos_contratos
+                        (id, contrato_id, nombre_archivo, ruta_archivo, tipo_documento,
+                         tamaño_archivo, fecha_subida, usuario_subida_id)
+                        SELECT ?, ?, ?, ?, ?, ?, ?, ?
+                        WHERE EXISTS (SELECT 1 FROM contratos WHERE id = ?)
+                        AND NOT EXISTS (SELECT 1 FROM documentos_contratos WHERE id = ?)
+                    """, (
+                        documento['id'], documento['contrato_id'], documento['nombre_archivo'],
+                        documento['ruta_archivo'], documento['tipo_documento'],
+                        documento['tamaño_archivo'], documento['fecha_subida'],
+                        documento['usuario_subida_id'], documento['contrato_id'], documento['id']
+                    ))
+                    restored_rows += cursor.rowcount
+                except sqlite3.IntegrityError as e:
+                    print(f"[RESTORE] No se pudo registrar el documento {documento['id']}: {e}")
+            conn.commit()
+        
+        return {
+            'success': True,
+            'message': f'Se restauraron {restored_files} documentos de {len(contract_ids)} contratos',
+            'restored_files': restored_files,
+            'restored_rows': restored_rows,
+            'missing_files': missing_files
+        }
     
     def _log_restore_activity(self, backup_name: str, metadata: Dict, restore_results: List):
         """
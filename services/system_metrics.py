@@ -1,92 +1,225 @@
 import psutil
 import platform
+import atexit
+import threading
+import time
+from collections import deque
 from datetime import datetime
 
+# Muestreo en segundo plano: las rutas leen la última muestra sin esperar a psutil
+SYSTEM_METRICS_INTERVAL = 5      # Segundos entre muestras
+SYSTEM_METRICS_HISTORY = 120     # Muestras guardadas (10 minutos con el intervalo por defecto)
+
+def _collect_sample(previous=None):
+    """
+    Toma una muestra de las métricas del sistema.
+    cpu_percent(interval=None) no bloquea: mide el uso desde la llamada anterior.
+    """
+    # Información del CPU
+    cpu_percent = psutil.cpu_percent(interval=None)
+    cpu_count = psutil.cpu_count()
+    cpu_freq = psutil.cpu_freq()
+    
+    # Información de memoria
+    memory = psutil.virtual_memory()
+    memory_percent = memory.percent
+    memory_total = round(memory.total / (1024**3), 2)  # GB
+    memory_used = round(memory.used / (1024**3), 2)    # GB
+    memory_available = round(memory.available / (1024**3), 2)  # GB
+    
+    # Información del disco
+    disk = psutil.disk_usage('/')
+    disk_percent = round((disk.used / disk.total) * 100, 1)
+    disk_total = round(disk.total / (1024**3), 2)  # GB
+    disk_used = round(disk.used / (1024**3), 2)   # GB
+    disk_free = round(disk.free / (1024**3), 2)   # GB
+    
+    # Información de red, con la velocidad desde la muestra anterior
+    sampled_at = time.time()
+    net_io = psutil.net_io_counters()
+    bytes_sent = round(net_io.bytes_sent / (1024**2), 2)  # MB
+    bytes_recv = round(net_io.bytes_recv / (1024**2), 2)  # MB
+    sent_kb_s = recv_kb_s = 0
+    if previous is not None:
+        elapsed = sampled_at - previous['_sampled_at']
+        if elapsed > 0:
+            sent_kb_s = round(max(0, net_io.bytes_sent - previous['_bytes_sent']) / 1024 / elapsed, 2)
+            recv_kb_s = round(max(0, net_io.bytes_recv - previous['_bytes_recv']) / 1024 / elapsed, 2)
+    
+    # Información del sistema
+    boot_time = datetime.fromtimestamp(psutil.boot_time())
+    uptime = datetime.now() - boot_time
+    uptime_hours = round(uptime.total_seconds() / 3600, 1)
+    
+    # Procesos activos
+    process_count = len(psutil.pids())
+    
+    return {
+        'cpu': {
+            'percent': cpu_percent,
+            'count': cpu_count,
+            'frequency': round(cpu_freq.current, 2) if cpu_freq else 0
+        },
+        'memory': {
+            'percent': memory_percent,
+            'total_gb': memory_total,
+            'used_gb': memory_used,
+            'available_gb': memory_available
+        },
+        'disk': {
+            'percent': disk_percent,
+            'total_gb': disk_total,
+            'used_gb': disk_used,
+            'free_gb': disk_free
+        },
+        'network': {
+            'bytes_sent_mb': bytes_sent,
+            'bytes_recv_mb': bytes_recv,
+            'sent_kb_s': sent_kb_s,
+            'recv_kb_s': recv_kb_s
+        },
+        'system': {
+            'platform': platform.system(),
+            'platform_version': platform.version(),
+            'architecture': platform.architecture()[0],
+            'processor': platform.processor(),
+            'uptime_hours': uptime_hours,
+            'process_count': process_count,
+            'boot_time': boot_time.strftime('%Y-%m-%d %H:%M:%S')
+        },
+        'sampled_at': datetime.fromtimestamp(sampled_at).isoformat(),
+        # Contadores crudos para calcular la velocidad de red en la muestra siguiente
+        '_sampled_at': sampled_at,
+        '_bytes_sent': net_io.bytes_sent,
+        '_bytes_recv': net_io.bytes_recv
+    }
+
+def _default_metrics(error):
+    """Valores por defecto cuando no se pudieron obtener las métricas"""
+    return {
+        'cpu': {'percent': 0, 'count': 0, 'frequency': 0},
+        'memory': {'percent': 0, 'total_gb': 0, 'used_gb': 0, 'available_gb': 0},
+        'disk': {'percent': 0, 'total_gb': 0, 'used_gb': 0, 'free_gb': 0},
+        'network': {'bytes_sent_mb': 0, 'bytes_recv_mb': 0, 'sent_kb_s': 0, 'recv_kb_s': 0},
+        'system': {
+            'platform': 'Unknown',
+            'platform_version': 'Unknown',
+            'architecture': 'Unknown',
+            'processor': 'Unknown',
+            'uptime_hours': 0,
+            'process_count': 0,
+            'boot_time': 'Unknown'
+        },
+        'error': str(error)
+    }
+
+def _public(sample):
+    """Copia de la muestra sin los contadores internos"""
+    return {key: value for key, value in sample.items() if not key.startswith('_')}
+
+class SystemMetricsSampler:
+    """
+    Hilo que toma una muestra de las métricas cada intervalo y guarda las
+    últimas en un buffer circular.
+    """
+    
+    def __init__(self, interval=SYSTEM_METRICS_INTERVAL, history=SYSTEM_METRICS_HISTORY):
+        self.interval = interval
+        self._samples = deque(maxlen=history)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._last_error = None
+    
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='system-metrics-sampler', daemon=True)
+            self._thread.start()
+    
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval)
+    
+    def _run(self):
+        # La primera lectura de cpu_percent solo fija el punto de partida
+        try:
+            psutil.cpu_percent(interval=None)
+        except Exception:
+            pass
+        
+        while not self._stop.wait(self.interval):
+            self.sample()
+    
+    def sample(self):
+        """Toma una muestra y la agrega al buffer"""
+        try:
+            with self._lock:
+                previous = self._samples[-1] if self._samples else None
+            muestra = _collect_sample(previous)
+            with self._lock:
+                self._samples.append(muestra)
+                self._last_error = None
+            return muestra
+        except Exception as e:
+            with self._lock:
+                self._last_error = e
+            return None
+    
+    def latest(self):
+        """Última muestra (o None si todavía no hay ninguna)"""
+        with self._lock:
+            if self._samples:
+                return _public(self._samples[-1])
+            if self._last_error is not None:
+                return _default_metrics(self._last_error)
+        return None
+    
+    def history(self, limit=None):
+        """Serie compacta de las últimas muestras para gráficos"""
+        with self._lock:
+            muestras = list(self._samples)
+        if limit:
+            muestras = muestras[-limit:]
+        return [{
+            'timestamp': muestra['sampled_at'],
+            'cpu_percent': muestra['cpu']['percent'],
+            'memory_percent': muestra['memory']['percent'],
+            'disk_percent': muestra['disk']['percent'],
+            'net_sent_kb_s': muestra['network']['sent_kb_s'],
+            'net_recv_kb_s': muestra['network']['recv_kb_s']
+        } for muestra in muestras]
+
+_sampler = None
+_sampler_lock = threading.Lock()
+
+def get_metrics_sampler():
+    """Obtiene el muestreador compartido, iniciándolo la primera vez"""
+    global _sampler
+    with _sampler_lock:
+        if _sampler is None:
+            _sampler = SystemMetricsSampler()
+            _sampler.start()
+            atexit.register(_sampler.stop)
+    return _sampler
+
 def get_system_metrics():
     """
     Recopila métricas del sistema usando psutil
-    Retorna un diccionario con información del servidor
+    Retorna un diccionario con información del servidor (la última muestra,
+    sin bloquear la petición)
     """
-    try:
-        # Información del CPU
-        cpu_percent = psutil.cpu_percent(interval=1)
-        cpu_count = psutil.cpu_count()
-        cpu_freq = psutil.cpu_freq()
-        
-        # Información de memoria
-        memory = psutil.virtual_memory()
-        memory_percent = memory.percent
-        memory_total = round(memory.total / (1024**3), 2)  # GB
-        memory_used = round(memory.used / (1024**3), 2)    # GB
-        memory_available = round(memory.available / (1024**3), 2)  # GB
-        
-        # Información del disco
-        disk = psutil.disk_usage('/')
-        disk_percent = round((disk.used / disk.total) * 100, 1)
-        disk_total = round(disk.total / (1024**3), 2)  # GB
-        disk_used = round(disk.used / (1024**3), 2)   # GB
-        disk_free = round(disk.free / (1024**3), 2)   # GB
-        
-        # Información de red
-        net_io = psutil.net_io_counters()
-        bytes_sent = round(net_io.bytes_sent / (1024**2), 2)  # MB
-        bytes_recv = round(net_io.bytes_recv / (1024**2), 2)  # MB
-        
-        # Información del sistema
-        boot_time = datetime.fromtimestamp(psutil.boot_time())
-        uptime = datetime.now() - boot_time
-        uptime_hours = round(uptime.total_seconds() / 3600, 1)
-        
-        # Procesos activos
-        process_count = len(psutil.pids())
-        
-        return {
-            'cpu': {
-                'percent': cpu_percent,
-                'count': cpu_count,
-                'frequency': round(cpu_freq.current, 2) if cpu_freq else 0
-            },
-            'memory': {
-                'percent': memory_percent,
-                'total_gb': memory_total,
-                'used_gb': memory_used,
-                'available_gb': memory_available
-            },
-            'disk': {
-                'percent': disk_percent,
-                'total_gb': disk_total,
-                'used_gb': disk_used,
-                'free_gb': disk_free
-            },
-            'network': {
-                'bytes_sent_mb': bytes_sent,
-                'bytes_recv_mb': bytes_recv
-            },
-            'system': {
-                'platform': platform.system(),
-                'platform_version': platform.version(),
-                'architecture': platform.architecture()[0],
-                'processor': platform.processor(),
-                'uptime_hours': uptime_hours,
-                'process_count': process_count,
-                'boot_time': boot_time.strftime('%Y-%m-%d %H:%M:%S')
-            }
-        }
-    except Exception as e:
-        # En caso de error, retornar valores por defecto
-        return {
-            'cpu': {'percent': 0, 'count': 0, 'frequency': 0},
-            'memory': {'percent': 0, 'total_gb': 0, 'used_gb': 0, 'available_gb': 0},
-            'disk': {'percent': 0, 'total_gb': 0, 'used_gb': 0, 'free_gb': 0},
-            'network': {'bytes_sent_mb': 0, 'bytes_recv_mb': 0},
-            'system': {
-                'platform': 'Unknown',
-                'platform_version': 'Unknown',
-                'architecture': 'Unknown',
-                'processor': 'Unknown',
-                'uptime_hours': 0,
-                'process_count': 0,
-                'boot_time': 'Unknown'
-            },
-            'error': str(e)
-        }
\ No newline at end of file
+    sampler = get_metrics_sampler()
+    metricas = sampler.latest()
+    if metricas is None:
+        # Aún no hay muestras: tomar una ahora (no bloquea, el CPU puede marcar 0)
+        muestra = sampler.sample()
+        metricas = _public(muestra) if muestra is not None else sampler.latest()
+    return metricas or _default_metrics('Sin muestras disponibles')
+
+def get_metrics_history(limit=None):
+    """Serie de las últimas muestras (CPU, memoria, disco y red) para gráficos"""
+    return get_metrics_sampler().history(limit)
@@ -4,6 +4,9 @@
 let currentClientId = null;
 let isEditMode = false;
 let clientesData = [];
+let clientesNextCursor = null;
+let clientesSearchTerm = '';
+let clientesSearchTimeout = null;
 let selectedPersonas = [];
 let searchTimeout = null;
 
@@ -144,15 +147,18 @@ function updateChangeIndicators(cambios) {
     });
 }
 
-// Cargar clientes
-function loadClientes() {
+// Cargar clientes (con cursor se agrega la página siguiente)
+function loadClientes(cursor) {
     $.ajax({
         url: '/api/clientes',
         method: 'GET',
+        data: listParams(cursor, clientesSearchTerm),
         success: function(response) {
             if (response.success) {
-                clientesData = response.clientes;
+                clientesData = cursor ? clientesData.concat(response.clientes) : response.clientes;
+                clientesNextCursor = response.pagination ? response.pagination.next_cursor : null;
                 renderClientesTable();
+                renderClientesLoadMore();
             } else {
                 showAlert('Error al cargar clientes: ' + response.message, 'error');
             }
@@ -163,6 +169,20 @@ function loadClientes() {
     });
 }
 
+// Mostrar u ocultar el botón para cargar la página siguiente de clientes
+function renderClientesLoadMore() {
+    let button = $('#clientesLoadMore');
+    if (!button.length) {
+        button = $('<button type="button" id="clientesLoadMore" class="btn btn-outline-primary btn-sm mt-3">' +
+                   '<i class="fas fa-chevron-down"></i> Cargar más</button>');
+        button.on('click', function() {
+            loadClientes(clientesNextCursor);
+        });
+        $('#clientesTableBody').closest('table').after(button);
+    }
+    button.toggle(Boolean(clientesNextCursor));
+}
+
 // Generar avatar para cliente
 function generateClientAvatar(nombre, index) {
     const colors = ['blue', 'green', 'purple', 'pink', 'yellow', 'red', 'indigo', 'teal'];
@@ -472,25 +492,21 @@ function toggleSearchBar() {
     }
 }
 
-// Filtrar clientes
+// Parámetros del listado paginado: cursor de la página siguiente y término de búsqueda
+function listParams(cursor, searchTerm) {
+    const params = {};
+    if (cursor) params.cursor = cursor;
+    if (searchTerm) params.q = searchTerm;
+    return params;
+}
+
+// Filtrar clientes en el servidor (el listado está paginado)
 function filterClients(searchTerm) {
-    const rows = $('#clientesTableBody tr');
-    
-    if (!searchTerm) {
-        rows.show();
-        return;
+    clientesSearchTerm = searchTerm.trim();
+    if (clientesSearchTimeout) {
+        clearTimeout(clientesSearchTimeout);
     }
-    
-    rows.each(function() {
-        const row = $(this);
-        const text = row.text().toLowerCase();
-        
-        if (text.includes(searchTerm)) {
-            row.show();
-        } else {
-            row.hide();
-        }
-    });
+    clientesSearchTimeout = setTimeout(() => loadClientes(), clientesSearchTerm ? 300 : 0);
 }
 
 // Buscar personas
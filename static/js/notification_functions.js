@@ -6,6 +6,7 @@ class NotificationManager {
         this.notifications = [];
         this.isModalOpen = false;
         this.pollInterval = null;
+        this.eventSource = null;
         this.init();
     }
 
@@ -14,8 +15,8 @@ class NotificationManager {
         this.bindEvents();
         // Cargar notificaciones iniciales
         this.loadNotifications();
-        // Iniciar polling cada 30 segundos
-        this.startPolling();
+        // Recibir el contador desde el servidor (o polling si no hay soporte)
+        this.startStream();
     }
 
     bindEvents() {
@@ -261,6 +262,41 @@ class NotificationManager {
         }
     }
 
+    startStream() {
+        // Sin soporte de Server-Sent Events se consulta el contador cada 30 segundos
+        if (!window.EventSource) {
+            this.startPolling();
+            return;
+        }
+        
+        this.eventSource = new EventSource('/api/notifications/stream');
+        
+        this.eventSource.addEventListener('count', (event) => {
+            const data = JSON.parse(event.data);
+            this.notificationCount = data.count;
+            this.updateBadge();
+            // Recargar la lista si llegaron notificaciones nuevas con el modal abierto
+            if (this.isModalOpen && data.delta > 0) {
+                this.loadNotifications();
+            }
+        });
+        
+        this.eventSource.onerror = () => {
+            // El navegador reintenta solo; si cerró la conexión (p. ej. sesión expirada) se vuelve al polling
+            if (this.eventSource && this.eventSource.readyState === EventSource.CLOSED) {
+                this.eventSource = null;
+                this.startPolling();
+            }
+        };
+    }
+    
+    stopStream() {
+        if (this.eventSource) {
+            this.eventSource.close();
+            this.eventSource = null;
+        }
+    }
+    
     startPolling() {
         // Polling cada 30 segundos
         this.pollInterval = setInterval(() => {
@@ -441,6 +477,7 @@ document.addEventListener('DOMContentLoaded', function() {
 // Limpiar al salir de la página
 window.addEventListener('beforeunload', function() {
     if (window.notificationManager) {
+        window.notificationManager.stopStream();
         window.notificationManager.stopPolling();
     }
 });
\ No newline at end of file
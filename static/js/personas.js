@@ -1,6 +1,9 @@
 // Gestión de Personas Responsables
 let personas = [];
 let filteredPersonas = [];
+let personasNextCursor = null;
+let personasSearchTerm = '';
+let personasSearchTimeout = null;
 let currentSort = { field: null, direction: 'asc' };
 let searchActive = false;
 
@@ -62,15 +65,21 @@ function initializeEventListeners() {
     setupTableSorting();
 }
 
-// Cargar personas desde el servidor
-function loadPersonas() {
-    fetch('/api/personas')
+// Cargar personas desde el servidor (con cursor se agrega la página siguiente)
+function loadPersonas(cursor) {
+    const params = new URLSearchParams();
+    if (cursor) params.set('cursor', cursor);
+    if (personasSearchTerm) params.set('q', personasSearchTerm);
+    const query = params.toString();
+    fetch(query ? `/api/personas?${query}` : '/api/personas')
         .then(response => response.json())
         .then(data => {
             if (data.success) {
-                personas = data.personas;
+                personas = cursor ? personas.concat(data.personas) : data.personas;
+                personasNextCursor = data.pagination ? data.pagination.next_cursor : null;
                 filteredPersonas = [...personas];
                 renderPersonasTable();
+                renderPersonasLoadMore();
             } else {
                 showError('Error al cargar personas: ' + data.message);
             }
@@ -81,6 +90,21 @@ function loadPersonas() {
         });
 }
 
+// Mostrar u ocultar el botón para cargar la página siguiente de personas
+function renderPersonasLoadMore() {
+    let button = document.getElementById('personasLoadMore');
+    if (!button) {
+        button = document.createElement('button');
+        button.type = 'button';
+        button.id = 'personasLoadMore';
+        button.className = 'btn btn-outline-primary btn-sm mt-3';
+        button.innerHTML = '<i class="fas fa-chevron-down"></i> Cargar más';
+        button.addEventListener('click', () => loadPersonas(personasNextCursor));
+        document.getElementById('personasTableBody').closest('table').after(button);
+    }
+    button.style.display = personasNextCursor ? '' : 'none';
+}
+
 // Función para cargar métricas dinámicamente
 function loadPersonasMetrics() {
     $.ajax({
@@ -401,26 +425,17 @@ function toggleSearch() {
     } else {
         searchContainer.style.display = 'none';
         searchInput.value = '';
-        filteredPersonas = [...personas];
-        renderPersonasTable();
+        filterPersonas('');
     }
 }
 
-// Filtrar personas
+// Filtrar personas en el servidor (el listado está paginado)
 function filterPersonas(searchTerm) {
-    if (!searchTerm.trim()) {
-        filteredPersonas = [...personas];
-    } else {
-        const term = searchTerm.toLowerCase();
-        filteredPersonas = personas.filter(persona => 
-            persona.nombre.toLowerCase().includes(term) ||
-            (persona.cliente_nombre && persona.cliente_nombre.toLowerCase().includes(term)) ||
-            (persona.cargo && persona.cargo.toLowerCase().includes(term)) ||
-            (persona.email && persona.email.toLowerCase().includes(term)) ||
-            (persona.telefono && persona.telefono.includes(term))
-        );
+    personasSearchTerm = searchTerm.trim();
+    if (personasSearchTimeout) {
+        clearTimeout(personasSearchTimeout);
     }
-    renderPersonasTable();
+    personasSearchTimeout = setTimeout(() => loadPersonas(), personasSearchTerm ? 300 : 0);
 }
 
 // Configurar ordenamiento de tabla
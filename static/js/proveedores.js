@@ -4,6 +4,9 @@
 let currentProviderId = null;
 let isEditMode = false;
 let proveedoresData = [];
+let proveedoresNextCursor = null;
+let proveedoresSearchTerm = '';
+let proveedoresSearchTimeout = null;
 let selectedPersonas = [];
 let searchTimeout = null;
 
@@ -140,15 +143,18 @@ function updateMetricCards(estadisticas) {
     $('.metrics-grid .metric-card').eq(3).find('.metric-change').text('Por contrato');
 }
 
-// Cargar lista de proveedores
-function loadProveedores() {
+// Cargar lista de proveedores (con cursor se agrega la página siguiente)
+function loadProveedores(cursor) {
     $.ajax({
         url: '/api/proveedores',
         method: 'GET',
+        data: listParams(cursor, proveedoresSearchTerm),
         success: function(response) {
             if (response.success) {
-                proveedoresData = response.proveedores;
+                proveedoresData = cursor ? proveedoresData.concat(response.proveedores) : response.proveedores;
+                proveedoresNextCursor = response.pagination ? response.pagination.next_cursor : null;
                 renderProveedoresTable();
+                renderProveedoresLoadMore();
             } else {
                 showAlert('Error al cargar proveedores: ' + response.message, 'error');
             }
@@ -159,6 +165,20 @@ function loadProveedores() {
     });
 }
 
+// Mostrar u ocultar el botón para cargar la página siguiente de proveedores
+function renderProveedoresLoadMore() {
+    let button = $('#proveedoresLoadMore');
+    if (!button.length) {
+        button = $('<button type="button" id="proveedoresLoadMore" class="btn btn-outline-primary btn-sm mt-3">' +
+                   '<i class="fas fa-chevron-down"></i> Cargar más</button>');
+        button.on('click', function() {
+            loadProveedores(proveedoresNextCursor);
+        });
+        $('#providersTableBody').closest('table').after(button);
+    }
+    button.toggle(Boolean(proveedoresNextCursor));
+}
+
 // Función para generar avatar de proveedor
 function generateProveedorAvatar(nombre, index) {
     const colors = [
@@ -514,25 +534,21 @@ function toggleSearchBar() {
     }
 }
 
-// Función para filtrar proveedores
+// Parámetros del listado paginado: cursor de la página siguiente y término de búsqueda
+function listParams(cursor, searchTerm) {
+    const params = {};
+    if (cursor) params.cursor = cursor;
+    if (searchTerm) params.q = searchTerm;
+    return params;
+}
+
+// Función para filtrar proveedores en el servidor (el listado está paginado)
 function filterProviders(searchTerm) {
-    const rows = $('#providersTableBody tr');
-    
-    if (!searchTerm) {
-        rows.show();
-        return;
+    proveedoresSearchTerm = searchTerm.trim();
+    if (proveedoresSearchTimeout) {
+        clearTimeout(proveedoresSearchTimeout);
     }
-    
-    rows.each(function() {
-        const row = $(this);
-        const text = row.text().toLowerCase();
-        
-        if (text.includes(searchTerm)) {
-            row.show();
-        } else {
-            row.hide();
-        }
-    });
+    proveedoresSearchTimeout = setTimeout(() => loadProveedores(), proveedoresSearchTerm ? 300 : 0);
 }
 
 // Función para buscar personas responsables